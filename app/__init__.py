@@ -31,6 +31,7 @@ from pathlib import Path
 import sys
 from flask_login import LoginManager, current_user
 from app.utils.context_processors import register_context_processors
+from app.utils.fragment_cache import FragmentCacheExtension
 from app.config import Config
 from app.routes import init_app
 from dotenv import load_dotenv
@@ -248,6 +249,19 @@ def create_app(test_config=None):
     except Exception as e:
         logging.error(f"Fehler bei MongoDB-Initialisierung: {e}")
     
+    # ===== FÄLLIGKEITSDATEN NACHTRAGEN =====
+    # Offene Ausleihen ohne due_at (z.B. aus älteren Versionen) für die Überfälligkeitsabfrage
+    try:
+        from app.services.lending_service import LendingService
+        with app.app_context():
+            LendingService.backfill_due_at()
+    except Exception as e:
+        logging.error(f"Fehler beim Nachtragen der Fälligkeitsdaten: {e}")
+    
+    # ===== DATENBANK-INSTRUMENTIERUNG (Server-Timing, Slow-Query-Log) =====
+    from app.utils.query_metrics import init_query_metrics
+    init_query_metrics(app)
+    
     # ===== ID-NORMALISIERUNG BEIM START (opt-in) =====
     # Standard: deaktiviert, kann über ENABLE_ID_NORMALIZATION_ON_START=true aktiviert werden
     if os.environ.get('ENABLE_ID_NORMALIZATION_ON_START', 'false').lower() == 'true':
@@ -316,12 +330,12 @@ def create_app(test_config=None):
             # Falls kein Department in der Session: aus Benutzerprofil ableiten
             if not dept and current_user.is_authenticated:
                 try:
-                    from app.models.mongodb_database import mongodb
-                    user = mongodb.find_one('users', {'username': current_user.username})
+                    from app.utils.principal_cache import get_user_doc
+                    user = get_user_doc(current_user.get_id())
                     # Admins: Standardmäßig erste globale Abteilung wählen, wenn vorhanden
                     if getattr(current_user, 'role', None) == 'admin':
-                        depts_setting = mongodb.find_one('settings', {'key': 'departments'})
-                        all_departments = depts_setting.get('value', []) if depts_setting else []
+                        from app.utils.settings_cache import get_setting
+                        all_departments = get_setting('departments', [])
                         if isinstance(all_departments, list) and all_departments:
                             dept = all_departments[0]
                         else:
@@ -349,49 +363,15 @@ def create_app(test_config=None):
             User-Objekt oder None falls nicht gefunden
         """
         try:
-            from app.models.mongodb_models import MongoDBUser
             from app.models.user import User
-            from app.models.mongodb_database import mongodb
-            
-            logging.debug(f"load_user aufgerufen für ID: {user_id}")
-            
-            # Debug: Zeige alle verfügbaren User-IDs
-            all_users = MongoDBUser.get_all()
-            logging.debug(f"Verfügbare User-IDs: {[str(user.get('_id', 'No ID')) for user in all_users]}")
-            
-            # WICHTIG: user_id ist immer ein String (von Flask-Login)
-            # Suche direkt in der Datenbank mit verschiedenen Methoden
-            
-            # Methode 1: Direkte String-Suche
-            user_data = mongodb.find_one('users', {'_id': user_id})
-            if user_data:
-                logging.debug(f"User mit String-ID gefunden: {user_data.get('username')}")
-                user = User(user_data)
-                logging.debug(f"User geladen: {user.username}, ID: {user.id}")
-                return user
-            
-            # Methode 2: ObjectId-Suche
-            try:
-                from bson import ObjectId
-                obj_id = ObjectId(user_id)
-                user_data = mongodb.find_one('users', {'_id': obj_id})
-                if user_data:
-                    logging.debug(f"User mit ObjectId gefunden: {user_data.get('username')}")
-                    user = User(user_data)
-                    logging.debug(f"User geladen: {user.username}, ID: {user.id}")
-                    return user
-            except Exception as e:
-                logging.debug(f"ObjectId-Konvertierung fehlgeschlagen: {e}")
+            from app.utils.principal_cache import get_user_doc
             
-            # Methode 3: Fallback mit MongoDBUser.get_by_id
-            user_data = MongoDBUser.get_by_id(user_id)
+            # Eine indizierte _id-Abfrage, zwischengespeichert bis zur nächsten Benutzer-Änderung
+            user_data = get_user_doc(user_id)
             if user_data:
-                logging.debug(f"User mit MongoDBUser.get_by_id gefunden: {user_data.get('username')}")
-                user = User(user_data)
-                logging.debug(f"User geladen: {user.username}, ID: {user.id}")
-                return user
+                return User(user_data)
             
-            # Methode 4: Session-Reparatur - versuche Session zu löschen
+            # Session-Reparatur - versuche Session zu löschen
             logging.debug(f"Kein User gefunden für ID: {user_id} - Session wird zurückgesetzt")
             try:
                 from flask import session
@@ -449,6 +429,20 @@ def create_app(test_config=None):
     except Exception as e:
         logging.error(f"Fehler beim Starten des automatischen Backup-Systems: {e}")
     
+    # ===== STATISTIK-SNAPSHOTS IM HINTERGRUND AKTUALISIEREN =====
+    try:
+        from app.services.statistics_service import StatisticsService
+        StatisticsService.start_refresher(app)
+    except Exception as e:
+        logging.error(f"Fehler beim Starten der Statistik-Aktualisierung: {e}")
+    
+    # ===== VERSIONSPRÜFUNG IM HINTERGRUND STARTEN =====
+    try:
+        from app.utils.version_checker import start_version_checker
+        start_version_checker()
+    except Exception as e:
+        logging.error(f"Fehler beim Starten der Versionsprüfung: {e}")
+    
     # ===== AUTOMATISCHE DASHBOARD-REPARATUR BEIM START =====
     try:
         from app.services.admin_debug_service import AdminDebugService
@@ -479,7 +473,7 @@ def create_app(test_config=None):
             from app.models.mongodb_database import MongoDBDatabase
             mongodb = MongoDBDatabase()
             # Prüfe Datenbankverbindung durch einfache Abfrage
-            mongodb._client.admin.command('ping')
+            mongodb.client.admin.command('ping')
             return jsonify({
                 'status': 'healthy',
                 'database': 'connected',
@@ -505,6 +499,9 @@ def create_app(test_config=None):
     app.jinja_env.filters['status_color'] = status_color
     app.jinja_env.filters['priority_color'] = priority_color
     
+    # Fragment-Cache für Layout-Blöcke ({% cache %} ... {% endcache %})
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    
     # ===== KOMPRIMIERUNG AKTIVIEREN =====
     Compress(app)
 
@@ -544,18 +541,6 @@ def create_app(test_config=None):
             }
         }
     
-    # ===== CONTEXT PROCESSOR FÜR FEATURE-EINSTELLUNGEN =====
-    @app.context_processor
-    def feature_processor():
-        """Injiziert Feature-Einstellungen in alle Templates"""
-        try:
-            from app.models.mongodb_database import get_feature_settings
-            feature_settings = get_feature_settings()
-            return {'feature_settings': feature_settings}
-        except Exception as e:
-            app.logger.warning(f"Fehler beim Laden der Feature-Einstellungen: {e}")
-            return {'feature_settings': {}}
-
     # ===== CONTEXT PROCESSOR FÜR BERECHTIGUNGEN =====
     @app.context_processor
     def permissions_processor():
@@ -8,6 +8,8 @@ from datetime import timedelta
 # API-Konfiguration
 CANTEEN_API_KEY = os.environ.get('CANTEEN_API_KEY', '')
 CANTEEN_API_CACHE_DURATION = int(os.environ.get('CANTEEN_API_CACHE_DURATION', 300))  # 5 Minuten
+# Nach Ablauf noch so lange ausliefern, während im Hintergrund neu geladen wird
+CANTEEN_API_STALE_DURATION = int(os.environ.get('CANTEEN_API_STALE_DURATION', 3600))  # 1 Stunde
 
 # CORS-Einstellungen für API-Zugriff
 CANTEEN_API_ALLOWED_ORIGINS = os.environ.get('CANTEEN_API_ALLOWED_ORIGINS', '*').split(',')
@@ -43,6 +43,50 @@ class Config:
     MONGODB_URI = os.environ.get('MONGODB_URI')
     MONGODB_DB = os.environ.get('MONGODB_DB', 'scandy')
     MONGODB_COLLECTION_PREFIX = os.environ.get('MONGODB_COLLECTION_PREFIX', '')
+    # Batch-Größe für Streaming-Cursor (iter_find/iter_aggregate)
+    MONGODB_CURSOR_BATCH_SIZE = int(os.environ.get('MONGODB_CURSOR_BATCH_SIZE', '500'))
+    # Connection-Pool pro Prozess (gunicorn: pro Worker)
+    MONGODB_MAX_POOL_SIZE = int(os.environ.get('MONGODB_MAX_POOL_SIZE', '50'))
+    MONGODB_MIN_POOL_SIZE = int(os.environ.get('MONGODB_MIN_POOL_SIZE', '0'))
+    MONGODB_MAX_IDLE_TIME_MS = int(os.environ.get('MONGODB_MAX_IDLE_TIME_MS', '60000'))
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGODB_WAIT_QUEUE_TIMEOUT_MS', '10000'))
+    # Department-Scoping: 'compat' matcht zusätzlich Dokumente ohne department-Feld ($or/$exists),
+    # 'strict' setzt ein department-Feld voraus (siehe migrate_department_backfill.py) und
+    # filtert per Gleichheit, die von den (department, ...)-Compound-Indizes bedient wird
+    DEPARTMENT_SCOPING_MODE = os.environ.get('DEPARTMENT_SCOPING_MODE', 'compat').lower()
+    # Platzhalter-Department für Altdaten ohne Zuordnung
+    LEGACY_DEPARTMENT = os.environ.get('LEGACY_DEPARTMENT', '__legacy__')
+    # Im strict-Modus Altdaten (LEGACY_DEPARTMENT) in allen Departments sichtbar lassen
+    DEPARTMENT_SCOPING_INCLUDE_LEGACY = os.environ.get('DEPARTMENT_SCOPING_INCLUDE_LEGACY', 'true').lower() == 'true'
+    # Prozesslokale Caches: Abstand der Versionsprüfung (s) und TTL des Settings-Caches (s)
+    CACHE_VERSION_CHECK_INTERVAL = float(os.environ.get('CACHE_VERSION_CHECK_INTERVAL', '2'))
+    SETTINGS_CACHE_TTL = float(os.environ.get('SETTINGS_CACHE_TTL', '300'))
+    # TTL des Principal-Caches für den user_loader (s)
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', '60'))
+    # Dashboard-Statistik-Snapshots: maximales Alter (s) und Prüfabstand des Hintergrund-Threads (s)
+    STATISTICS_SNAPSHOT_MAX_AGE = int(os.environ.get('STATISTICS_SNAPSHOT_MAX_AGE', '300'))
+    STATISTICS_REFRESH_INTERVAL = int(os.environ.get('STATISTICS_REFRESH_INTERVAL', '30'))
+    # Fragment-Cache für Layout-Blöcke (Navigation): Ein/Aus, max. Einträge, max. Größe (Bytes), TTL (s)
+    FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', 'true').lower() == 'true'
+    FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES', '512'))
+    FRAGMENT_CACHE_MAX_BYTES = int(os.environ.get('FRAGMENT_CACHE_MAX_BYTES', str(4 * 1024 * 1024)))
+    FRAGMENT_CACHE_TTL = float(os.environ.get('FRAGMENT_CACHE_TTL', '300'))
+    # Anzahl Operationen pro Batch bei MongoDBDatabase.bulk_write
+    MONGODB_BULK_BATCH_SIZE = int(os.environ.get('MONGODB_BULK_BATCH_SIZE', '1000'))
+    
+    # Abfrage-Instrumentierung: Slow-Query-Log ab Schwelle (ms), optional mit explain()
+    MONGODB_SLOW_QUERY_MS = float(os.environ.get('MONGODB_SLOW_QUERY_MS', '100'))
+    MONGODB_SLOW_QUERY_EXPLAIN = os.environ.get('MONGODB_SLOW_QUERY_EXPLAIN', 'false').lower() == 'true'
+    # Server-Timing-Header mit DB-Summen pro Request; Warnung ab dieser Anzahl Abfragen
+    DB_SERVER_TIMING = os.environ.get('DB_SERVER_TIMING', 'true').lower() == 'true'
+    DB_QUERY_WARN_COUNT = int(os.environ.get('DB_QUERY_WARN_COUNT', '50'))
+    
+    # GitHub-Versionsprüfung im Hintergrund: Abstand zwischen Abrufen (s), Netzwerk-Timeout (s)
+    # und wie oft die Worker den gespeicherten Stand neu lesen (s); false für Offline-Installationen
+    VERSION_CHECK_ENABLED = os.environ.get('VERSION_CHECK_ENABLED', 'true').lower() == 'true'
+    VERSION_CHECK_INTERVAL = int(os.environ.get('VERSION_CHECK_INTERVAL', '21600'))
+    VERSION_CHECK_TIMEOUT = float(os.environ.get('VERSION_CHECK_TIMEOUT', '3'))
+    VERSION_CHECK_POLL_INTERVAL = int(os.environ.get('VERSION_CHECK_POLL_INTERVAL', '60'))
     
     # Upload-Verzeichnis
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'app', 'uploads')
@@ -7,9 +7,11 @@ das Features pro Abteilung verwaltet und persistent speichert.
 
 from typing import Dict, Any, Optional, List
 from datetime import datetime
-from flask import g
+from flask import g, has_app_context
 import logging
-from app.models.mongodb_database import mongodb
+from app.config.config import Config
+from app.models.mongodb_database import mongodb, MongoDBDatabase
+from app.utils.cache_versions import VersionedCache
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +53,34 @@ class FeatureSystem:
         except Exception:
             return None
     
+    # Memo pro Request (flask.g): Department -> Snapshot
+    _REQUEST_MEMO_ATTR = '_feature_snapshots'
+    
+    @classmethod
+    def _snapshot(cls, department: Optional[str]) -> Dict[str, bool]:
+        """
+        Feature-Snapshot einer Abteilung: prozessweit gecacht (siehe _snapshot_cache)
+        und pro Request gemerkt, damit alle Prüfungen eines Requests denselben
+        Stand sehen. Der Snapshot darf nicht verändert werden.
+        """
+        if not has_app_context():
+            return _snapshot_cache.get(department)
+        memo = getattr(g, cls._REQUEST_MEMO_ATTR, None)
+        if memo is None:
+            memo = {}
+            setattr(g, cls._REQUEST_MEMO_ATTR, memo)
+        snapshot = memo.get(department)
+        if snapshot is None:
+            snapshot = memo[department] = _snapshot_cache.get(department)
+        return snapshot
+    
+    @classmethod
+    def invalidate_cache(cls):
+        """Verwirft die Feature-Snapshots in allen Worker-Prozessen und im aktuellen Request"""
+        _snapshot_cache.invalidate()
+        if has_app_context():
+            setattr(g, cls._REQUEST_MEMO_ATTR, None)
+    
     @classmethod
     def get_feature_settings(cls, department: Optional[str] = None) -> Dict[str, bool]:
         """
@@ -66,33 +96,40 @@ class FeatureSystem:
             department = cls.get_current_department()
         
         try:
-            # Lade department-spezifische Features
-            if department:
-                settings = {}
-                rows = mongodb.find('feature_settings', {'department': department})
-                
-                for row in rows:
-                    feature_name = row.get('feature_name')
-                    if feature_name:
-                        settings[feature_name] = row.get('enabled', False)
-                
-                # Kombiniere mit Standard-Einstellungen
-                result = cls.DEFAULT_FEATURES.copy()
-                result.update(settings)
-                
-                # Kern-Features immer aktiviert
-                for feature in cls.CORE_FEATURES:
-                    result[feature] = True
-                
-                return result
-            else:
-                # Kein Department: Standard-Einstellungen
-                return cls.DEFAULT_FEATURES.copy()
-                
+            return dict(cls._snapshot(department))
         except Exception as e:
             logger.error(f"Fehler beim Laden der Feature-Einstellungen für {department}: {e}")
             return cls.DEFAULT_FEATURES.copy()
     
+    @classmethod
+    def _load_feature_settings(cls, department: Optional[str]) -> Dict[str, bool]:
+        """
+        Lädt die Feature-Einstellungen einer Abteilung aus der Datenbank.
+        Fehler werden nicht abgefangen, damit kein Fallback im Cache landet.
+        """
+        # Kein Department: Standard-Einstellungen
+        if not department:
+            return cls.DEFAULT_FEATURES.copy()
+        
+        # Lade department-spezifische Features
+        settings = {}
+        rows = mongodb.find('feature_settings', {'department': department})
+        
+        for row in rows:
+            feature_name = row.get('feature_name')
+            if feature_name:
+                settings[feature_name] = row.get('enabled', False)
+        
+        # Kombiniere mit Standard-Einstellungen
+        result = cls.DEFAULT_FEATURES.copy()
+        result.update(settings)
+        
+        # Kern-Features immer aktiviert
+        for feature in cls.CORE_FEATURES:
+            result[feature] = True
+        
+        return result
+    
     @classmethod
     def set_feature_setting(cls, feature_name: str, enabled: bool, department: Optional[str] = None) -> bool:
         """
@@ -135,6 +172,7 @@ class FeatureSystem:
                     'updated_at': datetime.now()
                 })
             
+            # Snapshots werden über den Schreib-Listener auf 'feature_settings' invalidiert
             logger.info(f"Feature {feature_name} für {department} auf {enabled} gesetzt")
             return True
             
@@ -162,18 +200,8 @@ class FeatureSystem:
             return True
         
         try:
-            if department:
-                # Lade department-spezifische Einstellung
-                setting = mongodb.find_one('feature_settings', {
-                    'feature_name': feature_name,
-                    'department': department
-                })
-                
-                if setting is not None:
-                    return setting.get('enabled', False)
-            
-            # Fallback zu Standard-Einstellung
-            return cls.DEFAULT_FEATURES.get(feature_name, False)
+            # Snapshot enthält Standard-Einstellungen und department-spezifische Werte
+            return cls._snapshot(department).get(feature_name, False)
             
         except Exception as e:
             logger.error(f"Fehler beim Prüfen der Feature-Einstellung {feature_name} für {department}: {e}")
@@ -253,6 +281,13 @@ class FeatureSystem:
             logger.error(f"Fehler beim Kopieren der Features von {source_department} zu {target_department}: {e}")
             return False
 
+# Prozessweiter Cache der Feature-Snapshots pro Abteilung
+_snapshot_cache = VersionedCache('feature_settings', FeatureSystem._load_feature_settings,
+                                 ttl=Config.SETTINGS_CACHE_TTL)
+
+# Schreibzugriffe über MongoDBDatabase (auch außerhalb von FeatureSystem) invalidieren die Snapshots
+MongoDBDatabase.register_write_listener('feature_settings', FeatureSystem.invalidate_cache)
+
 # Globale Instanz für einfache Verwendung
 feature_system = FeatureSystem()
 
@@ -0,0 +1,162 @@
+"""
+Deklarative Index-Registry für Scandy
+
+Alle Indizes werden hier pro Collection beschrieben und beim Start über
+apply_index_registry() idempotent angelegt. Vorhandene Indizes, die nicht
+(mehr) in der Registry stehen, werden nicht gelöscht, sondern im
+Index-Report (IndexReportService) als nicht registriert ausgewiesen.
+
+Jeder Eintrag: {'keys': [(feld, richtung), ...], optional 'unique', 'sparse',
+'expire_after_seconds'}.
+"""
+import logging
+from typing import Any, Dict, List
+
+from app.models.mongodb_database import mongodb
+
+logger = logging.getLogger(__name__)
+
+def _index(*keys, **options) -> Dict[str, Any]:
+    """Kurzschreibweise: _index('name') oder _index(('a', 1), ('b', -1), unique=True)"""
+    normalized = [(key, 1) if isinstance(key, str) else tuple(key) for key in keys]
+    return {'keys': normalized, **options}
+
+INDEX_REGISTRY: Dict[str, List[Dict[str, Any]]] = {
+    'tools': [
+        # Unique pro Abteilung statt global
+        _index('department', 'barcode', unique=True, sparse=True),
+        _index('name'),
+        _index('category'),
+        _index('location'),
+        _index('status'),
+        _index('status', 'category'),
+        _index('location', 'status'),
+    ],
+    'workers': [
+        _index('department', 'barcode', unique=True, sparse=True),
+        _index('lastname'),
+        _index('department'),
+        _index('department', 'lastname'),
+        # TTL für geplante Löschung (falls mit User gekoppelt)
+        _index('delete_at', expire_after_seconds=0),
+    ],
+    'consumables': [
+        _index('department', 'barcode', unique=True, sparse=True),
+        _index('name'),
+        _index('category'),
+        _index('location'),
+        _index('category', 'quantity'),
+    ],
+    'lendings': [
+        _index('tool_barcode'),
+        _index('worker_barcode'),
+        _index('lent_at'),
+        # Aktive Ausleihen werden über returned_at (None/fehlend) ermittelt
+        _index('returned_at'),
+        _index('tool_barcode', 'returned_at'),
+        _index('worker_barcode', 'returned_at'),
+        # Department-Präfix für strict-Scoping
+        _index('department', 'tool_barcode', 'returned_at'),
+        _index('department', 'worker_barcode', 'returned_at'),
+        _index('department', ('lent_at', -1)),
+        # Überfällige Ausleihen: returned_at None und due_at vor heute
+        _index('returned_at', 'due_at'),
+        _index('department', 'returned_at', 'due_at'),
+    ],
+    'consumable_usages': [
+        _index('consumable_barcode'),
+        _index('worker_barcode'),
+        _index('used_at'),
+        _index('consumable_barcode', ('used_at', -1)),
+        _index('worker_barcode', ('used_at', -1)),
+        # Feed der letzten Entnahmen (sortiert nach used_at, _id als Cursor-Tiebreaker)
+        _index('department', ('used_at', -1), ('_id', -1)),
+        _index(('used_at', -1), ('_id', -1)),
+        _index('department', 'consumable_barcode', ('used_at', -1)),
+    ],
+    'users': [
+        _index('username', unique=True),
+        _index('email'),
+        _index('role', 'is_active'),
+        # TTL für geplante Löschung (delete_at muss ein echtes Date-Feld sein)
+        _index('delete_at', expire_after_seconds=0),
+    ],
+    'tickets': [
+        _index('status'),
+        _index('assigned_to'),
+        _index('created_at'),
+        _index('status', 'category'),
+        _index('assigned_to', 'status'),
+        _index('created_by', ('created_at', -1)),
+        _index('priority', 'status'),
+        _index('department', 'status', ('created_at', -1)),
+    ],
+    'ticket_messages': [
+        _index('ticket_id', 'created_at'),
+    ],
+    'ticket_assignments': [
+        _index('ticket_id', 'assigned_to'),
+    ],
+    'settings': [
+        # Key pro Abteilung; der Schlüssel 'departments' bleibt global
+        _index('department', 'key', unique=True, sparse=True),
+        _index('key'),
+    ],
+    'feature_settings': [
+        _index('department', 'feature_name'),
+    ],
+    'canteen_meals': [
+        _index('date'),
+    ],
+    'timesheets': [
+        _index('user_id', 'year', 'kw', unique=True),
+        _index('year'),
+        _index('kw'),
+    ],
+    'homepage_notices': [
+        _index('is_active'),
+        _index('priority'),
+        _index('created_at'),
+        _index('is_active', ('priority', -1), ('created_at', -1)),
+    ],
+    'messages': [
+        _index('ticket_id', ('created_at', -1)),
+        _index('created_at'),
+    ],
+    'ticket_history': [
+        _index('ticket_id', ('created_at', -1)),
+        _index('created_at'),
+    ],
+}
+
+def index_name(keys: List[tuple]) -> str:
+    """Standardname, den MongoDB für einen Index vergibt (z.B. 'department_1_barcode_1')"""
+    return '_'.join(f"{field}_{direction}" for field, direction in keys)
+
+def apply_index_registry() -> Dict[str, int]:
+    """
+    Legt alle Indizes der Registry an. Bereits vorhandene Indizes bleiben
+    unverändert; Fehler einzelner Indizes werden geloggt und brechen den
+    Vorgang nicht ab.
+
+    Returns:
+        Dict mit Anzahl angelegter/geprüfter und fehlgeschlagener Indizes
+    """
+    stats = {'applied': 0, 'failed': 0}
+    for collection_name, indexes in INDEX_REGISTRY.items():
+        for spec in indexes:
+            keys = spec['keys']
+            try:
+                mongodb.create_index(
+                    collection_name,
+                    keys,
+                    unique=spec.get('unique', False),
+                    sparse=spec.get('sparse', False),
+                    expire_after_seconds=spec.get('expire_after_seconds')
+                )
+                stats['applied'] += 1
+            except Exception as e:
+                stats['failed'] += 1
+                logger.warning(f"Index {collection_name}.{index_name(keys)} konnte nicht angelegt werden: {e}")
+    logger.info(f"Index-Registry angewendet: {stats['applied']} Indizes, {stats['failed']} Fehler")
+    return stats
@@ -1,26 +1,169 @@
 """
 MongoDB-Datenbankmodul für Scandy
 """
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError, OperationFailure
+from pymongo import MongoClient, InsertOne, UpdateOne, UpdateMany, ReplaceOne, DeleteOne, DeleteMany
+from pymongo.monitoring import ConnectionPoolListener
+from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError, OperationFailure, BulkWriteError
 from datetime import datetime
 import logging
 from bson import ObjectId
-from app.config.config import config
+from app.config.config import config, Config
 import json
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Union, Iterator, Iterable
 import os
 import time
-from flask import g
+import copy
+import inspect
+import threading
+from functools import wraps
+from flask import g, has_app_context
+from app.utils.query_metrics import record_query, record_cache_hit
 
 logger = logging.getLogger(__name__)
 
+def _result_count(result: Any) -> int:
+    """Anzahl betroffener/gelieferter Dokumente für die Instrumentierung"""
+    if result is None:
+        return 0
+    if isinstance(result, bool):
+        return int(result)
+    if isinstance(result, int):
+        return result
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 1
+
+def _instrumented(operation: str, filter_arg: Optional[tuple] = (0, 'filter_dict'),
+                  explainable: bool = False, count=_result_count):
+    """
+    Erfasst Dauer, Filter-Form und Dokumentanzahl einer MongoDBDatabase-Methode
+    im Request-Akkumulator (siehe app.utils.query_metrics).
+
+    Args:
+        filter_arg: (Position nach collection_name, Keyword-Name) des Filters oder
+            ein Callable (args, kwargs) -> Filter
+        explainable: Bei langsamen Abfragen kann ein find-explain() erfasst werden
+        count: Ermittelt die Dokumentanzahl aus dem Rückgabewert
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(self, collection_name, *args, **kwargs):
+            if callable(filter_arg):
+                filter_value = filter_arg(args, kwargs)
+            elif filter_arg is not None:
+                position, keyword = filter_arg
+                filter_value = args[position] if len(args) > position else kwargs.get(keyword)
+            else:
+                filter_value = None
+            explain = (lambda: self._explain_find(collection_name, filter_value)) if explainable else None
+
+            start = time.perf_counter()
+            try:
+                result = f(self, collection_name, *args, **kwargs)
+            except Exception:
+                record_query(collection_name, operation, filter_value, time.perf_counter() - start,
+                             explain=explain, success=False)
+                raise
+
+            if inspect.isgenerator(result):
+                return _instrumented_iter(result, collection_name, operation, filter_value,
+                                          time.perf_counter() - start, explain)
+            record_query(collection_name, operation, filter_value, time.perf_counter() - start,
+                         count(result), explain=explain)
+            return result
+        return wrapper
+    return decorator
+
+def _instrumented_iter(generator, collection_name, operation, filter_value, duration, explain):
+    """Misst bei Generatoren nur die Zeit in next(), nicht die des Verbrauchers"""
+    documents = 0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                doc = next(generator)
+            except StopIteration:
+                duration += time.perf_counter() - start
+                break
+            duration += time.perf_counter() - start
+            documents += 1
+            yield doc
+    finally:
+        generator.close()
+        record_query(collection_name, operation, filter_value, duration, documents, explain=explain)
+
+class _PoolStatsListener(ConnectionPoolListener):
+    """Zählt Verbindungen des Connection-Pools (ausgeliehen, wartend, offen)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        with self._lock:
+            self.open = 0
+            self.checked_out = 0
+            self.waiting = 0
+            self.check_out_failed = 0
+            self.pools_cleared = 0
+    
+    def _add(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+    
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'open': self.open,
+                'checked_out': self.checked_out,
+                'waiting': self.waiting,
+                'check_out_failed': self.check_out_failed,
+                'pools_cleared': self.pools_cleared,
+            }
+    
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        self._add(pools_cleared=1)
+    
+    def pool_closed(self, event):
+        pass
+    
+    def connection_created(self, event):
+        self._add(open=1)
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_closed(self, event):
+        self._add(open=-1)
+    
+    def connection_check_out_started(self, event):
+        self._add(waiting=1)
+    
+    def connection_check_out_failed(self, event):
+        self._add(waiting=-1, check_out_failed=1)
+    
+    def connection_checked_out(self, event):
+        self._add(waiting=-1, checked_out=1)
+    
+    def connection_checked_in(self, event):
+        self._add(checked_out=-1)
+
 class MongoDBDatabase:
     """MongoDB-Datenbankklasse für Scandy"""
     
     _instance = None
     _client = None
     _db = None
+    # Prozess, in dem der aktuelle Client erzeugt wurde (Fork-Erkennung)
+    _pid = None
+    _pool_listener = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -42,33 +185,82 @@ class MongoDBDatabase:
                 uri += '&authSource=admin'
             else:
                 uri += '?authSource=admin'
+        self._pool_listener = _PoolStatsListener()
         for attempt in range(10):
             try:
                 password = os.environ.get("MONGO_INITDB_ROOT_PASSWORD", "")
                 safe_uri = uri.replace(password, "***") if password and uri else uri
                 print(f"[MongoDB] Verbindungsversuch {attempt+1}/10 zu {safe_uri}")
-                self._client = MongoClient(uri, serverSelectionTimeoutMS=10000, connectTimeoutMS=10000, retryWrites=True, w='majority')
+                self._client = MongoClient(
+                    uri,
+                    serverSelectionTimeoutMS=10000,
+                    connectTimeoutMS=10000,
+                    retryWrites=True,
+                    w='majority',
+                    maxPoolSize=Config.MONGODB_MAX_POOL_SIZE,
+                    minPoolSize=Config.MONGODB_MIN_POOL_SIZE,
+                    maxIdleTimeMS=Config.MONGODB_MAX_IDLE_TIME_MS,
+                    waitQueueTimeoutMS=Config.MONGODB_WAIT_QUEUE_TIMEOUT_MS or None,
+                    event_listeners=[self._pool_listener],
+                )
                 self._client.admin.command('ping')
                 self._db = self._client[db_name]
-                print(f"[MongoDB] Verbindung erfolgreich zu {safe_uri}")
+                self._pid = os.getpid()
+                print(f"[MongoDB] Verbindung erfolgreich zu {safe_uri} (PID {self._pid})")
                 return
             except (ServerSelectionTimeoutError, OperationFailure) as e:
                 print(f"[MongoDB] Nicht erreichbar (Versuch {attempt+1}/10): {e}")
                 time.sleep(3)
         raise Exception("MongoDB-Verbindung nach 10 Versuchen fehlgeschlagen!")
     
+    def _reset_after_fork(self):
+        """
+        Verwirft den vom Elternprozess geerbten Client. MongoClient ist nicht
+        fork-sicher (gunicorn --preload); jeder Worker baut seinen eigenen Pool auf.
+        Der geerbte Client wird bewusst nicht geschlossen, da seine Sockets noch
+        dem Elternprozess gehören.
+        """
+        self._client = None
+        self._db = None
+        self._pid = None
+        self._pool_listener = None
+    
+    def _ensure_connected(self):
+        """Verbindet (neu), falls noch kein Client besteht oder der Prozess geforkt wurde"""
+        if self._pid is not None and self._pid != os.getpid():
+            self._reset_after_fork()
+        if self._db is None:
+            self._connect()
+    
+    @property
+    def client(self) -> MongoClient:
+        """Gibt den MongoClient des aktuellen Prozesses zurück"""
+        self._ensure_connected()
+        return self._client
+    
     @property
     def db(self):
         """Gibt die Datenbank zurück"""
-        if self._db is None:
-            self._connect()
+        self._ensure_connected()
         return self._db
     
     def get_collection(self, collection_name: str):
         """Gibt eine MongoDB-Collection zurück"""
-        if self._db is None:
-            self._connect()
+        self._ensure_connected()
         return self._db[collection_name]
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Liefert Kennzahlen des Connection-Pools dieses Prozesses"""
+        stats = self._pool_listener.snapshot() if self._pool_listener else {}
+        stats.update({
+            'pid': os.getpid(),
+            'connected': self._client is not None and self._pid == os.getpid(),
+            'max_pool_size': Config.MONGODB_MAX_POOL_SIZE,
+            'min_pool_size': Config.MONGODB_MIN_POOL_SIZE,
+            'max_idle_time_ms': Config.MONGODB_MAX_IDLE_TIME_MS,
+            'wait_queue_timeout_ms': Config.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        })
+        return stats
 
     # --- Multi-Department Scoping (abwärtskompatibel) ---
     _SCOPED_COLLECTIONS = {
@@ -86,11 +278,41 @@ class MongoDBDatabase:
         except Exception:
             return None
 
+    @staticmethod
+    def _strict_department_scoping() -> bool:
+        """True, wenn alle gescopten Dokumente ein department-Feld tragen (DEPARTMENT_SCOPING_MODE=strict)"""
+        return Config.DEPARTMENT_SCOPING_MODE == 'strict'
+
+    @classmethod
+    def _department_scope_clause(cls, current_department: str) -> Dict[str, Any]:
+        """
+        Filterbedingung für ein Department.
+        compat: $or mit $exists:false (verhindert Index-Nutzung);
+        strict: Gleichheit bzw. $in mit dem Legacy-Platzhalter – beides nutzt
+        Indizes mit department als Präfix.
+        """
+        if not cls._strict_department_scoping():
+            return {'$or': [
+                {'department': current_department},
+                {'department': {'$exists': False}}
+            ]}
+        if Config.DEPARTMENT_SCOPING_INCLUDE_LEGACY and current_department != Config.LEGACY_DEPARTMENT:
+            return {'department': {'$in': [current_department, Config.LEGACY_DEPARTMENT]}}
+        return {'department': current_department}
+
+    @classmethod
+    def _department_for_write(cls) -> Optional[str]:
+        """Department für neue Dokumente; im strict-Modus nie leer (Fallback: Legacy-Platzhalter)"""
+        current_department = cls._get_current_department()
+        if not current_department and cls._strict_department_scoping():
+            return Config.LEGACY_DEPARTMENT
+        return current_department
+
     @classmethod
     def _augment_filter_with_department(cls, collection_name: str, base_filter: Dict[str, Any]) -> Dict[str, Any]:
         """
         Erzwingt Department-Scoping für lesende/ändernde Operationen.
-        Abwärtskompatibel: Matcht auch Dokumente ohne 'department'-Feld.
+        Im compat-Modus werden auch Dokumente ohne 'department'-Feld gematcht.
         """
         if collection_name not in cls._SCOPED_COLLECTIONS:
             return base_filter or {}
@@ -111,24 +333,88 @@ class MongoDBDatabase:
         if not current_department:
             # Ohne gesetztes Department: alle Dokumente zulassen (Legacy-Modus)
             return base_filter or {}
-        scoped_clause = {'$or': [
-            {'department': current_department},
-            {'department': {'$exists': False}}
-        ]}
+        scoped_clause = cls._department_scope_clause(current_department)
         if not base_filter:
             return scoped_clause
+        if 'department' in scoped_clause:
+            # Gleichheits-Präfix direkt in den Filter übernehmen (department fehlt dort, s.o.)
+            return {**base_filter, **scoped_clause}
         # Kombiniere mit AND
         return {'$and': [base_filter, scoped_clause]}
 
+    # --- Request-Scoped Identity Map (opt-in via cached=True) ---
+    _IDENTITY_MAP_ATTR = '_mongodb_identity_map'
+    _IDENTITY_MISS = object()
+
+    @classmethod
+    def _get_identity_map(cls) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Gibt die Identity-Map des aktuellen Requests zurück (None ohne App-Context)"""
+        if not has_app_context():
+            return None
+        identity_map = getattr(g, cls._IDENTITY_MAP_ATTR, None)
+        if identity_map is None:
+            identity_map = {}
+            setattr(g, cls._IDENTITY_MAP_ATTR, identity_map)
+        return identity_map
+
+    @classmethod
+    def _identity_key(cls, filter_dict: Dict[str, Any], projection: Optional[Dict[str, Any]] = None) -> str:
+        """Normalisierter Schlüssel aus Filter, Projektion und aktuellem Department"""
+        normalized = json.dumps(filter_dict or {}, sort_keys=True, default=str)
+        if projection:
+            normalized += '|' + json.dumps(projection, sort_keys=True, default=str)
+        return f"{cls._get_current_department() or ''}|{normalized}"
+
+    @classmethod
+    def invalidate_identity_map(cls, collection_name: Optional[str] = None):
+        """Verwirft gecachte Lookups einer Collection (oder alle) für den aktuellen Request"""
+        if not has_app_context():
+            return
+        identity_map = getattr(g, cls._IDENTITY_MAP_ATTR, None)
+        if not identity_map:
+            return
+        if collection_name is None:
+            identity_map.clear()
+        else:
+            identity_map.pop(collection_name, None)
+
+    # --- Schreib-Listener (z.B. Invalidierung prozessweiter Caches) ---
+    _write_listeners: Dict[str, List[Any]] = {}
+
+    @classmethod
+    def register_write_listener(cls, collection_name: str, callback):
+        """Registriert einen Callback, der nach jeder Schreiboperation auf collection_name aufgerufen wird"""
+        cls._write_listeners.setdefault(collection_name, []).append(callback)
+
+    @classmethod
+    def _after_write(cls, collection_name: str):
+        """Verwirft die Identity-Map und benachrichtigt Schreib-Listener der Collection"""
+        cls.invalidate_identity_map(collection_name)
+        for callback in cls._write_listeners.get(collection_name, ()):
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Schreib-Listener für {collection_name} fehlgeschlagen: {e}")
+
+    @staticmethod
+    def _normalize_projection(projection: Union[Dict[str, Any], List[str], tuple, None]) -> Optional[Dict[str, Any]]:
+        """Normalisiert eine Projektion: Dict wird übernommen, eine Feldliste wird zu {feld: 1}"""
+        if not projection:
+            return None
+        if isinstance(projection, dict):
+            return projection
+        return {field: 1 for field in projection}
+
     @classmethod
     def _ensure_department_on_insert(cls, collection_name: str, document: Dict[str, Any]) -> Dict[str, Any]:
         if collection_name not in cls._SCOPED_COLLECTIONS:
             return document
-        current_department = cls._get_current_department()
+        current_department = cls._department_for_write()
         if current_department and 'department' not in document:
             document['department'] = current_department
         return document
     
+    @_instrumented('insert_one', filter_arg=None)
     def insert_one(self, collection_name: str, document: Dict[str, Any]) -> str:
         """Fügt ein Dokument in eine Collection ein"""
         collection = self.get_collection(collection_name)
@@ -141,8 +427,10 @@ class MongoDBDatabase:
         document = self._ensure_department_on_insert(collection_name, document)
         
         result = collection.insert_one(document)
+        self._after_write(collection_name)
         return str(result.inserted_id)
     
+    @_instrumented('insert_many', filter_arg=None)
     def insert_many(self, collection_name: str, documents: List[Dict[str, Any]]) -> List[str]:
         """Fügt mehrere Dokumente in eine Collection ein"""
         collection = self.get_collection(collection_name)
@@ -154,10 +442,40 @@ class MongoDBDatabase:
             doc = self._ensure_department_on_insert(collection_name, doc)
         
         result = collection.insert_many(documents)
+        self._after_write(collection_name)
         return [str(id) for id in result.inserted_ids]
     
-    def find_one(self, collection_name: str, filter_dict: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Findet ein Dokument in einer Collection"""
+    def find_one(self, collection_name: str, filter_dict: Dict[str, Any],
+                 projection: Union[Dict[str, Any], List[str], None] = None,
+                 cached: bool = False) -> Optional[Dict[str, Any]]:
+        """Findet ein Dokument in einer Collection
+
+        projection begrenzt die geladenen Felder (Dict oder Liste von Feldnamen).
+        Mit cached=True wird das Ergebnis in der Identity-Map des Requests (flask.g)
+        abgelegt; wiederholte Lookups mit gleichem Filter sind dann Dictionary-Treffer.
+        Schreiboperationen auf derselben Collection verwerfen die Einträge.
+        """
+        projection = self._normalize_projection(projection)
+        identity_map = self._get_identity_map() if cached else None
+        if identity_map is not None:
+            identity_key = self._identity_key(filter_dict, projection)
+            hit = identity_map.get(collection_name, {}).get(identity_key, self._IDENTITY_MISS)
+            if hit is not self._IDENTITY_MISS:
+                record_cache_hit()
+                # Kopie zurückgeben, damit Aufrufer den Cache nicht verändern
+                return copy.deepcopy(hit)
+
+        result = self._find_one(collection_name, filter_dict, projection)
+        
+        if identity_map is not None:
+            identity_map.setdefault(collection_name, {})[identity_key] = copy.deepcopy(result)
+        
+        return result
+    
+    @_instrumented('find_one', explainable=True)
+    def _find_one(self, collection_name: str, filter_dict: Dict[str, Any],
+                  projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Führt find_one ohne Identity-Map aus"""
         collection = self.get_collection(collection_name)
         
         # Konvertiere String-IDs zu ObjectIds in filter_dict
@@ -165,17 +483,35 @@ class MongoDBDatabase:
         # Department-Scoping anwenden
         processed_filter = self._augment_filter_with_department(collection_name, processed_filter)
         
-        result = collection.find_one(processed_filter)
+        result = collection.find_one(processed_filter, projection)
         
-        if result:
+        if result and '_id' in result:
             # ObjectId zu String konvertieren
             result['_id'] = str(result['_id'])
         
         return result
     
+    def _explain_find(self, collection_name: str, filter_dict: Dict[str, Any]) -> Dict[str, Any]:
+        """Liefert den gewählten Query-Plan für einen (gescopten) find-Filter"""
+        processed_filter = self._process_filter_ids(filter_dict or {})
+        processed_filter = self._augment_filter_with_department(collection_name, processed_filter)
+        plan = self.get_collection(collection_name).find(processed_filter).explain()
+        query_planner = plan.get('queryPlanner', {})
+        execution_stats = plan.get('executionStats', {})
+        return {
+            'winningPlan': query_planner.get('winningPlan'),
+            'totalKeysExamined': execution_stats.get('totalKeysExamined'),
+            'totalDocsExamined': execution_stats.get('totalDocsExamined'),
+        }
+    
+    @_instrumented('find', explainable=True)
     def find(self, collection_name: str, filter_dict: Dict[str, Any] = None, 
-             sort: List[tuple] = None, limit: int = None, skip: int = None) -> List[Dict[str, Any]]:
-        """Findet mehrere Dokumente in einer Collection"""
+             sort: List[tuple] = None, limit: int = None, skip: int = None,
+             projection: Union[Dict[str, Any], List[str], None] = None) -> List[Dict[str, Any]]:
+        """Findet mehrere Dokumente in einer Collection
+
+        projection begrenzt die geladenen Felder (Dict oder Liste von Feldnamen).
+        """
         collection = self.get_collection(collection_name)
         
         if filter_dict is None:
@@ -186,7 +522,7 @@ class MongoDBDatabase:
         # Department-Scoping anwenden
         processed_filter = self._augment_filter_with_department(collection_name, processed_filter)
         
-        cursor = collection.find(processed_filter)
+        cursor = collection.find(processed_filter, self._normalize_projection(projection))
         
         if sort:
             cursor = cursor.sort(sort)
@@ -200,11 +536,135 @@ class MongoDBDatabase:
         results = []
         for doc in cursor:
             # ObjectId zu String konvertieren
-            doc['_id'] = str(doc['_id'])
+            if '_id' in doc:
+                doc['_id'] = str(doc['_id'])
             results.append(doc)
         
         return results
     
+    @_instrumented('iter_find', explainable=True)
+    def iter_find(self, collection_name: str, filter_dict: Dict[str, Any] = None,
+                  sort: List[tuple] = None, limit: int = None, skip: int = None,
+                  projection: Union[Dict[str, Any], List[str], None] = None,
+                  batch_size: int = None, no_cursor_timeout: bool = False) -> Iterator[Dict[str, Any]]:
+        """Liefert Dokumente einer Collection als Generator statt als Liste
+
+        Für Backups, Exporte und Konsistenzprüfungen über große Collections: es wird
+        immer nur ein Batch (batch_size, Standard MONGODB_CURSOR_BATCH_SIZE) im Speicher
+        gehalten. Department-Scoping und _id-Konvertierung wie bei find().
+
+        Args:
+            no_cursor_timeout: Cursor läuft serverseitig nicht nach 10 Minuten ab
+                (für langsame Verbraucher); der Cursor wird in jedem Fall geschlossen.
+        """
+        collection = self.get_collection(collection_name)
+        
+        # Konvertiere String-IDs zu ObjectIds und Department-Scoping anwenden
+        processed_filter = self._process_filter_ids(filter_dict or {})
+        processed_filter = self._augment_filter_with_department(collection_name, processed_filter)
+        
+        cursor = collection.find(processed_filter, self._normalize_projection(projection),
+                                 no_cursor_timeout=no_cursor_timeout)
+        cursor.batch_size(batch_size or Config.MONGODB_CURSOR_BATCH_SIZE)
+        
+        if sort:
+            cursor = cursor.sort(sort)
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        
+        try:
+            for doc in cursor:
+                if '_id' in doc:
+                    doc['_id'] = str(doc['_id'])
+                yield doc
+        finally:
+            cursor.close()
+    
+    _FIND_BY_KEYS_CHUNK_SIZE = 1000
+
+    @_instrumented('find_by_keys',
+                   filter_arg=lambda args, kwargs: {args[0] if args else kwargs.get('field'): {'$in': []}},
+                   count=len)
+    def find_by_keys(self, collection_name: str, field: str, values: List[Any],
+                     projection: Union[Dict[str, Any], List[str], None] = None,
+                     filter_dict: Dict[str, Any] = None,
+                     chunk_size: int = None) -> Dict[Any, Dict[str, Any]]:
+        """Lädt mehrere Dokumente über einen Schlüssel mit einer $in-Abfrage pro Chunk
+
+        Ersetzt find_one-Schleifen (N+1) durch eine Abfrage. Das Ergebnis ist ein Dict
+        Feldwert -> Dokument; bei mehrfach vorhandenen Schlüsseln gewinnt das erste Dokument.
+
+        Args:
+            collection_name: Name der Collection
+            field: Schlüsselfeld (z.B. 'barcode')
+            values: Gesuchte Schlüsselwerte (None/Duplikate werden ignoriert)
+            projection: Optionale Projektion; das Schlüsselfeld wird immer mitgeladen
+            filter_dict: Zusätzliche Bedingungen (z.B. {'deleted': {'$ne': True}})
+            chunk_size: Anzahl Werte pro $in-Abfrage
+        """
+        unique_values = []
+        seen = set()
+        for value in values or []:
+            if value is None or value == '':
+                continue
+            marker = str(value) if field == '_id' else value
+            try:
+                if marker in seen:
+                    continue
+                seen.add(marker)
+            except TypeError:
+                # Nicht hashbare Werte können nicht als Schlüssel dienen
+                continue
+            unique_values.append(value)
+
+        if not unique_values:
+            return {}
+
+        projection = self._normalize_projection(projection)
+        if projection is not None and projection.get(field) in (0, False):
+            projection = {k: v for k, v in projection.items() if k != field}
+        if projection is not None and any(v for v in projection.values()):
+            projection = {**projection, field: 1}
+
+        collection = self.get_collection(collection_name)
+        chunk_size = chunk_size or self._FIND_BY_KEYS_CHUNK_SIZE
+        results: Dict[Any, Dict[str, Any]] = {}
+
+        for start in range(0, len(unique_values), chunk_size):
+            chunk = unique_values[start:start + chunk_size]
+            if field == '_id':
+                # String-IDs zusätzlich als ObjectId suchen (gemischte ID-Typen)
+                id_values = []
+                for value in chunk:
+                    id_values.append(value)
+                    if isinstance(value, str) and ObjectId.is_valid(value):
+                        id_values.append(ObjectId(value))
+                key_filter = {'_id': {'$in': id_values}}
+            else:
+                key_filter = {field: {'$in': chunk}}
+
+            if filter_dict:
+                base_filter = self._process_filter_ids(filter_dict)
+                if field in base_filter:
+                    key_filter = {'$and': [base_filter, key_filter]}
+                else:
+                    key_filter = {**base_filter, **key_filter}
+            processed_filter = self._augment_filter_with_department(collection_name, key_filter)
+
+            for doc in collection.find(processed_filter, projection):
+                if '_id' in doc:
+                    doc['_id'] = str(doc['_id'])
+                key = doc.get(field)
+                try:
+                    results.setdefault(key, doc)
+                except TypeError:
+                    continue
+
+        return results
+    
+    @_instrumented('update_one')
     def update_one(self, collection_name: str, filter_dict: Dict[str, Any], 
                    update_dict: Dict[str, Any], upsert: bool = False) -> bool:
         """Aktualisiert ein Dokument in einer Collection"""
@@ -232,7 +692,7 @@ class MongoDBDatabase:
         try:
             # Bei Upsert in gescopten Collections sicherstellen, dass 'department' gesetzt wird
             if upsert and collection_name in self._SCOPED_COLLECTIONS:
-                current_department = self._get_current_department()
+                current_department = self._department_for_write()
                 # Nicht für globale Settings 'departments'
                 is_global_departments = (collection_name == 'settings' and isinstance(filter_dict, dict) and filter_dict.get('key') == 'departments')
                 if current_department and not is_global_departments:
@@ -241,6 +701,7 @@ class MongoDBDatabase:
                     else:
                         update_dict = {'$set': {**update_dict, 'department': current_department}}
             result = collection.update_one(processed_filter, update_dict, upsert=upsert)
+            self._after_write(collection_name)
             
             # Debug-Logs für bessere Fehlerdiagnose
             import logging
@@ -282,6 +743,7 @@ class MongoDBDatabase:
         
         return processed_filter
     
+    @_instrumented('update_one_array')
     def update_one_array(self, collection_name: str, filter_dict: Dict[str, Any], 
                         update_dict: Dict[str, Any], upsert: bool = False) -> bool:
         """Aktualisiert ein Dokument in einer Collection mit Array-Operationen ($push, $pull, etc.)
@@ -292,8 +754,10 @@ class MongoDBDatabase:
         processed_filter = self._process_filter_ids(filter_dict)
         
         result = collection.update_one(processed_filter, update_dict, upsert=upsert)
+        self._after_write(collection_name)
         return result.modified_count > 0 or result.upserted_id is not None
     
+    @_instrumented('update_many')
     def update_many(self, collection_name: str, filter_dict: Dict[str, Any], 
                     update_dict: Dict[str, Any]) -> int:
         """Aktualisiert mehrere Dokumente in einer Collection"""
@@ -317,8 +781,159 @@ class MongoDBDatabase:
         processed_filter = self._process_filter_ids(filter_dict)
         processed_filter = self._augment_filter_with_department(collection_name, processed_filter)
         result = collection.update_many(processed_filter, update_dict)
+        self._after_write(collection_name)
         return result.modified_count
     
+    _BULK_OPERATIONS = ('insertOne', 'updateOne', 'updateMany', 'replaceOne', 'deleteOne', 'deleteMany')
+    
+    @staticmethod
+    def _stamp_update(update_dict: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        """Ergänzt updated_at wie update_one/update_many (ohne das Original zu verändern)"""
+        if any(key.startswith('$') for key in update_dict.keys()):
+            update_dict = dict(update_dict)
+            update_dict['$set'] = {**update_dict.get('$set', {}), 'updated_at': now}
+            return update_dict
+        return {'$set': {**update_dict, 'updated_at': now}}
+    
+    def _build_bulk_operation(self, collection_name: str, op: Dict[str, Any],
+                              timestamps: bool, scoped: bool, now: datetime):
+        """
+        Übersetzt eine Operation im Format des MongoDB-bulkWrite-Befehls
+        (z.B. {'updateOne': {'filter': ..., 'update': ..., 'upsert': True}})
+        in ein PyMongo-Operationsobjekt inkl. ID-Konvertierung, Department-Scoping,
+        Department-Default und Timestamps.
+        """
+        if not isinstance(op, dict) or len(op) != 1:
+            raise ValueError(f"Ungültige Bulk-Operation: {op!r}")
+        kind, spec = next(iter(op.items()))
+        if kind not in self._BULK_OPERATIONS:
+            raise ValueError(f"Unbekannte Bulk-Operation: {kind}")
+        
+        if kind == 'insertOne':
+            document = spec['document']
+            if timestamps:
+                document.setdefault('created_at', now)
+                document['updated_at'] = now
+            if scoped:
+                document = self._ensure_department_on_insert(collection_name, document)
+            return InsertOne(document)
+        
+        filter_dict = spec.get('filter', {})
+        processed_filter = self._process_filter_ids(filter_dict)
+        if scoped:
+            processed_filter = self._augment_filter_with_department(collection_name, processed_filter)
+        
+        if kind == 'deleteOne':
+            return DeleteOne(processed_filter)
+        if kind == 'deleteMany':
+            return DeleteMany(processed_filter)
+        
+        upsert = spec.get('upsert', False)
+        scoped_collection = scoped and collection_name in self._SCOPED_COLLECTIONS
+        current_department = self._department_for_write() if scoped_collection else None
+        
+        if kind == 'replaceOne':
+            replacement = spec['replacement']
+            if timestamps:
+                replacement['updated_at'] = now
+            if current_department and 'department' not in replacement:
+                replacement['department'] = current_department
+            return ReplaceOne(processed_filter, replacement, upsert=upsert)
+        
+        update_dict = self._stamp_update(spec['update'], now) if timestamps else spec['update']
+        if upsert:
+            on_insert = dict(update_dict.get('$setOnInsert', {}))
+            if timestamps and 'created_at' not in update_dict.get('$set', {}):
+                on_insert.setdefault('created_at', now)
+            if current_department and 'department' not in update_dict.get('$set', {}):
+                on_insert.setdefault('department', current_department)
+            if on_insert:
+                update_dict = {**update_dict, '$setOnInsert': on_insert}
+        operation_class = UpdateOne if kind == 'updateOne' else UpdateMany
+        return operation_class(processed_filter, update_dict, upsert=upsert)
+    
+    @_instrumented('bulk_write', filter_arg=None,
+                   count=lambda r: r['inserted'] + r['modified'] + r['upserted'] + r['deleted'])
+    def bulk_write(self, collection_name: str, ops: Iterable[Dict[str, Any]],
+                   ordered: bool = False, batch_size: Optional[int] = None,
+                   timestamps: bool = True, scoped: bool = True) -> Dict[str, Any]:
+        """
+        Führt viele Schreiboperationen gebündelt aus.
+        
+        ops ist ein beliebiges Iterable (auch ein Generator) von Operationen im
+        bulkWrite-Format: insertOne, updateOne, updateMany, replaceOne, deleteOne,
+        deleteMany. Filter werden wie bei update_one behandelt (String-IDs,
+        Department-Scoping), neue Dokumente erhalten Department und Timestamps.
+        Mit timestamps=False bzw. scoped=False entfallen Timestamps bzw.
+        Department-Scoping und -Default (z.B. bei Restores über alle Departments).
+        
+        Die Operationen werden in Batches von batch_size gesendet. Bei ordered=True
+        bricht die Verarbeitung beim ersten Fehler ab, sonst laufen alle Batches.
+        
+        Returns:
+            Dict mit Summen (inserted, matched, modified, upserted, deleted),
+            upserted_ids (Index -> ID) und errors (Index, Code, Meldung) –
+            Indizes beziehen sich auf die Position in ops.
+        """
+        collection = self.get_collection(collection_name)
+        batch_size = batch_size or Config.MONGODB_BULK_BATCH_SIZE
+        now = datetime.now()
+        result = {
+            'inserted': 0, 'matched': 0, 'modified': 0, 'upserted': 0, 'deleted': 0,
+            'upserted_ids': {}, 'errors': [], 'batches': 0,
+        }
+        
+        def apply_counts(details: Dict[str, Any], indices: List[int]):
+            result['inserted'] += details.get('nInserted', 0)
+            result['matched'] += details.get('nMatched', 0)
+            result['modified'] += details.get('nModified', 0)
+            result['upserted'] += details.get('nUpserted', 0)
+            result['deleted'] += details.get('nRemoved', 0)
+            for upserted in details.get('upserted', []):
+                result['upserted_ids'][indices[upserted['index']]] = str(upserted['_id'])
+        
+        def flush(batch: List[Any], indices: List[int]) -> bool:
+            result['batches'] += 1
+            try:
+                apply_counts(collection.bulk_write(batch, ordered=ordered).bulk_api_result, indices)
+                return True
+            except BulkWriteError as e:
+                apply_counts(e.details, indices)
+                for error in e.details.get('writeErrors', []):
+                    result['errors'].append({
+                        'index': indices[error.get('index', 0)],
+                        'code': error.get('code'),
+                        'message': error.get('errmsg'),
+                    })
+                return not ordered
+        
+        # indices: Position jeder Batch-Operation in ops (für Fehlermeldungen)
+        batch, indices = [], []
+        try:
+            for index, op in enumerate(ops):
+                try:
+                    batch.append(self._build_bulk_operation(collection_name, op, timestamps, scoped, now))
+                    indices.append(index)
+                except (ValueError, KeyError, TypeError) as e:
+                    result['errors'].append({'index': index, 'code': None, 'message': f"Ungültige Operation: {e}"})
+                    if ordered:
+                        break
+                    continue
+                if len(batch) >= batch_size:
+                    if not flush(batch, indices):
+                        return result
+                    batch, indices = [], []
+            if batch:
+                flush(batch, indices)
+        finally:
+            if result['batches']:
+                self._after_write(collection_name)
+        
+        if result['errors']:
+            logger.warning(f"bulk_write auf {collection_name}: {len(result['errors'])} Fehler")
+        return result
+    
+    @_instrumented('delete_one')
     def delete_one(self, collection_name: str, filter_dict: Dict[str, Any]) -> bool:
         """Löscht ein Dokument aus einer Collection"""
         collection = self.get_collection(collection_name)
@@ -328,8 +943,10 @@ class MongoDBDatabase:
         processed_filter = self._augment_filter_with_department(collection_name, processed_filter)
         
         result = collection.delete_one(processed_filter)
+        self._after_write(collection_name)
         return result.deleted_count > 0
     
+    @_instrumented('delete_many')
     def delete_many(self, collection_name: str, filter_dict: Dict[str, Any]) -> int:
         """Löscht mehrere Dokumente aus einer Collection"""
         collection = self.get_collection(collection_name)
@@ -339,8 +956,10 @@ class MongoDBDatabase:
         processed_filter = self._augment_filter_with_department(collection_name, processed_filter)
         
         result = collection.delete_many(processed_filter)
+        self._after_write(collection_name)
         return result.deleted_count
     
+    @_instrumented('count_documents', explainable=True)
     def count_documents(self, collection_name: str, filter_dict: Dict[str, Any] = None) -> int:
         """Zählt Dokumente in einer Collection"""
         collection = self.get_collection(collection_name)
@@ -354,27 +973,57 @@ class MongoDBDatabase:
         
         return collection.count_documents(processed_filter)
     
-    def aggregate(self, collection_name: str, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Führt eine Aggregation-Pipeline aus"""
+    @_instrumented('aggregate', filter_arg=(0, 'pipeline'))
+    def aggregate(self, collection_name: str, pipeline: List[Dict[str, Any]],
+                  projection: Union[Dict[str, Any], List[str], None] = None) -> List[Dict[str, Any]]:
+        """Führt eine Aggregation-Pipeline aus
+
+        projection wird als abschließende $project-Stage angehängt.
+        """
         collection = self.get_collection(collection_name)
-        # Department-Scoping vorschalten (abwärtskompatibel)
-        current_department = self._get_current_department()
-        if collection_name in self._SCOPED_COLLECTIONS and current_department:
-            scoped_match = {'$match': {'$or': [
-                {'department': current_department},
-                {'department': {'$exists': False}}
-            ]}}
-            pipeline = [scoped_match] + (pipeline or [])
-        cursor = collection.aggregate(pipeline)
+        cursor = collection.aggregate(self._scope_pipeline(collection_name, pipeline, projection))
         
         results = []
         for doc in cursor:
             # ObjectId zu String konvertieren
-            doc['_id'] = str(doc['_id'])
+            if '_id' in doc:
+                doc['_id'] = str(doc['_id'])
             results.append(doc)
         
         return results
     
+    @_instrumented('iter_aggregate', filter_arg=(0, 'pipeline'))
+    def iter_aggregate(self, collection_name: str, pipeline: List[Dict[str, Any]],
+                       projection: Union[Dict[str, Any], List[str], None] = None,
+                       batch_size: int = None, allow_disk_use: bool = False) -> Iterator[Dict[str, Any]]:
+        """Führt eine Aggregation-Pipeline aus und liefert die Ergebnisse als Generator"""
+        collection = self.get_collection(collection_name)
+        cursor = collection.aggregate(self._scope_pipeline(collection_name, pipeline, projection),
+                                      batchSize=batch_size or Config.MONGODB_CURSOR_BATCH_SIZE,
+                                      allowDiskUse=allow_disk_use)
+        try:
+            for doc in cursor:
+                if '_id' in doc:
+                    doc['_id'] = str(doc['_id'])
+                yield doc
+        finally:
+            cursor.close()
+    
+    def _scope_pipeline(self, collection_name: str, pipeline: List[Dict[str, Any]],
+                        projection: Union[Dict[str, Any], List[str], None] = None) -> List[Dict[str, Any]]:
+        """Schaltet Department-Scoping vor und hängt optional eine $project-Stage an"""
+        pipeline = list(pipeline or [])
+        # Department-Scoping vorschalten (Modus siehe _department_scope_clause)
+        current_department = self._get_current_department()
+        if collection_name in self._SCOPED_COLLECTIONS and current_department:
+            scoped_match = {'$match': self._department_scope_clause(current_department)}
+            pipeline = [scoped_match] + pipeline
+        projection = self._normalize_projection(projection)
+        if projection:
+            pipeline = pipeline + [{'$project': projection}]
+        return pipeline
+    
+    @_instrumented('distinct', filter_arg=(1, 'filter_dict'))
     def distinct(self, collection_name: str, field: str, filter_dict: Dict[str, Any] = None) -> List[Any]:
         """Gibt eindeutige Werte eines Feldes zurück"""
         collection = self.get_collection(collection_name)
@@ -430,6 +1079,7 @@ class MongoDBDatabase:
         """Löscht eine Collection"""
         collection = self.get_collection(collection_name)
         collection.drop()
+        self._after_write(collection_name)
     
     def close(self):
         """Schließt die MongoDB-Verbindung"""
@@ -485,6 +1135,14 @@ class LazyMongoDB:
 
 mongodb = LazyMongoDB() 
 
+def _reset_mongodb_after_fork():
+    if _mongodb_instance is not None:
+        _mongodb_instance._reset_after_fork()
+
+# Nach einem Fork (z.B. gunicorn-Worker mit --preload) eigenen Client aufbauen
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_mongodb_after_fork)
+
 def get_feature_settings():
     """Holt alle Feature-Einstellungen (Legacy-Funktion)"""
     try:
@@ -111,6 +111,8 @@ class User(UserMixin):
                 {'_id': user_id},
                 {'$set': {'timesheet_enabled': enabled}}
             )
+            from app.utils.principal_cache import invalidate_principal_cache
+            invalidate_principal_cache()
         except Exception as e:
             # Logge den Fehler, aber falle nicht aus
             import logging
@@ -123,6 +125,8 @@ class User(UserMixin):
                 {'_id': user_id},
                 {'$set': {'canteen_plan_enabled': enabled}}
             )
+            from app.utils.principal_cache import invalidate_principal_cache
+            invalidate_principal_cache()
         except Exception as e:
             # Logge den Fehler, aber falle nicht aus
             import logging
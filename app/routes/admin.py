@@ -4487,6 +4487,51 @@ def fix_id_for_import(doc):
     
     return cleaned_doc
 
+def _import_sheet(excel_file, sheet_name, collection_name, key_field, label, errors, allowed_keys=None):
+    """
+    Importiert ein Arbeitsblatt per bulk_write: pro Zeile ein Upsert über key_field.
+    Fehler werden mit Excel-Zeilennummer in errors gesammelt.
+    
+    Returns:
+        Anzahl importierter (eingefügter oder aktualisierter) Datensätze
+    """
+    try:
+        rows = pd.read_excel(excel_file, sheet_name=sheet_name).to_dict('records')
+    except Exception as e:
+        errors.append(f"Fehler beim Lesen der {sheet_name}-Tabelle: {str(e)}")
+        return 0
+    
+    # Position der Operation in ops -> Excel-Zeile (Kopfzeile + 1-basiert)
+    row_numbers = []
+    
+    def build_ops():
+        for index, row in enumerate(rows):
+            try:
+                data = fix_id_for_import(row)
+            except Exception as e:
+                errors.append(f"Zeile {index + 2}: Fehler bei {label}: {str(e)}")
+                continue
+            
+            key = data.get(key_field)
+            if allowed_keys is not None and key not in allowed_keys:
+                errors.append(f"Zeile {index + 2}: Ungültige {label} '{key}' übersprungen")
+                continue
+            if not key:
+                errors.append(f"Zeile {index + 2}: {label} ohne Barcode übersprungen")
+                continue
+            
+            update = {'$set': data}
+            # _id nur bei Neuanlage setzen, bestehende Dokumente behalten ihre ID
+            if '_id' in data:
+                update['$setOnInsert'] = {'_id': data.pop('_id')}
+            row_numbers.append(index + 2)
+            yield {'updateOne': {'filter': {key_field: key}, 'update': update, 'upsert': True}}
+    
+    result = mongodb.bulk_write(collection_name, build_ops())
+    for error in result['errors']:
+        errors.append(f"Zeile {row_numbers[error['index']]}: Fehler bei {label}: {error['message']}")
+    return result['matched'] + result['upserted']
+
 @bp.route('/import_all_data', methods=['POST'])
 @admin_required
 def import_all_data():
@@ -4523,115 +4568,22 @@ def import_all_data():
             imported_count = 0
             errors = []
             
-            # Importiere Werkzeuge
-            if 'Werkzeuge' in excel_file.sheet_names:
-                try:
-                    df_tools = pd.read_excel(excel_file, sheet_name='Werkzeuge')
-                    for index, row in df_tools.iterrows():
-                        try:
-                            tool_data = row.to_dict()
-                            tool_data = fix_id_for_import(tool_data)
-                            
-                            # Prüfe ob Barcode vorhanden ist
-                            if not tool_data.get('barcode'):
-                                errors.append(f"Zeile {index + 2}: Werkzeug ohne Barcode übersprungen")
-                                continue
-                            
-                            existing = mongodb.find_one('tools', {'barcode': tool_data.get('barcode')})
-                            if not existing:
-                                mongodb.insert_one('tools', tool_data)
-                                imported_count += 1
-                            else:
-                                # Update existierendes Werkzeug
-                                mongodb.update_one('tools', {'barcode': tool_data.get('barcode')}, {'$set': tool_data})
-                                imported_count += 1
-                        except Exception as e:
-                            errors.append(f"Zeile {index + 2}: Fehler bei Werkzeug: {str(e)}")
-                except Exception as e:
-                    errors.append(f"Fehler beim Lesen der Werkzeuge-Tabelle: {str(e)}")
-            
-            # Importiere Mitarbeiter
-            if 'Mitarbeiter' in excel_file.sheet_names:
-                try:
-                    df_workers = pd.read_excel(excel_file, sheet_name='Mitarbeiter')
-                    for index, row in df_workers.iterrows():
-                        try:
-                            worker_data = row.to_dict()
-                            worker_data = fix_id_for_import(worker_data)
-                            
-                            # Prüfe ob Barcode vorhanden ist
-                            if not worker_data.get('barcode'):
-                                errors.append(f"Zeile {index + 2}: Mitarbeiter ohne Barcode übersprungen")
-                                continue
-                            
-                            existing = mongodb.find_one('workers', {'barcode': worker_data.get('barcode')})
-                            if not existing:
-                                mongodb.insert_one('workers', worker_data)
-                                imported_count += 1
-                            else:
-                                # Update existierenden Mitarbeiter
-                                mongodb.update_one('workers', {'barcode': worker_data.get('barcode')}, {'$set': worker_data})
-                                imported_count += 1
-                        except Exception as e:
-                            errors.append(f"Zeile {index + 2}: Fehler bei Mitarbeiter: {str(e)}")
-                except Exception as e:
-                    errors.append(f"Fehler beim Lesen der Mitarbeiter-Tabelle: {str(e)}")
-            
-            # Importiere Verbrauchsmaterial
-            if 'Verbrauchsmaterial' in excel_file.sheet_names:
-                try:
-                    df_consumables = pd.read_excel(excel_file, sheet_name='Verbrauchsmaterial')
-                    for index, row in df_consumables.iterrows():
-                        try:
-                            consumable_data = row.to_dict()
-                            consumable_data = fix_id_for_import(consumable_data)
-                            
-                            # Prüfe ob Barcode vorhanden ist
-                            if not consumable_data.get('barcode'):
-                                errors.append(f"Zeile {index + 2}: Verbrauchsmaterial ohne Barcode übersprungen")
-                                continue
-                            
-                            existing = mongodb.find_one('consumables', {'barcode': consumable_data.get('barcode')})
-                            if not existing:
-                                mongodb.insert_one('consumables', consumable_data)
-                                imported_count += 1
-                            else:
-                                # Update existierendes Verbrauchsmaterial
-                                mongodb.update_one('consumables', {'barcode': consumable_data.get('barcode')}, {'$set': consumable_data})
-                                imported_count += 1
-                        except Exception as e:
-                            errors.append(f"Zeile {index + 2}: Fehler bei Verbrauchsmaterial: {str(e)}")
-                except Exception as e:
-                    errors.append(f"Fehler beim Lesen der Verbrauchsmaterial-Tabelle: {str(e)}")
+            # Werkzeuge, Mitarbeiter und Verbrauchsmaterial per Barcode upserten
+            for sheet_name, collection_name, label in [
+                ('Werkzeuge', 'tools', 'Werkzeug'),
+                ('Mitarbeiter', 'workers', 'Mitarbeiter'),
+                ('Verbrauchsmaterial', 'consumables', 'Verbrauchsmaterial'),
+            ]:
+                if sheet_name in excel_file.sheet_names:
+                    imported_count += _import_sheet(excel_file, sheet_name, collection_name, 'barcode', label, errors)
             
             # Importiere Settings (Kategorien, Standorte, Abteilungen)
             if 'Settings' in excel_file.sheet_names:
-                try:
-                    df_settings = pd.read_excel(excel_file, sheet_name='Settings')
-                    for index, row in df_settings.iterrows():
-                        try:
-                            setting_data = row.to_dict()
-                            setting_data = fix_id_for_import(setting_data)
-                            valid_settings = ['categories', 'locations', 'departments', 'ticket_categories', 
-                                            'label_tools_name', 'label_tools_icon', 'label_consumables_name', 
-                                            'label_consumables_icon', 'label_tickets_name', 'label_tickets_icon']
-                            
-                            if setting_data.get('key') in valid_settings:
-                                existing = mongodb.find_one('settings', {'key': setting_data.get('key')})
-                                if not existing:
-                                    mongodb.insert_one('settings', setting_data)
-                                    imported_count += 1
-                                else:
-                                    mongodb.update_one('settings', 
-                                                     {'key': setting_data.get('key')}, 
-                                                     {'$set': setting_data})
-                                    imported_count += 1
-                            else:
-                                errors.append(f"Zeile {index + 2}: Ungültige Setting '{setting_data.get('key')}' übersprungen")
-                        except Exception as e:
-                            errors.append(f"Zeile {index + 2}: Fehler bei Setting: {str(e)}")
-                except Exception as e:
-                    errors.append(f"Fehler beim Lesen der Settings-Tabelle: {str(e)}")
+                valid_settings = ['categories', 'locations', 'departments', 'ticket_categories', 
+                                'label_tools_name', 'label_tools_icon', 'label_consumables_name', 
+                                'label_consumables_icon', 'label_tickets_name', 'label_tickets_icon']
+                imported_count += _import_sheet(excel_file, 'Settings', 'settings', 'key', 'Setting', errors,
+                                                allowed_keys=valid_settings)
             
             # Zeige Erfolgsmeldung und eventuelle Fehler
             if errors:
@@ -5253,11 +5205,11 @@ def import_json_backup_status(job_id: str):
 @login_required
 @admin_required
 def check_version():
-    """Prüft ob Updates verfügbar sind"""
+    """Prüft ob Updates verfügbar sind (fragt GitHub sofort ab)"""
     try:
         from app.utils.version_checker import check_version
         
-        result = check_version()
+        result = check_version(force=True)
         return jsonify(result)
         
     except Exception as e:
@@ -5314,6 +5266,41 @@ def get_version_info():
             'message': f'Fehler beim Abrufen der Versionsinformationen: {str(e)}'
         }), 500
 
+@bp.route('/system/db-pool', methods=['GET'])
+@login_required
+@admin_required
+def db_pool_stats():
+    """Gibt Kennzahlen des MongoDB-Connection-Pools dieses Worker-Prozesses zurück"""
+    try:
+        return jsonify({
+            'status': 'success',
+            'pool': mongodb.get_pool_stats()
+        })
+    except Exception as e:
+        logger.error(f"Fehler beim Abrufen der Pool-Statistik: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f'Fehler beim Abrufen der Pool-Statistik: {str(e)}'
+        }), 500
+
+@bp.route('/system/indexes', methods=['GET'])
+@login_required
+@admin_required
+def index_report():
+    """Index-Report: fehlende, ungenutzte und nicht registrierte Indizes sowie unindizierte langsame Abfragen"""
+    try:
+        from app.services.index_report_service import IndexReportService
+        return jsonify({
+            'status': 'success',
+            'report': IndexReportService.build_report()
+        })
+    except Exception as e:
+        logger.error(f"Fehler beim Erstellen des Index-Reports: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f'Fehler beim Erstellen des Index-Reports: {str(e)}'
+        }), 500
+
 @bp.route('/version', methods=['GET'])
 @login_required
 @admin_required
@@ -3,6 +3,7 @@ from flask_login import current_user
 from app.models.mongodb_models import MongoDBTool, MongoDBWorker, MongoDBConsumable
 from app.utils.decorators import admin_required, login_required, mitarbeiter_required
 from app.models.mongodb_database import mongodb
+from app.utils.http_cache import collection_version, is_not_modified, make_etag, not_modified_response, with_validators
 import logging
 import barcode
 from barcode.writer import ImageWriter
@@ -23,11 +24,18 @@ def log_request_info():
 def get_workers():
     """Gibt alle aktiven Mitarbeiter zurück"""
     try:
-        workers = list(mongodb.find('workers', {'deleted': {'$ne': True}}, sort=[('lastname', 1), ('firstname', 1)]))
-        return jsonify({
+        # Stand vorab ermitteln: unveränderte Liste nicht erneut laden und serialisieren
+        count, last_modified = collection_version('workers', {'deleted': {'$ne': True}})
+        etag = make_etag('workers', count, last_modified)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        
+        workers = list(mongodb.find('workers', {'deleted': {'$ne': True}}, sort=[('lastname', 1), ('firstname', 1)],
+                                    projection=['barcode', 'firstname', 'lastname', 'department', 'email']))
+        return with_validators(jsonify({
             'success': True,
             'workers': workers
-        })
+        }), etag, last_modified)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -46,16 +54,24 @@ def get_tool(barcode):
                 'message': 'Werkzeug nicht gefunden'
             }), 404
         
+        # Stand aus Werkzeug und Ausleihhistorie: Historie nur bei Änderungen laden
+        lending_count, lendings_modified = collection_version('lendings', {'tool_barcode': barcode})
+        last_modified = max((value for value in (tool.get('updated_at'), lendings_modified)
+                             if isinstance(value, datetime)), default=None)
+        etag = make_etag('tool', str(tool.get('_id')), tool.get('updated_at'), lending_count, lendings_modified)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        
         # Hole Ausleihhistorie
         lendings = mongodb.find('lendings', {'tool_barcode': barcode}, sort=[('lent_at', -1)])
         
         tool['lending_history'] = lendings
         tool['type'] = 'tool'  # Typ hinzufügen für Quickscan
         
-        return jsonify({
+        return with_validators(jsonify({
             'success': True,
             'tool': tool
-        })
+        }), etag, last_modified)
         
     except Exception as e:
         logger.error(f"Fehler beim Laden des Werkzeugs: {str(e)}")
@@ -333,8 +349,13 @@ def get_consumable_forecast(barcode):
 def get_notices():
     """Gibt alle aktiven Hinweise zurück"""
     try:
+        count, last_modified = collection_version('homepage_notices', {'is_active': True})
+        etag = make_etag('notices', count, last_modified)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        
         notices = list(mongodb.find('homepage_notices', {'is_active': True}, sort=[('priority', -1), ('created_at', -1)]))
-        return jsonify({'success': True, 'notices': notices})
+        return with_validators(jsonify({'success': True, 'notices': notices}), etag, last_modified)
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
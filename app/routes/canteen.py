@@ -8,7 +8,7 @@ from app.utils.decorators import admin_required, mitarbeiter_required
 from app.services.canteen_service import CanteenService
 from app.models.mongodb_database import is_feature_enabled
 from app.config.config import config
-from datetime import datetime, timedelta
+from app.utils.http_cache import conditional_json
 import logging
 import os
 
@@ -156,45 +156,14 @@ def api_current_week():
         if config.get('CANTEEN_API_KEY') and api_key != config.get('CANTEEN_API_KEY'):
             return jsonify({'success': False, 'error': 'Invalid API key'}), 401
         
-        service = CanteenService()
-        meals = service.get_current_week_meals()
+        # Gecachte Wochendaten (stale-while-revalidate, siehe CanteenService.get_api_days)
+        data = CanteenService().get_api_days(weeks=1)
         
-        # Formatiere für WordPress-Kompatibilität
-        week_data = []
-        weekdays = ['Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag']
-        
-        for i, meal in enumerate(meals):
-            date = meal.get('date', '')
-            meat_dish = meal.get('meat_dish', '').strip()
-            vegan_dish = meal.get('vegan_dish', '').strip()
-            dessert = meal.get('dessert', '').strip()
-
-            # Datum ohne Wochentag (Format: 15.01.2024)
-            if date:
-                try:
-                    date_obj = datetime.strptime(date, '%Y-%m-%d')
-                    date_label = date_obj.strftime('%d.%m.%Y')
-                except:
-                    date_label = date
-            else:
-                # Fallback: Datum anhand aktueller Woche bestimmen
-                today = datetime.now()
-                monday = today - timedelta(days=today.weekday())
-                target_date = monday + timedelta(days=i)
-                date_label = target_date.strftime('%d.%m.%Y')
-
-            week_data.append({
-                'date': date_label,
-                'weekday': weekdays[i % 5],
-                'meat_dish': meat_dish,
-                'vegan_dish': vegan_dish,
-                'dessert': dessert
-            })
-        
-        return jsonify({
+        # ETag aus dem Inhalt (ohne generated_at): unveränderte Woche liefert 304
+        return conditional_json({
             'success': True,
-            'week': week_data,
-            'generated_at': datetime.now().isoformat()
+            'week': data['days'],
+            'generated_at': data['generated_at']
         })
         
     except Exception as e:
@@ -210,43 +179,12 @@ def api_two_weeks():
         if config.get('CANTEEN_API_KEY') and api_key != config.get('CANTEEN_API_KEY'):
             return jsonify({'success': False, 'error': 'Invalid API key'}), 401
         
-        service = CanteenService()
-        meals = service.get_two_weeks_meals()
-        
-        # Formatiere für WordPress-Kompatibilität
-        two_weeks_data = []
-        weekdays = ['Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag']
-        
-        for i, meal in enumerate(meals):
-            date = meal.get('date', '')
-            meat_dish = meal.get('meat_dish', '').strip()
-            vegan_dish = meal.get('vegan_dish', '').strip()
-            dessert = meal.get('dessert', '').strip()
-
-            if date:
-                try:
-                    date_obj = datetime.strptime(date, '%Y-%m-%d')
-                    date_label = date_obj.strftime('%d.%m.%Y')
-                except:
-                    date_label = date
-            else:
-                today = datetime.now()
-                monday = today - timedelta(days=today.weekday())
-                target_date = monday + timedelta(days=i)
-                date_label = target_date.strftime('%d.%m.%Y')
-
-            two_weeks_data.append({
-                'date': date_label,
-                'weekday': weekdays[i % 5],
-                'meat_dish': meat_dish,
-                'vegan_dish': vegan_dish,
-                'dessert': dessert
-            })
+        data = CanteenService().get_api_days(weeks=2)
         
-        return jsonify({
+        return conditional_json({
             'success': True,
-            'two_weeks': two_weeks_data,
-            'generated_at': datetime.now().isoformat()
+            'two_weeks': data['days'],
+            'generated_at': data['generated_at']
         })
         
     except Exception as e:
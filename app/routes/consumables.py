@@ -7,6 +7,7 @@ from app.utils.database_helpers import get_categories_scoped, get_locations_scop
 from datetime import datetime, timedelta
 import logging
 from app.services.consumable_service import ConsumableService
+from app.services.lending_service import LendingService
 
 # Blueprint mit URL-Präfix definieren
 bp = Blueprint('consumables', __name__, url_prefix='/consumables')
@@ -29,7 +30,9 @@ def index():
         filter_query = {}
         if getattr(g, 'current_department', None):
             filter_query['department'] = g.current_department
-        consumables = list(mongodb.find('consumables', filter_query, sort=[('name', 1)]))
+        consumables = list(mongodb.find('consumables', filter_query, sort=[('name', 1)],
+                                        projection=['name', 'barcode', 'category', 'location', 'quantity',
+                                                    'min_quantity', 'preview_image', 'department', 'deleted']))
         
         # Hole Kategorien und Standorte strikt abteilungsgetrennt
         categories = get_categories_scoped()
@@ -405,6 +408,21 @@ def usage_history(barcode):
         logger.error(f"Fehler beim Laden der Nutzungshistorie: {str(e)}", exc_info=True)
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@bp.route('/recent-usage')
+@login_required
+@permission_required('consumables', 'view')
+def recent_usage():
+    """Letzte Entnahmen als JSON; weitere Seiten über ?cursor=<next_cursor> ("Mehr laden")"""
+    try:
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        page = LendingService.get_consumable_usage_page(limit, request.args.get('cursor') or None)
+        return jsonify({'success': True, **page})
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Fehler beim Laden der letzten Entnahmen: {str(e)}", exc_info=True)
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @bp.route('/categories', methods=['GET', 'POST'])
 @login_required
 def category_management():
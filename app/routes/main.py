@@ -24,10 +24,7 @@ def index():
         # Prüfe ob MongoDB verfügbar ist
         try:
             # Teste die Verbindung
-            if mongodb._client is not None:
-                mongodb._client.admin.command('ping')
-            else:
-                raise Exception("MongoDB-Verbindung nicht initialisiert")
+            mongodb.client.admin.command('ping')
         except Exception as db_error:
             current_app.logger.error(f"MongoDB-Verbindung nicht verfügbar: {str(db_error)}")
             # Wähle das Template basierend auf der Benutzerrolle
@@ -84,6 +84,8 @@ def process():
                         logger.warning(f"Ungültiges Rückgabedatum-Format: {expected_return_date}")
                         # Standard: 2 Wochen falls Parsing fehlschlägt
                         lending_data['expected_return_date'] = datetime.now() + timedelta(days=14)
+                    # Kanonisches, indiziertes Fälligkeitsdatum für die Überfälligkeitsabfrage
+                    lending_data['due_at'] = LendingService.canonical_due_at(lending_data['expected_return_date'])
                 mongodb.insert_one('lendings', lending_data)
                 
                 # Status des Werkzeugs aktualisieren
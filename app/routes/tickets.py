@@ -7,6 +7,7 @@ from app.utils.permissions import permission_required
 from app.utils.database_helpers import get_ticket_categories_from_settings, get_categories_from_settings, get_next_ticket_number, get_departments_from_settings
 from app.models.user import User
 from app.services.ticket_service import TicketService
+from app.services.ticket_detail_loader import TicketDetailLoader
 import logging
 from datetime import datetime
 
@@ -788,8 +789,13 @@ def view(ticket_id):
     """Zeigt die Details eines Tickets für den Benutzer."""
     logging.info(f"Lade Ticket {ticket_id} für Benutzer {current_user.username}")
     
-    # Robuste ID-Behandlung für verschiedene ID-Typen
-    ticket = find_document_by_id('tickets', ticket_id)
+    # Ticket mit Nachrichten, Auftragsdaten, Zuweisungen und Benutzern in einer Abfrage
+    details = TicketDetailLoader.load(
+        ticket_id,
+        sections=('messages', 'auftrag_details', 'arbeit_list', 'assignments'),
+        include_users=True
+    )
+    ticket = details['ticket'] if details else None
     
     if not ticket:
         logging.error(f"Ticket {ticket_id} nicht gefunden")
@@ -808,14 +814,8 @@ def view(ticket_id):
     logging.info(f"Hole Nachrichten für Ticket {ticket_id}")
     
     try:
-        # Verwende die Ticket-ID für alle Abfragen
-        ticket_id_for_query = convert_id_for_query(ticket_id)
-        
-        messages = mongodb.find('ticket_messages', {'ticket_id': ticket_id_for_query})
-        messages = list(messages)
-        
-        # Sortiere Nachrichten nach Datum (älteste zuerst)
-        messages.sort(key=lambda x: x.get('created_at', datetime.min))
+        # Nachrichten sind bereits nach Datum sortiert (älteste zuerst)
+        messages = details['messages']
         
         # Formatiere Datum für jede Nachricht
         for msg in messages:
@@ -829,14 +829,8 @@ def view(ticket_id):
         # Füge id-Feld hinzu (für Template-Kompatibilität)
         ticket['id'] = str(ticket['_id'])
         
-        # Hole die Auftragsdetails
-        auftrag_details = mongodb.find_one('auftrag_details', {'ticket_id': ticket_id_for_query})
-        
-        # Hole Materialliste
-        material_list = list(mongodb.find('auftrag_material', {'ticket_id': ticket_id_for_query}))
-        
-        # Hole Arbeitsliste
-        arbeit_list = list(mongodb.find('auftrag_arbeit', {'ticket_id': ticket_id_for_query}))
+        auftrag_details = details['auftrag_details']
+        arbeit_list = details['arbeit_list']
         
         # Berechne die Summe der Arbeitsstunden aus der Arbeitsliste
         total_arbeitsstunden = 0
@@ -887,17 +881,9 @@ def view(ticket_id):
         # Hole alle Kategorien aus der settings Collection
         categories = get_ticket_categories_from_settings()
         
-        # Hole alle Benutzer für die Zuweisung (falls benötigt)
-        users = mongodb.find('users', {'is_active': True})
-        users = [dict(user) for user in users]
-        
-        # Hole alle zugewiesenen Nutzer (Mehrfachzuweisung)
-        assigned_users_raw = mongodb.find('ticket_assignments', {'ticket_id': ticket_id_for_query})
-        assigned_users = [assignment['assigned_to'] for assignment in assigned_users_raw]
-        
-        # Falls keine Mehrfachzuweisungen vorhanden, verwende die Legacy-Zuweisung
-        if not assigned_users and ticket.get('assigned_to'):
-            assigned_users = [ticket['assigned_to']]
+        # Benutzer für die Zuweisung und zugewiesene Nutzer (inkl. Legacy-Zuweisung)
+        users = details['users']
+        assigned_users = details['assigned_users']
         
         return render_template('tickets/view.html', 
                              ticket=ticket, 
@@ -1041,8 +1027,13 @@ def detail(id):
     try:
         print(f"DEBUG: Ticket-Detail aufgerufen für ID: {id}")
         
-        # Robuste ID-Behandlung für verschiedene ID-Typen
-        ticket = find_document_by_id('tickets', id)
+        # Ticket mit Notizen, Nachrichten, Auftragsdaten, Zuweisungen und Benutzern in einer Abfrage
+        details = TicketDetailLoader.load(
+            id,
+            sections=('notes', 'messages', 'auftrag_details', 'material_list', 'assignments'),
+            include_users=True
+        )
+        ticket = details['ticket'] if details else None
         
         if not ticket:
             print(f"DEBUG: Ticket nicht gefunden für ID: {id}")
@@ -1067,32 +1058,12 @@ def detail(id):
                 except (ValueError, TypeError):
                     ticket[field] = None
             
-        # Hole die Notizen für das Ticket
-        notes = mongodb.find('ticket_notes', {'ticket_id': convert_id_for_query(id)})
-
-        # Hole die Nachrichten für das Ticket
-        messages = mongodb.find('ticket_messages', {'ticket_id': convert_id_for_query(id)})
-
-        # Hole die Auftragsdetails
-        auftrag_details = mongodb.find_one('auftrag_details', {'ticket_id': convert_id_for_query(id)})
-        
-        # Hole Materialliste
-        material_list = list(mongodb.find('auftrag_material', {'ticket_id': convert_id_for_query(id)}))
-        
-        # Hole Arbeitsliste
-        arbeit_list = list(mongodb.find('auftrag_arbeit', {'ticket_id': convert_id_for_query(id)}))
-
-        # Hole alle Benutzer aus der Hauptdatenbank und wandle sie in Dicts um
-        users = mongodb.find('users', {'is_active': True})
-        users = [dict(user) for user in users]
-
-        # Hole alle zugewiesenen Nutzer (Mehrfachzuweisung)
-        assigned_users_raw = mongodb.find('ticket_assignments', {'ticket_id': convert_id_for_query(id)})
-        assigned_users = [assignment['assigned_to'] for assignment in assigned_users_raw]
-        
-        # Falls keine Mehrfachzuweisungen vorhanden, verwende die Legacy-Zuweisung
-        if not assigned_users and ticket.get('assigned_to'):
-            assigned_users = [ticket['assigned_to']]
+        notes = details['notes']
+        messages = details['messages']
+        auftrag_details = details['auftrag_details']
+        material_list = details['material_list']
+        users = details['users']
+        assigned_users = details['assigned_users']
 
         # Hole alle Kategorien aus der settings Collection
         categories = get_ticket_categories_from_settings()
@@ -1172,15 +1143,15 @@ def delete(id):
 @permission_required('tickets', 'view')
 def auftrag_details_modal(id):
     try:
-        # Robuste ID-Behandlung für verschiedene ID-Typen
-        ticket = find_document_by_id('tickets', id)
+        # Ticket mit Notizen, Nachrichten und Auftragsdaten in einer Abfrage
+        details = TicketDetailLoader.load(
+            id, sections=('notes', 'messages', 'auftrag_details', 'material_list', 'arbeit_list')
+        )
+        ticket = details['ticket'] if details else None
         
         if not ticket:
             return render_template('404.html'), 404
         
-        # Verwende die Ticket-ID für alle Abfragen
-        ticket_id_for_query = convert_id_for_query(id)
-        
         # Füge id-Feld hinzu (für Template-Kompatibilität)
         ticket['id'] = str(ticket['_id'])
         
@@ -1193,20 +1164,11 @@ def auftrag_details_modal(id):
                 except (ValueError, TypeError):
                     ticket[field] = None
             
-        # Hole die Notizen für das Ticket
-        notes = mongodb.find('ticket_notes', {'ticket_id': ticket_id_for_query})
-
-        # Hole die Nachrichten für das Ticket
-        messages = mongodb.find('ticket_messages', {'ticket_id': ticket_id_for_query})
-
-        # Hole die Auftragsdetails
-        auftrag_details = mongodb.find_one('auftrag_details', {'ticket_id': ticket_id_for_query})
-        
-        # Hole Materialliste
-        material_list = list(mongodb.find('auftrag_material', {'ticket_id': ticket_id_for_query}))
-        
-        # Hole Arbeitsliste
-        arbeit_list = list(mongodb.find('auftrag_arbeit', {'ticket_id': convert_id_for_query(id)}))
+        notes = details['notes']
+        messages = details['messages']
+        auftrag_details = details['auftrag_details']
+        material_list = details['material_list']
+        arbeit_list = details['arbeit_list']
 
         return render_template('tickets/auftrag_details_modal.html', 
                              ticket=ticket, 
@@ -2074,8 +2036,12 @@ def _handle_auftrag_creation(external=False):
 @permission_required('tickets', 'view')
 def auftrag_details_page(id):
     try:
-        # Robuste ID-Behandlung für verschiedene ID-Typen
-        ticket = find_document_by_id('tickets', id)
+        # Ticket mit Notizen, Nachrichten und Auftragsdaten in einer Abfrage;
+        # die Arbeitsliste ergibt sich aus den ausgeführten Arbeiten
+        details = TicketDetailLoader.load(
+            id, sections=('notes', 'messages', 'auftrag_details', 'material_list')
+        )
+        ticket = details['ticket'] if details else None
         
         if not ticket:
             return render_template('404.html'), 404
@@ -2099,23 +2065,10 @@ def auftrag_details_page(id):
                 except (ValueError, TypeError):
                     ticket[field] = None
         
-        # Verwende die Ticket-ID für alle Abfragen
-        ticket_id_for_query = convert_id_for_query(id)
-            
-        # Hole die Notizen für das Ticket
-        notes = mongodb.find('ticket_notes', {'ticket_id': ticket_id_for_query})
-
-        # Hole die Nachrichten für das Ticket
-        messages = mongodb.find('ticket_messages', {'ticket_id': ticket_id_for_query})
-
-        # Hole die Auftragsdetails
-        auftrag_details = mongodb.find_one('auftrag_details', {'ticket_id': ticket_id_for_query})
-        
-        # Hole Materialliste
-        material_list = list(mongodb.find('auftrag_material', {'ticket_id': ticket_id_for_query}))
-        
-        # Hole Arbeitsliste
-        arbeit_list = list(mongodb.find('auftrag_arbeit', {'ticket_id': ticket_id_for_query}))
+        notes = details['notes']
+        messages = details['messages']
+        auftrag_details = details['auftrag_details']
+        material_list = details['material_list']
         
         # Verarbeite die ausgeführten Arbeiten aus den Auftragsdetails
         arbeit_list = []
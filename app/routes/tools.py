@@ -43,7 +43,7 @@ def get_software_presets():
     """Holt die Software-Pakete aus der Datenbank"""
     from app.models.mongodb_database import mongodb
     try:
-        software_list = list(mongodb.find('software', {}, sort=[('name', 1)]))
+        software_list = list(mongodb.find('software', {}, sort=[('name', 1)], projection=['name', 'category']))
         return software_list
     except:
         return []
@@ -70,7 +70,7 @@ def index():
     try:
         # Hole alle Werkzeuge über den ToolService (filtert automatisch gelöschte und per Abteilung)
         tool_service = get_tool_service()
-        tools = tool_service.get_all_tools()
+        tools = tool_service.get_all_tools(projection=ToolService.LIST_VIEW_FIELDS)
         
         # Hole Kategorien und Standorte strikt abteilungsgetrennt
         categories = get_categories_scoped()
@@ -7,13 +7,22 @@ from app.utils.database_helpers import get_departments_from_settings
 from datetime import datetime, timedelta
 from flask_login import current_user
 import os
+import re
 import tempfile
 from docxtpl import DocxTemplate
 from bson import ObjectId
 from typing import Union
+import logging
+
+logger = logging.getLogger(__name__)
 
 bp = Blueprint('workers', __name__, url_prefix='/workers')
 
+# Felder und sortierbare Spalten der Mitarbeiter-Übersicht
+WORKER_LIST_FIELDS = ['barcode', 'firstname', 'lastname', 'department', 'email',
+                      'user_id', 'username', 'role']
+WORKER_SORT_FIELDS = ('lastname', 'firstname', 'barcode', 'department', 'email')
+
 def convert_id_for_query(id_value: str) -> Union[str, ObjectId]:
     """
     Konvertiert eine ID für Datenbankabfragen.
@@ -59,6 +68,66 @@ def find_document_by_id(collection: str, id_value: str):
         print(f"Fehler beim Suchen von Dokument {id_value} in {collection}: {e}")
         return None
 
+def _worker_overview_filter(search_term: str = '') -> dict:
+    """Filter für nicht gelöschte Mitarbeiter der aktuellen Abteilung, optional mit Suchbegriff"""
+    from flask import g
+    worker_filter = {'deleted': {'$ne': True}}
+    if getattr(g, 'current_department', None):
+        worker_filter['department'] = g.current_department
+    if search_term:
+        pattern = {'$regex': re.escape(search_term), '$options': 'i'}
+        worker_filter['$or'] = [{field: pattern} for field in ('firstname', 'lastname', 'barcode', 'email')]
+    return worker_filter
+
+def _add_worker_overview_fields(workers: list):
+    """
+    Ergänzt active_lendings und die Benutzer-Informationen der Übersicht.
+    Eine $group-Abfrage über die offenen Ausleihen und je eine $in-Abfrage
+    für verknüpfte Benutzer (per user_id bzw. username), unabhängig von der
+    Anzahl Mitarbeiter.
+    """
+    barcodes = [worker['barcode'] for worker in workers if worker.get('barcode')]
+    lending_counts = {}
+    if barcodes:
+        for row in mongodb.aggregate('lendings', [
+            {'$match': {'worker_barcode': {'$in': barcodes}, 'returned_at': None}},
+            {'$group': {'_id': '$worker_barcode', 'count': {'$sum': 1}}}
+        ]):
+            lending_counts[str(row['_id'])] = row['count']
+    
+    users_by_id = mongodb.find_by_keys('users', '_id',
+                                       [worker.get('user_id') for worker in workers],
+                                       projection=['username', 'role', 'is_active'])
+    users_by_username = mongodb.find_by_keys('users', 'username',
+                                             [worker.get('username') for worker in workers
+                                              if not worker.get('user_id')],
+                                             projection=['role', 'is_active'])
+    
+    for worker in workers:
+        worker['active_lendings'] = lending_counts.get(str(worker.get('barcode')), 0)
+        
+        # Benutzer-Informationen falls vorhanden
+        if worker.get('user_id'):
+            worker['user_id'] = str(worker['user_id'])
+            user = users_by_id.get(worker['user_id'])
+            if user:
+                worker['username'] = user.get('username', '')
+                worker['user_role'] = user.get('role', '')
+                worker['user_active'] = user.get('is_active', True)
+            else:
+                worker['username'] = ''
+                worker['user_role'] = ''
+                worker['user_active'] = False
+        elif worker.get('username'):
+            # Fallback für direkte username-Verknüpfung
+            user = users_by_username.get(worker['username'])
+            if user:
+                worker['user_role'] = user.get('role', '')
+                worker['user_active'] = user.get('is_active', True)
+            else:
+                worker['user_role'] = ''
+                worker['user_active'] = False
+
 @bp.route('/')
 @mitarbeiter_required
 @permission_required('workers', 'view')
@@ -66,41 +135,10 @@ def index():
     """Zeigt die Mitarbeiter-Übersicht an"""
     try:
         # Hole alle nicht gelöschten Mitarbeiter der aktuellen Abteilung
-        from flask import g
-        worker_filter = {'deleted': {'$ne': True}}
-        if getattr(g, 'current_department', None):
-            worker_filter['department'] = g.current_department
-        workers = mongodb.find('workers', worker_filter)
-        workers = list(workers)
+        workers = list(mongodb.find('workers', _worker_overview_filter(), projection=WORKER_LIST_FIELDS))
         
-        # Für jeden Mitarbeiter die aktiven Ausleihen zählen und Benutzer-Informationen hinzufügen
-        for worker in workers:
-            active_lendings_count = mongodb.count_documents('lendings', {
-                'worker_barcode': worker.get('barcode'),
-                'returned_at': None
-            })
-            worker['active_lendings'] = active_lendings_count
-            
-            # Hole Benutzer-Informationen falls vorhanden
-            if worker.get('user_id'):
-                user = mongodb.find_one('users', {'_id': worker['user_id']})
-                if user:
-                    worker['username'] = user.get('username', '')
-                    worker['user_role'] = user.get('role', '')
-                    worker['user_active'] = user.get('is_active', True)
-                else:
-                    worker['username'] = ''
-                    worker['user_role'] = ''
-                    worker['user_active'] = False
-            elif worker.get('username'):
-                # Fallback für direkte username-Verknüpfung
-                user = mongodb.find_one('users', {'username': worker['username']})
-                if user:
-                    worker['user_role'] = user.get('role', '')
-                    worker['user_active'] = user.get('is_active', True)
-                else:
-                    worker['user_role'] = ''
-                    worker['user_active'] = False
+        # Aktive Ausleihen zählen und Benutzer-Informationen hinzufügen
+        _add_worker_overview_fields(workers)
         
         # Hole alle Abteilungen für Filter
         departments = get_departments_from_settings()
@@ -118,6 +156,48 @@ def index():
         flash('Fehler beim Laden der Mitarbeiter', 'error')
         return redirect(url_for('admin.dashboard'))
 
+@bp.route('/data')
+@mitarbeiter_required
+@permission_required('workers', 'view')
+def index_data():
+    """
+    Mitarbeiter-Übersicht als JSON-API, seitenweise und serverseitig sortiert
+    (für externe Clients; die HTML-Übersicht rendert weiterhin serverseitig)
+    
+    Query-Parameter: page, per_page (max. 200), sort (WORKER_SORT_FIELDS),
+    order (asc/desc), q (Suche in Name, Barcode, E-Mail)
+    """
+    try:
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 50, type=int), 1), 200)
+        sort_field = request.args.get('sort', 'lastname')
+        if sort_field not in WORKER_SORT_FIELDS:
+            sort_field = 'lastname'
+        order = 'desc' if request.args.get('order') == 'desc' else 'asc'
+        
+        worker_filter = _worker_overview_filter(request.args.get('q', '').strip())
+        total_count = mongodb.count_documents('workers', worker_filter)
+        workers = list(mongodb.find('workers', worker_filter,
+                                    sort=[(sort_field, -1 if order == 'desc' else 1), ('_id', 1)],
+                                    skip=(page - 1) * per_page, limit=per_page,
+                                    projection=WORKER_LIST_FIELDS))
+        _add_worker_overview_fields(workers)
+        
+        return jsonify({
+            'success': True,
+            'workers': workers,
+            'total_count': total_count,
+            'total_pages': (total_count + per_page - 1) // per_page,
+            'current_page': page,
+            'per_page': per_page,
+            'sort': sort_field,
+            'order': order
+        })
+        
+    except Exception as e:
+        logger.error(f"Fehler beim Laden der Mitarbeiter (JSON): {str(e)}", exc_info=True)
+        return jsonify({'success': False, 'message': 'Fehler beim Laden der Mitarbeiter'}), 500
+
 @bp.route('/add', methods=['GET', 'POST'])
 @mitarbeiter_required
 @permission_required('workers', 'create')
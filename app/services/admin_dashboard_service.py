@@ -9,6 +9,7 @@ import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 from app.models.mongodb_database import mongodb
+from app.services.lending_service import LendingService
 
 logger = logging.getLogger(__name__)
 
@@ -78,6 +79,10 @@ class AdminDashboardService:
             # Hole die letzten 10 Ausleihen
             try:
                 recent_lendings = list(mongodb.find('lendings', {}, sort=[('lent_at', -1)], limit=10))
+                tools_by_barcode = mongodb.find_by_keys('tools', 'barcode',
+                                                        [l.get('tool_barcode') for l in recent_lendings])
+                workers_by_barcode = mongodb.find_by_keys('workers', 'barcode',
+                                                          [l.get('worker_barcode') for l in recent_lendings])
                 
                 # Ausleihen verarbeiten
                 for lending in recent_lendings:
@@ -85,8 +90,8 @@ class AdminDashboardService:
                         # Sichere Dokumentverarbeitung
                         lending = AdminDashboardService._safe_document_processing(lending, ['lent_at', 'returned_at'])
                         
-                        tool = mongodb.find_one('tools', {'barcode': lending.get('tool_barcode', '')})
-                        worker = mongodb.find_one('workers', {'barcode': lending.get('worker_barcode', '')})
+                        tool = tools_by_barcode.get(lending.get('tool_barcode', ''))
+                        worker = workers_by_barcode.get(lending.get('worker_barcode', ''))
                         
                         if tool and worker:
                             # Sichere Dokumentverarbeitung für Tool und Worker
@@ -111,6 +116,10 @@ class AdminDashboardService:
             # Hole die letzten 10 Verbrauchsmaterial-Ausgaben
             try:
                 recent_usages = list(mongodb.find('consumable_usages', {}, sort=[('used_at', -1)], limit=10))
+                consumables_by_barcode = mongodb.find_by_keys('consumables', 'barcode',
+                                                              [u.get('consumable_barcode') for u in recent_usages])
+                workers_by_barcode = mongodb.find_by_keys('workers', 'barcode',
+                                                          [u.get('worker_barcode') for u in recent_usages])
                 
                 # Verbrauchsmaterial-Ausgaben verarbeiten
                 for usage in recent_usages:
@@ -118,8 +127,8 @@ class AdminDashboardService:
                         # Sichere Dokumentverarbeitung
                         usage = AdminDashboardService._safe_document_processing(usage, ['used_at'])
                         
-                        consumable = mongodb.find_one('consumables', {'barcode': usage.get('consumable_barcode', '')})
-                        worker = mongodb.find_one('workers', {'barcode': usage.get('worker_barcode', '')})
+                        consumable = consumables_by_barcode.get(usage.get('consumable_barcode', ''))
+                        worker = workers_by_barcode.get(usage.get('worker_barcode', ''))
                         
                         if consumable and worker:
                             # Sichere Dokumentverarbeitung
@@ -251,7 +260,7 @@ class AdminDashboardService:
             except Exception as e:
                 logger.error(f"Fehler beim Laden defekter Tools: {e}")
             
-            # Überfällige Ausleihen - nutze die neue Logik basierend auf expected_return_date
+            # Überfällige Ausleihen - gemeinsame Abfrage über due_at (LendingService)
             try:
                 overdue_loans = AdminDashboardService.get_overdue_loans()
                 
@@ -272,40 +281,24 @@ class AdminDashboardService:
             except Exception as e:
                 logger.error(f"Fehler beim Laden überfälliger Ausleihen: {e}")
 
-            # Legacy-Fallback für alte Ausleihen ohne expected_return_date
+            # Legacy-Fallback für alte Ausleihen ohne expected_return_date:
+            # überfällig nach mehr als 14 Tagen (Filter und Join auf dem Server)
             try:
-                active_lendings = list(mongodb.find('lendings', {
-                    'returned_at': {'$exists': False},
-                    'expected_return_date': {'$exists': False}
-                }))
-                
-                for lending in active_lendings:
-                    try:
-                        # Sichere Dokumentverarbeitung
-                        lending = AdminDashboardService._safe_document_processing(lending, ['lent_at', 'due_date'])
-                        
-                        # Prüfe ob überfällig (mehr als 14 Tage ohne expected_return_date)
-                        lent_at = lending.get('lent_at')
-                        if lent_at and isinstance(lent_at, datetime):
-                            days_overdue = (datetime.now() - lent_at).days
-                            if days_overdue > 14:
-                                tool = mongodb.find_one('tools', {'barcode': lending.get('tool_barcode', '')})
-                                worker = mongodb.find_one('workers', {'barcode': lending.get('worker_barcode', '')})
-                                
-                                if tool and worker:
-                                    tool = AdminDashboardService._safe_document_processing(tool)
-                                    worker = AdminDashboardService._safe_document_processing(worker)
-                                    
-                                    warnings['overdue_lendings'].append({
-                                        'tool_name': tool.get('name', 'Unbekanntes Tool'),
-                                        'worker_name': worker.get('name', 'Unbekannter Worker'),
-                                        'days_overdue': days_overdue,
-                                        'lent_at': lent_at,
-                                        'severity': 'warning'
-                                    })
-                    except Exception as e:
-                        logger.warning(f"Fehler bei überfälliger Ausleihe: {e}")
+                now = datetime.now()
+                legacy_lendings = LendingService.get_open_lendings_with_details(
+                    {'expected_return_date': {'$exists': False}, 'lent_at': {'$lt': now - timedelta(days=14)}},
+                    {'lent_at': 1}
+                )
+                for lending in legacy_lendings:
+                    if lending['tool_name'] is None or lending['worker_name'] is None:
                         continue
+                    warnings['overdue_lendings'].append({
+                        'tool_name': lending['tool_name'],
+                        'worker_name': lending['worker_name'],
+                        'days_overdue': (now - lending['lent_at']).days,
+                        'lent_at': lending['lent_at'],
+                        'severity': 'warning'
+                    })
             except Exception as e:
                 logger.error(f"Fehler beim Laden überfälliger Ausleihen: {e}")
             
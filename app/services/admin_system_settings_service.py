@@ -12,6 +12,9 @@ from typing import List, Dict, Any, Optional, Tuple
 from flask import current_app
 from app.models.mongodb_database import mongodb
 from app.utils.id_helpers import find_document_by_id
+from app.utils.permissions import invalidate_permission_matrix
+from app.utils.principal_cache import invalidate_principal_cache
+from app.utils.settings_cache import invalidate_settings_cache
 
 logger = logging.getLogger(__name__)
 
@@ -172,12 +175,16 @@ class AdminSystemSettingsService:
                         deleted_counts[coll] = 0
 
                 # 3) Settings-Einträge der Abteilung entfernen (globale 'departments' bleibt unberührt, da ohne department-Feld)
+                # (direkt auf der Collection, da das Scoping auf das aktuelle Department filtern würde)
                 try:
                     res = mongodb.db.settings.delete_many({'department': name})
                     deleted_counts['settings'] = getattr(res, 'deleted_count', 0)
                 except Exception as se:
                     logger.warning(f"Konnte Settings nicht bereinigen: {se}")
                     deleted_counts['settings'] = 0
+                # Am Schreib-Listener vorbei gelöscht: Settings-Cache und Rechte-Matrix verwerfen
+                invalidate_settings_cache()
+                invalidate_permission_matrix()
 
                 # 4) Ticket-Messages/-History/-Notes mit Bezug zu Tickets der Abteilung entfernen
                 ref_collections = ['messages', 'ticket_history', 'ticket_messages', 'ticket_notes']
@@ -198,6 +205,7 @@ class AdminSystemSettingsService:
                 try:
                     mongodb.db.users.update_many({}, {'$pull': {'allowed_departments': name}})
                     mongodb.db.users.update_many({'default_department': name}, {'$unset': {'default_department': ""}})
+                    invalidate_principal_cache()
                 except Exception as ue:
                     logger.warning(f"Konnte Nutzerberechtigungen nicht bereinigen: {ue}")
             except Exception as cascade_e:
@@ -283,6 +291,8 @@ class AdminSystemSettingsService:
             try:
                 res = mongodb.db.feature_settings.update_many({'department': old_name}, {'$set': {'department': new_name}})
                 changed_total += getattr(res, 'modified_count', 0)
+                from app.models.feature_system import FeatureSystem
+                FeatureSystem.invalidate_cache()
             except Exception as fe:
                 logger.warning(f"Konnte feature_settings nicht migrieren: {fe}")
 
@@ -304,6 +314,7 @@ class AdminSystemSettingsService:
                 mongodb.db.users.update_many({'default_department': old_name}, {'$set': {'default_department': new_name}})
                 mongodb.db.users.update_many({'allowed_departments': old_name}, {'$addToSet': {'allowed_departments': new_name}})
                 mongodb.db.users.update_many({}, {'$pull': {'allowed_departments': old_name}})
+                invalidate_principal_cache()
             except Exception as ue:
                 logger.warning(f"Konnte Nutzerberechtigungen nicht migrieren: {ue}")
 
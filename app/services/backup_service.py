@@ -10,7 +10,8 @@ import zipfile
 import tempfile
 from pathlib import Path
 from app.models.mongodb_database import mongodb
-from app.utils.backup_manager import BackupManager
+from app.utils.backup_manager import BackupManager, invalidate_caches_after_restore
+from app.services.lending_service import LendingService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -310,6 +311,11 @@ class BackupService:
                             logger.error(f"💥 Kritischer Fehler bei {collection_name}: {str(e2)}")
                             restore_stats['failed_collections'] += 1
             
+            # Fälligkeitsdaten (due_at) der wiederhergestellten Ausleihen nachtragen
+            LendingService.backfill_due_at()
+            # insert_many auf der rohen Collection löst keine Schreib-Listener aus
+            invalidate_caches_after_restore()
+            
             # ERWEITERTE Erfolgsmeldung
             success_message = f"Backup erfolgreich wiederhergestellt ({format_info['version_estimate']} Format)"
             success_message += f" - {restore_stats['successful_collections']}/{restore_stats['total_collections']} Collections"
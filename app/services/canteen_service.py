@@ -10,6 +10,10 @@ from typing import Dict, List, Optional, Tuple
 from io import StringIO
 import logging
 
+from app.config.canteen_api import CANTEEN_API_CACHE_DURATION, CANTEEN_API_STALE_DURATION
+from app.models.mongodb_database import MongoDBDatabase
+from app.utils.cache_versions import StaleWhileRevalidateCache
+
 logger = logging.getLogger(__name__)
 
 class CanteenService:
@@ -61,40 +65,51 @@ class CanteenService:
             logger.error(f"Fehler beim Generieren der CSV: {e}")
             return ""
     
+    @staticmethod
+    def _week_dates(weeks: int, monday: Optional[datetime] = None) -> List[str]:
+        """Datumsliste (Montag-Freitag) für weeks Wochen ab dem Montag der aktuellen Woche"""
+        if monday is None:
+            today = datetime.now()
+            monday = today - timedelta(days=today.weekday())
+        monday = monday.replace(hour=0, minute=0, second=0, microsecond=0)
+        return [
+            (monday + timedelta(days=(week * 7) + day)).strftime('%Y-%m-%d')
+            for week in range(weeks)
+            for day in range(5)  # Montag bis Freitag
+        ]
+    
+    @staticmethod
+    def _load_meals(dates: List[str]) -> List[Dict]:
+        """
+        Lädt die Mahlzeiten für dates mit einer einzigen Abfrage; fehlende Tage
+        werden als leere Einträge ergänzt (Reihenfolge wie dates)
+        """
+        from app.models.mongodb_database import mongodb
+        
+        meals_by_date = {}
+        for meal in mongodb.find('canteen_meals', {'date': {'$in': dates}}):
+            meals_by_date.setdefault(meal.get('date'), meal)
+        
+        meals = []
+        for date in dates:
+            meal = meals_by_date.get(date)
+            if not meal:
+                # Erstelle leeren Eintrag für fehlende Tage
+                meal = {
+                    'date': date,
+                    'meat_dish': '',
+                    'vegan_dish': '',
+                    'dessert': '',  # Neues Dessert-Feld
+                    'created_at': datetime.now(),
+                    'updated_at': datetime.now()
+                }
+            meals.append(meal)
+        return meals
+    
     def get_current_week_meals(self) -> List[Dict]:
         """Holt Mahlzeiten für die aktuelle Woche (Montag-Freitag)"""
         try:
-            from app.models.mongodb_database import mongodb
-            
-            # Berechne Montag der aktuellen Woche
-            today = datetime.now()
-            monday = today - timedelta(days=today.weekday())
-            monday = monday.replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            # Erstelle Datumsliste für Montag-Freitag
-            week_dates = []
-            for i in range(5):  # Montag bis Freitag
-                week_date = monday + timedelta(days=i)
-                week_dates.append(week_date.strftime('%Y-%m-%d'))
-            
-            # Lade Mahlzeiten aus der Datenbank
-            meals = []
-            for date in week_dates:
-                meal = mongodb.find_one('canteen_meals', {'date': date})
-                if meal:
-                    meals.append(meal)
-                else:
-                    # Erstelle leeren Eintrag für fehlende Tage
-                    meals.append({
-                        'date': date,
-                        'meat_dish': '',
-                        'vegan_dish': '',
-                        'dessert': '',  # Neues Dessert-Feld
-                        'created_at': datetime.now(),
-                        'updated_at': datetime.now()
-                    })
-            
-            return meals
+            return self._load_meals(self._week_dates(1))
             
         except Exception as e:
             logger.error(f"Fehler beim Laden der Mahlzeiten: {e}")
@@ -103,52 +118,73 @@ class CanteenService:
     def get_two_weeks_meals(self) -> List[Dict]:
         """Holt Mahlzeiten für 2 Wochen (Montag-Freitag)"""
         try:
-            from app.models.mongodb_database import mongodb
-            
-            # Berechne Montag der aktuellen Woche
-            today = datetime.now()
-            monday = today - timedelta(days=today.weekday())
-            monday = monday.replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            # Erstelle Datumsliste für 2 Wochen (Montag-Freitag)
-            week_dates = []
-            for week in range(2):  # 2 Wochen
-                for day in range(5):  # Montag bis Freitag
-                    week_date = monday + timedelta(days=(week * 7) + day)
-                    week_dates.append(week_date.strftime('%Y-%m-%d'))
-            
-            # Lade Mahlzeiten aus der Datenbank
-            meals = []
-            for i, date in enumerate(week_dates):
-                meal = mongodb.find_one('canteen_meals', {'date': date})
-                if meal:
-                    # Berechne Kalenderwoche
-                    date_obj = datetime.strptime(date, '%Y-%m-%d')
-                    calendar_week = date_obj.isocalendar()[1]
-                    
-                    meal['calendar_week'] = calendar_week
-                    meals.append(meal)
-                else:
-                    # Erstelle leeren Eintrag für fehlende Tage
-                    date_obj = datetime.strptime(date, '%Y-%m-%d')
-                    calendar_week = date_obj.isocalendar()[1]
-                    
-                    meals.append({
-                        'date': date,
-                        'meat_dish': '',
-                        'vegan_dish': '',
-                        'dessert': '',  # Neues Dessert-Feld
-                        'calendar_week': calendar_week,
-                        'created_at': datetime.now(),
-                        'updated_at': datetime.now()
-                    })
-            
+            meals = self._load_meals(self._week_dates(2))
+            for meal in meals:
+                # Berechne Kalenderwoche
+                date_obj = datetime.strptime(meal['date'], '%Y-%m-%d')
+                meal['calendar_week'] = date_obj.isocalendar()[1]
             return meals
             
         except Exception as e:
             logger.error(f"Fehler beim Laden der Mahlzeiten: {e}")
             return []
     
+    @staticmethod
+    def _format_api_days(meals: List[Dict], monday: datetime) -> List[Dict]:
+        """Formatiert Mahlzeiten für die WordPress-kompatible API"""
+        weekdays = ['Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag']
+        days = []
+        for i, meal in enumerate(meals):
+            date = meal.get('date', '')
+            
+            # Datum ohne Wochentag (Format: 15.01.2024)
+            if date:
+                try:
+                    date_label = datetime.strptime(date, '%Y-%m-%d').strftime('%d.%m.%Y')
+                except ValueError:
+                    date_label = date
+            else:
+                # Fallback: Datum anhand der Position bestimmen
+                target_date = monday + timedelta(days=(i // 5) * 7 + i % 5)
+                date_label = target_date.strftime('%d.%m.%Y')
+            
+            days.append({
+                'date': date_label,
+                'weekday': weekdays[i % 5],
+                'meat_dish': meal.get('meat_dish', '').strip(),
+                'vegan_dish': meal.get('vegan_dish', '').strip(),
+                'dessert': meal.get('dessert', '').strip()
+            })
+        return days
+    
+    @staticmethod
+    def _load_api_payload(key: Tuple[int, str]) -> Dict:
+        """Loader des API-Caches: key = (Anzahl Wochen, Montag als YYYY-MM-DD)"""
+        weeks, monday_str = key
+        monday = datetime.strptime(monday_str, '%Y-%m-%d')
+        meals = CanteenService._load_meals(CanteenService._week_dates(weeks, monday))
+        return {
+            'days': CanteenService._format_api_days(meals, monday),
+            'generated_at': datetime.now().isoformat()
+        }
+    
+    def get_api_days(self, weeks: int = 1) -> Dict:
+        """
+        API-Daten (days, generated_at) für weeks Wochen ab der aktuellen Woche.
+        Antworten werden CANTEEN_API_CACHE_DURATION Sekunden gecacht und danach
+        bis zu CANTEEN_API_STALE_DURATION Sekunden weiter ausgeliefert, während
+        sie im Hintergrund neu geladen werden. Fehler beim Laden werden nicht
+        gecacht, sondern an den Aufrufer weitergegeben.
+        """
+        today = datetime.now()
+        monday = today - timedelta(days=today.weekday())
+        return _api_cache.get((weeks, monday.strftime('%Y-%m-%d')))
+    
+    @staticmethod
+    def invalidate_api_cache():
+        """Verwirft die gecachten API-Antworten in allen Worker-Prozessen"""
+        _api_cache.invalidate()
+    
     def save_meals(self, meals_data: List[Dict]) -> Tuple[bool, str]:
         """Speichert Mahlzeiten in der Datenbank"""
         try:
@@ -222,4 +258,13 @@ class CanteenService:
                 'configured': False,
                 'api_enabled': False,
                 'message': 'API nicht verfügbar'
-            } 
\ No newline at end of file
+            } 
+
+
+_api_cache = StaleWhileRevalidateCache('canteen_api', CanteenService._load_api_payload,
+                                       max_age=CANTEEN_API_CACHE_DURATION,
+                                       stale_ttl=CANTEEN_API_STALE_DURATION)
+
+# Jede Schreiboperation auf 'canteen_meals' (save_meals/update_canteen_plan und die
+# Speicher-Routen) verwirft die gecachten API-Antworten
+MongoDBDatabase.register_write_listener('canteen_meals', CanteenService.invalidate_api_cache)
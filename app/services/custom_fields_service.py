@@ -19,14 +19,25 @@ Zieltypen:
 - tools: Nur für Werkzeuge
 - consumables: Nur für Verbrauchsgüter
 - both: Für beide Typen verfügbar
+
+Die Felddefinitionen werden pro (Department, Zieltyp) zusammen mit ihren
+vorkompilierten Validatoren prozesslokal gecacht; jede Schreiboperation auf
+'custom_fields' verwirft den Cache in allen Worker-Prozessen.
 """
-from typing import Dict, Any, List, Tuple, Optional, Union
+from typing import Dict, Any, List, Tuple, Optional, Union, Callable
 from datetime import datetime
-from app.models.mongodb_database import mongodb
+from app.config.config import Config
+from app.models.mongodb_database import mongodb, MongoDBDatabase
+from app.utils.cache_versions import VersionedCache
+import copy
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+_EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_URL_PATTERN = re.compile(r'^https?://.+')
+
 class CustomFieldsService:
     """Service für die Verwaltung benutzerdefinierter Felder"""
     
@@ -58,17 +69,40 @@ class CustomFieldsService:
             logger.error(f"Fehler beim Laden der benutzerdefinierten Felder: {str(e)}")
             return []
     
+    @staticmethod
+    def _load_definitions(target_type: str) -> Dict[str, Any]:
+        """
+        Lädt die Felder eines Zieltyps und kompiliert ihre Validatoren.
+        Fehler werden nicht abgefangen, damit kein leeres Ergebnis im Cache landet.
+        """
+        # Felder die für den spezifischen Typ oder 'both' gelten
+        query = {
+            'deleted': {'$ne': True},
+            'target_type': {'$in': [target_type, 'both']}
+        }
+        fields = sorted(mongodb.find('custom_fields', query), key=lambda x: x.get('sort_order', 999))
+        return {
+            'fields': fields,
+            'validators': {field['field_key']: CustomFieldsService.compile_validator(field)
+                           for field in fields if field.get('field_key')}
+        }
+    
+    @staticmethod
+    def _definitions(target_type: str) -> Dict[str, Any]:
+        """Gecachte Definitionen (nicht verändern)"""
+        # custom_fields ist global (nicht Department-gescoped): Schlüssel nur der Zieltyp
+        return _definitions_cache.get(target_type)
+    
+    @staticmethod
+    def invalidate_cache():
+        """Verwirft die Felddefinitionen in allen Worker-Prozessen"""
+        _definitions_cache.invalidate()
+    
     @staticmethod
     def get_custom_fields_for_target(target_type: str) -> List[Dict[str, Any]]:
         """Holt benutzerdefinierte Felder für einen bestimmten Zieltyp (tools, consumables)"""
         try:
-            # Felder die für den spezifischen Typ oder 'both' gelten
-            query = {
-                'deleted': {'$ne': True},
-                'target_type': {'$in': [target_type, 'both']}
-            }
-            fields = list(mongodb.find('custom_fields', query))
-            return sorted(fields, key=lambda x: x.get('sort_order', 999))
+            return copy.deepcopy(CustomFieldsService._definitions(target_type)['fields'])
         except Exception as e:
             logger.error(f"Fehler beim Laden der Felder für {target_type}: {str(e)}")
             return []
@@ -225,65 +259,77 @@ class CustomFieldsService:
             return None
     
     @staticmethod
-    def validate_custom_field_value(field: Dict[str, Any], value: Any) -> Tuple[bool, str, Any]:
-        """Validiert einen Wert für ein benutzerdefiniertes Feld"""
-        try:
-            field_type = field.get('field_type')
-            is_required = field.get('required', False)
-            
-            # Prüfe ob erforderliches Feld leer ist
-            if is_required and (value is None or str(value).strip() == ''):
-                return False, f"Das Feld '{field['name']}' ist erforderlich", None
-            
-            # Wenn Wert leer und nicht erforderlich, ist das OK
-            if value is None or str(value).strip() == '':
-                return True, '', None
-            
-            # Typ-spezifische Validierung
-            if field_type == 'number':
+    def compile_validator(field: Dict[str, Any]) -> Callable[[Any], Tuple[bool, str, Any]]:
+        """
+        Erzeugt einmalig den Validator eines Feldes. Der Validator liefert wie
+        validate_custom_field_value (gültig, Fehlermeldung, konvertierter Wert).
+        """
+        name = field.get('name', 'unbekannt')
+        field_type = field.get('field_type')
+        is_required = field.get('required', False)
+        
+        # Typ-spezifische Validierung
+        if field_type == 'number':
+            def convert(value):
                 try:
-                    converted_value = float(value)
-                    return True, '', converted_value
+                    return True, '', float(value)
                 except (ValueError, TypeError):
-                    return False, f"'{field['name']}' muss eine gültige Zahl sein", None
-            
-            elif field_type == 'email':
-                import re
-                email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-                if not re.match(email_pattern, str(value)):
-                    return False, f"'{field['name']}' muss eine gültige E-Mail-Adresse sein", None
-            
-            elif field_type == 'url':
-                import re
-                url_pattern = r'^https?://.+'
-                if not re.match(url_pattern, str(value)):
-                    return False, f"'{field['name']}' muss eine gültige URL sein (http:// oder https://)", None
-            
-            elif field_type == 'select':
-                options = field.get('select_options', [])
+                    return False, f"'{name}' muss eine gültige Zahl sein", None
+        
+        elif field_type in ('email', 'url'):
+            pattern = _EMAIL_PATTERN if field_type == 'email' else _URL_PATTERN
+            message = (f"'{name}' muss eine gültige E-Mail-Adresse sein" if field_type == 'email'
+                       else f"'{name}' muss eine gültige URL sein (http:// oder https://)")
+            def convert(value):
+                if not pattern.match(str(value)):
+                    return False, message, None
+                return True, '', str(value).strip()
+        
+        elif field_type == 'select':
+            options = frozenset(field.get('select_options', []))
+            def convert(value):
                 if str(value) not in options:
-                    return False, f"'{value}' ist keine gültige Option für '{field['name']}'", None
-            
-            elif field_type == 'checkbox':
+                    return False, f"'{value}' ist keine gültige Option für '{name}'", None
+                return True, '', str(value).strip()
+        
+        elif field_type == 'checkbox':
+            def convert(value):
                 # Konvertiere zu Boolean
                 if isinstance(value, str):
-                    converted_value = value.lower() in ['true', '1', 'on', 'yes', 'ja']
-                else:
-                    converted_value = bool(value)
-                return True, '', converted_value
-            
+                    return True, '', value.lower() in ['true', '1', 'on', 'yes', 'ja']
+                return True, '', bool(value)
+        
+        else:
             # Für text, textarea, date geben wir den String-Wert zurück
-            return True, '', str(value).strip()
-            
-        except Exception as e:
-            logger.error(f"Fehler bei der Validierung von Feld {field.get('name', 'unbekannt')}: {str(e)}")
-            return False, f"Validierungsfehler für '{field.get('name', 'unbekannt')}'", None
+            def convert(value):
+                return True, '', str(value).strip()
+        
+        def validate(value: Any) -> Tuple[bool, str, Any]:
+            try:
+                # Leere Werte: nur für erforderliche Felder ein Fehler
+                if value is None or str(value).strip() == '':
+                    if is_required:
+                        return False, f"Das Feld '{name}' ist erforderlich", None
+                    return True, '', None
+                return convert(value)
+            except Exception as e:
+                logger.error(f"Fehler bei der Validierung von Feld {name}: {str(e)}")
+                return False, f"Validierungsfehler für '{name}'", None
+        
+        return validate
+    
+    @staticmethod
+    def validate_custom_field_value(field: Dict[str, Any], value: Any) -> Tuple[bool, str, Any]:
+        """Validiert einen Wert für ein benutzerdefiniertes Feld"""
+        return CustomFieldsService.compile_validator(field)(value)
     
     @staticmethod
     def process_custom_fields_from_form(target_type: str, form_data: Dict) -> Tuple[bool, str, Dict[str, Any]]:
         """Verarbeitet benutzerdefinierte Felder aus einem Formular"""
         try:
-            custom_fields = CustomFieldsService.get_custom_fields_for_target(target_type)
+            definitions = CustomFieldsService._definitions(target_type)
+            custom_fields = definitions['fields']
+            validators = definitions['validators']
             processed_values = {}
             errors = []
             
@@ -298,7 +344,7 @@ class CustomFieldsService:
                     continue
                 
                 # Validiere den Wert für andere Feldtypen
-                is_valid, error_msg, processed_value = CustomFieldsService.validate_custom_field_value(field, form_value)
+                is_valid, error_msg, processed_value = validators[field_key](form_value)
                 
                 if not is_valid:
                     errors.append(error_msg)
@@ -320,7 +366,6 @@ class CustomFieldsService:
     @staticmethod
     def _generate_field_key(name: str) -> str:
         """Generiert einen eindeutigen Schlüssel aus einem Feldnamen"""
-        import re
         # Entferne Sonderzeichen und ersetze Leerzeichen
         key = re.sub(r'[^a-zA-Z0-9_\s]', '', name)
         key = re.sub(r'\s+', '_', key.strip())
@@ -353,4 +398,10 @@ class CustomFieldsService:
                 
         except Exception as e:
             logger.error(f"Fehler beim Formatieren des Anzeigewerts: {str(e)}")
-            return str(value) if value is not None else ''
\ No newline at end of file
+            return str(value) if value is not None else ''
+
+_definitions_cache = VersionedCache('custom_fields', CustomFieldsService._load_definitions,
+                                    ttl=Config.SETTINGS_CACHE_TTL)
+
+# Anlegen, Ändern und Löschen von Feldern (über MongoDBDatabase) invalidieren die Definitionen
+MongoDBDatabase.register_write_listener('custom_fields', CustomFieldsService.invalidate_cache)
@@ -117,6 +117,20 @@ class ExcelExportService:
             logger.error(f"Fehler beim Generieren des Excel-Exports: {str(e)}")
             raise
     
+    @staticmethod
+    def _custom_field_formatters(custom_fields):
+        """Formatierung je Feldtyp einmal pro Export festlegen statt pro Zeile"""
+        formatters = []
+        for custom_field in custom_fields:
+            if custom_field['field_type'] == 'checkbox':
+                format_value = lambda value: 'Ja' if value else 'Nein'
+            elif custom_field['field_type'] == 'number':
+                format_value = lambda value: str(value) if value is not None else ''
+            else:
+                format_value = lambda value: str(value) if value else ''
+            formatters.append((custom_field['field_key'], format_value))
+        return formatters
+    
     def _create_tools_sheet(self):
         """Erstellt das Werkzeuge-Arbeitsblatt"""
         try:
@@ -143,22 +157,31 @@ class ExcelExportService:
                 headers.append(custom_field['name'])
             
             self.tools_custom_fields = custom_fields  # Für später speichern
+            self.tools_custom_field_formatters = self._custom_field_formatters(custom_fields)
             
             # Schreibe Header
             for col, header in enumerate(headers, 1):
                 cell = ws.cell(row=1, column=col, value=header)
                 self._apply_style(cell, 'header')
             
-            # Lade Werkzeuge
-            tools = list(mongodb.find('tools', {'deleted': {'$ne': True}}, sort=[('name', 1)]))
+            # Aktive Ausleihen und zugehörige Mitarbeiter einmalig laden
+            active_lendings = {}
+            for lending in mongodb.iter_find('lendings', {'returned_at': None}):
+                active_lendings.setdefault(lending.get('tool_barcode'), lending)
+            workers_by_barcode = mongodb.find_by_keys(
+                'workers', 'barcode',
+                [lending.get('worker_barcode') for lending in active_lendings.values()],
+                projection=['firstname', 'lastname'],
+                filter_dict={'deleted': {'$ne': True}}
+            )
+            
+            # Werkzeuge streamen
+            tools = mongodb.iter_find('tools', {'deleted': {'$ne': True}}, sort=[('name', 1)])
             
             # Schreibe Daten
             for row, tool in enumerate(tools, 2):
                 # Hole aktuelle Ausleihe
-                current_lending = mongodb.find_one('lendings', {
-                    'tool_barcode': tool.get('barcode'),
-                    'returned_at': None
-                })
+                current_lending = active_lendings.get(tool.get('barcode'))
                 
                 # Hole Mitarbeiter-Info falls ausgeliehen
                 lent_to = None
@@ -166,10 +189,7 @@ class ExcelExportService:
                 return_date = None
                 
                 if current_lending:
-                    worker = mongodb.find_one('workers', {
-                        'barcode': current_lending.get('worker_barcode'),
-                        'deleted': {'$ne': True}
-                    })
+                    worker = workers_by_barcode.get(current_lending.get('worker_barcode'))
                     if worker:
                         lent_to = f"{worker.get('firstname', '')} {worker.get('lastname', '')}"
                     lent_since = current_lending.get('lent_at')
@@ -219,21 +239,10 @@ class ExcelExportService:
                 ]
                 
                 # Custom Fields Werte hinzufügen
-                if hasattr(self, 'tools_custom_fields'):
+                if hasattr(self, 'tools_custom_field_formatters'):
                     tool_custom_fields = tool.get('custom_fields', {})
-                    for custom_field in self.tools_custom_fields:
-                        field_key = custom_field['field_key']
-                        field_value = tool_custom_fields.get(field_key, '')
-                        
-                        # Formatiere je nach Feldtyp
-                        if custom_field['field_type'] == 'checkbox':
-                            display_value = 'Ja' if field_value else 'Nein'
-                        elif custom_field['field_type'] == 'number':
-                            display_value = str(field_value) if field_value is not None else ''
-                        else:
-                            display_value = str(field_value) if field_value else ''
-                        
-                        data.append(display_value)
+                    for field_key, format_value in self.tools_custom_field_formatters:
+                        data.append(format_value(tool_custom_fields.get(field_key, '')))
                 
                 for col, value in enumerate(data, 1):
                     cell = ws.cell(row=row, column=col, value=value)
@@ -271,6 +280,7 @@ class ExcelExportService:
                 headers.append(custom_field['name'])
             
             self.consumables_custom_fields = custom_fields  # Für später speichern
+            self.consumables_custom_field_formatters = self._custom_field_formatters(custom_fields)
             
             # Schreibe Header
             for col, header in enumerate(headers, 1):
@@ -278,7 +288,7 @@ class ExcelExportService:
                 self._apply_style(cell, 'header')
             
             # Lade Verbrauchsmaterial
-            consumables = list(mongodb.find('consumables', {'deleted': {'$ne': True}}, sort=[('name', 1)]))
+            consumables = mongodb.iter_find('consumables', {'deleted': {'$ne': True}}, sort=[('name', 1)])
             
             # Schreibe Daten
             for row, consumable in enumerate(consumables, 2):
@@ -308,21 +318,10 @@ class ExcelExportService:
                 ]
                 
                 # Custom Fields Werte hinzufügen
-                if hasattr(self, 'consumables_custom_fields'):
+                if hasattr(self, 'consumables_custom_field_formatters'):
                     consumable_custom_fields = consumable.get('custom_fields', {})
-                    for custom_field in self.consumables_custom_fields:
-                        field_key = custom_field['field_key']
-                        field_value = consumable_custom_fields.get(field_key, '')
-                        
-                        # Formatiere je nach Feldtyp
-                        if custom_field['field_type'] == 'checkbox':
-                            display_value = 'Ja' if field_value else 'Nein'
-                        elif custom_field['field_type'] == 'number':
-                            display_value = str(field_value) if field_value is not None else ''
-                        else:
-                            display_value = str(field_value) if field_value else ''
-                        
-                        data.append(display_value)
+                    for field_key, format_value in self.consumables_custom_field_formatters:
+                        data.append(format_value(consumable_custom_fields.get(field_key, '')))
                 
                 for col, value in enumerate(data, 1):
                     cell = ws.cell(row=row, column=col, value=value)
@@ -354,7 +353,7 @@ class ExcelExportService:
                 self._apply_style(cell, 'header')
             
             # Lade Mitarbeiter
-            workers = list(mongodb.find('workers', {'deleted': {'$ne': True}}, sort=[('lastname', 1), ('firstname', 1)]))
+            workers = mongodb.iter_find('workers', {'deleted': {'$ne': True}}, sort=[('lastname', 1), ('firstname', 1)])
             
             # Schreibe Daten
             for row, worker in enumerate(workers, 2):
@@ -403,17 +402,25 @@ class ExcelExportService:
                 cell = ws.cell(row=1, column=col, value=header)
                 self._apply_style(cell, 'header')
             
-            # Lade Ausleihen
-            lendings = list(mongodb.find('lendings', {}, sort=[('lent_at', -1)]))
+            # Namen von Werkzeugen und Mitarbeitern einmalig laden
+            tools_by_barcode = {}
+            for tool in mongodb.iter_find('tools', {}, projection=['barcode', 'name']):
+                tools_by_barcode.setdefault(tool.get('barcode'), tool)
+            workers_by_barcode = {}
+            for worker in mongodb.iter_find('workers', {}, projection=['barcode', 'firstname', 'lastname']):
+                workers_by_barcode.setdefault(worker.get('barcode'), worker)
+            
+            # Ausleihen streamen
+            lendings = mongodb.iter_find('lendings', {}, sort=[('lent_at', -1)])
             
             # Schreibe Daten
             for row, lending in enumerate(lendings, 2):
                 # Hole Werkzeug-Info
-                tool = mongodb.find_one('tools', {'barcode': lending.get('tool_barcode')})
+                tool = tools_by_barcode.get(lending.get('tool_barcode'))
                 tool_name = tool.get('name', 'Unbekannt') if tool else 'Unbekannt'
                 
                 # Hole Mitarbeiter-Info
-                worker = mongodb.find_one('workers', {'barcode': lending.get('worker_barcode')})
+                worker = workers_by_barcode.get(lending.get('worker_barcode'))
                 worker_name = f"{worker.get('firstname', '')} {worker.get('lastname', '')}" if worker else 'Unbekannt'
                 
                 # Berechne Status und Tage
@@ -493,18 +500,26 @@ class ExcelExportService:
                 cell = ws.cell(row=1, column=col, value=header)
                 self._apply_style(cell, 'header')
             
-            # Lade Ausgaben
-            consumptions = list(mongodb.find('consumptions', {}, sort=[('consumed_at', -1)]))
+            # Namen von Verbrauchsmaterial und Mitarbeitern einmalig laden
+            consumables_by_barcode = {}
+            for consumable in mongodb.iter_find('consumables', {}, projection=['barcode', 'name', 'unit']):
+                consumables_by_barcode.setdefault(consumable.get('barcode'), consumable)
+            workers_by_barcode = {}
+            for worker in mongodb.iter_find('workers', {}, projection=['barcode', 'firstname', 'lastname']):
+                workers_by_barcode.setdefault(worker.get('barcode'), worker)
+            
+            # Ausgaben streamen
+            consumptions = mongodb.iter_find('consumptions', {}, sort=[('consumed_at', -1)])
             
             # Schreibe Daten
             for row, consumption in enumerate(consumptions, 2):
                 # Hole Verbrauchsmaterial-Info
-                consumable = mongodb.find_one('consumables', {'barcode': consumption.get('consumable_barcode')})
+                consumable = consumables_by_barcode.get(consumption.get('consumable_barcode'))
                 consumable_name = consumable.get('name', 'Unbekannt') if consumable else 'Unbekannt'
                 unit = consumable.get('unit', '') if consumable else ''
                 
                 # Hole Mitarbeiter-Info
-                worker = mongodb.find_one('workers', {'barcode': consumption.get('worker_barcode')})
+                worker = workers_by_barcode.get(consumption.get('worker_barcode'))
                 worker_name = f"{worker.get('firstname', '')} {worker.get('lastname', '')}" if worker else 'Unbekannt'
                 
                 data = [
@@ -544,7 +559,7 @@ class ExcelExportService:
                 self._apply_style(cell, 'header')
             
             # Lade Tickets
-            tickets = list(mongodb.find('tickets', {}, sort=[('created_at', -1)]))
+            tickets = mongodb.iter_find('tickets', {}, sort=[('created_at', -1)])
             
             # Schreibe Daten
             for row, ticket in enumerate(tickets, 2):
@@ -0,0 +1,113 @@
+"""
+Index Report Service
+
+Gleicht die deklarierte Index-Registry mit den tatsächlich vorhandenen
+Indizes ($indexStats) und den beobachteten langsamen Abfragen ab:
+fehlende, nicht registrierte und ungenutzte Indizes sowie Abfragen,
+deren Prädikate von keinem Index bedient werden.
+"""
+
+import logging
+from typing import Any, Dict, List, Set
+
+from app.models.index_registry import INDEX_REGISTRY, index_name
+from app.models.mongodb_database import mongodb, MongoDBDatabase
+from app.utils.query_metrics import get_slow_query_shapes
+
+logger = logging.getLogger(__name__)
+
+class IndexReportService:
+    """Service für den Index-Report im Admin-Bereich"""
+
+    @staticmethod
+    def _predicate_fields(shape: Any) -> Set[str]:
+        """Feldnamen, auf die ein Filter (oder die erste $match-Stage einer Pipeline) einschränkt"""
+        if isinstance(shape, list):
+            # Pipeline: nur eine führende $match-Stage kann einen Index nutzen
+            first_stage = shape[0] if shape else {}
+            return IndexReportService._predicate_fields(first_stage.get('$match', {}) if isinstance(first_stage, dict) else {})
+        fields = set()
+        if not isinstance(shape, dict):
+            return fields
+        for key, value in shape.items():
+            if key in ('$and', '$or', '$nor') and isinstance(value, list):
+                for clause in value:
+                    fields |= IndexReportService._predicate_fields(clause)
+            elif not key.startswith('$'):
+                fields.add(key)
+        return fields
+
+    @staticmethod
+    def _collect_index_stats(collection_name: str) -> List[Dict[str, Any]]:
+        """Liest $indexStats einer Collection (direkt, ohne Department-Scoping)"""
+        collection = mongodb.get_collection(collection_name)
+        stats = []
+        for entry in collection.aggregate([{'$indexStats': {}}]):
+            spec = entry.get('spec', {})
+            accesses = entry.get('accesses', {})
+            stats.append({
+                'name': entry.get('name'),
+                'keys': list(entry.get('key', {}).items()),
+                'ops': accesses.get('ops', 0),
+                'since': accesses.get('since'),
+                'unique': spec.get('unique', False),
+                'ttl': 'expireAfterSeconds' in spec,
+            })
+        return stats
+
+    @staticmethod
+    def build_report() -> Dict[str, Any]:
+        """
+        Erstellt den Index-Report
+
+        Returns:
+            Dict mit missing, unregistered, unused, unindexed_queries
+            und der Index-Übersicht pro Collection
+        """
+        report = {
+            'collections': {},
+            'missing': [],
+            'unregistered': [],
+            'unused': [],
+            'unindexed_queries': [],
+        }
+        existing_names = set(mongodb.db.list_collection_names())
+        collections = sorted(set(INDEX_REGISTRY) | {shape['collection'] for shape in get_slow_query_shapes()})
+        first_key_fields: Dict[str, Set[str]] = {}
+
+        for collection_name in collections:
+            registered = {index_name(spec['keys']) for spec in INDEX_REGISTRY.get(collection_name, [])}
+            try:
+                stats = IndexReportService._collect_index_stats(collection_name) if collection_name in existing_names else []
+            except Exception as e:
+                logger.error(f"Fehler beim Lesen von $indexStats für {collection_name}: {str(e)}")
+                stats = []
+
+            report['collections'][collection_name] = stats
+            first_key_fields[collection_name] = {index['keys'][0][0] for index in stats if index['keys']}
+            present = {index['name'] for index in stats}
+
+            for name in sorted(registered - present):
+                report['missing'].append({'collection': collection_name, 'index': name})
+            for index in stats:
+                if index['name'] == '_id_':
+                    continue
+                if index['name'] not in registered:
+                    report['unregistered'].append({'collection': collection_name, 'index': index['name'], 'ops': index['ops']})
+                # Unique- und TTL-Indizes erfüllen ihren Zweck auch ohne Lesezugriffe
+                if index['ops'] == 0 and not index['unique'] and not index['ttl']:
+                    report['unused'].append({'collection': collection_name, 'index': index['name'], 'since': index['since']})
+
+        strict_scoping = MongoDBDatabase._strict_department_scoping()
+        for shape in get_slow_query_shapes():
+            collection_name = shape['collection']
+            fields = IndexReportService._predicate_fields(shape['filter_shape'])
+            if strict_scoping and collection_name in MongoDBDatabase._SCOPED_COLLECTIONS:
+                # Im strict-Modus ergänzt das Scoping eine Gleichheit auf department
+                fields.add('department')
+            if not fields or '_id' in fields:
+                continue
+            if not fields & first_key_fields.get(collection_name, set()):
+                report['unindexed_queries'].append({**shape, 'predicate_fields': sorted(fields)})
+
+        return report
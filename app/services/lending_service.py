@@ -3,8 +3,13 @@ Zentraler Lending Service für Scandy
 Alle Ausleihe/Rückgabe-Logik an einem Ort
 """
 from typing import Dict, Any, Tuple, Optional, List
-from datetime import datetime
-from app.models.mongodb_database import mongodb
+from datetime import date, datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.config.config import Config
+from app.models.mongodb_database import mongodb, MongoDBDatabase
+import base64
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -51,7 +56,7 @@ class LendingService:
                 return False, f'Ungültiger Item-Typ. Erlaubt: {", ".join(valid_types)}', {}
             
             # Prüfe ob Mitarbeiter existiert
-            worker = mongodb.find_one('workers', {'barcode': worker_barcode, 'deleted': {'$ne': True}})
+            worker = mongodb.find_one('workers', {'barcode': worker_barcode, 'deleted': {'$ne': True}}, cached=True)
             if not worker:
                 return False, 'Mitarbeiter nicht gefunden', {}
             
@@ -72,7 +77,7 @@ class LendingService:
         """Verarbeitet Werkzeug-Ausleihe/Rückgabe mit verbesserter Konsistenz"""
         try:
             # Prüfe ob Werkzeug existiert
-            tool = mongodb.find_one('tools', {'barcode': item_barcode, 'deleted': {'$ne': True}})
+            tool = mongodb.find_one('tools', {'barcode': item_barcode, 'deleted': {'$ne': True}}, cached=True)
             if not tool:
                 return False, 'Werkzeug nicht gefunden', {}
             
@@ -98,7 +103,7 @@ class LendingService:
             })
             
             if active_lending:
-                current_worker = mongodb.find_one('workers', {'barcode': active_lending['worker_barcode']})
+                current_worker = mongodb.find_one('workers', {'barcode': active_lending['worker_barcode']}, cached=True)
                 worker_name = f"{current_worker['firstname']} {current_worker['lastname']}" if current_worker else "Unbekannt"
                 return False, f'Dieses Werkzeug ist bereits an {worker_name} ausgeliehen', {}
             
@@ -167,7 +172,7 @@ class LendingService:
             
             # Prüfe Berechtigung (optional)
             if worker_barcode and active_lending['worker_barcode'] != worker_barcode:
-                current_worker = mongodb.find_one('workers', {'barcode': active_lending['worker_barcode']})
+                current_worker = mongodb.find_one('workers', {'barcode': active_lending['worker_barcode']}, cached=True)
                 worker_name = f"{current_worker['firstname']} {current_worker['lastname']}" if current_worker else "Unbekannt"
                 logger.warning(f"Berechtigungsfehler: Werkzeug wurde von {worker_name} ausgeliehen")
                 return False, f'Dieses Werkzeug wurde von {worker_name} ausgeliehen', {}
@@ -345,11 +350,17 @@ class LendingService:
         try:
             active_lendings = mongodb.find('lendings', {'returned_at': None})
             
+            # Tool- und Worker-Informationen gesammelt laden (statt find_one pro Ausleihe)
+            tools_by_barcode = mongodb.find_by_keys('tools', 'barcode',
+                                                    [l.get('tool_barcode') for l in active_lendings])
+            workers_by_barcode = mongodb.find_by_keys('workers', 'barcode',
+                                                      [l.get('worker_barcode') for l in active_lendings])
+            
             # Erweitere mit Tool- und Worker-Informationen
             enriched_lendings = []
             for lending in active_lendings:
-                tool = mongodb.find_one('tools', {'barcode': lending['tool_barcode']})
-                worker = mongodb.find_one('workers', {'barcode': lending['worker_barcode']})
+                tool = tools_by_barcode.get(lending.get('tool_barcode'))
+                worker = workers_by_barcode.get(lending.get('worker_barcode'))
                 
                 if tool and worker:
                     enriched_lendings.append({
@@ -367,30 +378,265 @@ class LendingService:
             logger.error(f"Fehler beim Laden aktiver Ausleihen: {str(e)}")
             return []
     
+    # Altdaten können used_at als String, Zahl oder gar nicht enthalten. MongoDB
+    # sortiert absteigend erst alle Datumswerte, dann Strings, Zahlen und zuletzt
+    # null/fehlend; $lt vergleicht nur innerhalb eines Typs. Der Cursor merkt sich
+    # daher die Typklasse und schließt alle niedrigeren Klassen ein.
+    _USAGE_CURSOR_KINDS = ('date', 'string', 'number', 'null')
+    _USAGE_KIND_FILTERS = {
+        'string': {'used_at': {'$type': 'string'}},
+        'number': {'used_at': {'$type': 'number'}},
+        'null': {'used_at': None}
+    }
+    
+    @staticmethod
+    def _usage_cursor_kind(used_at: Any) -> str:
+        if isinstance(used_at, datetime):
+            return 'date'
+        if isinstance(used_at, str):
+            return 'string'
+        if isinstance(used_at, (int, float)) and not isinstance(used_at, bool):
+            return 'number'
+        return 'null'
+    
+    @staticmethod
+    def _encode_usage_cursor(usage: Dict[str, Any]) -> str:
+        """Cursor hinter einer Entnahme: (Typklasse, used_at, _id) als URL-sicherer String"""
+        used_at = usage.get('used_at')
+        kind = LendingService._usage_cursor_kind(used_at)
+        value = used_at.isoformat() if kind == 'date' else (used_at if kind != 'null' else None)
+        raw = json.dumps([kind, value, str(usage.get('_id'))])
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+    
+    @staticmethod
+    def _decode_usage_cursor(cursor: str) -> Dict[str, Any]:
+        """Filter für alle Entnahmen nach dem Cursor (absteigend nach used_at, _id)"""
+        try:
+            kind, used_at, usage_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            if kind not in LendingService._USAGE_CURSOR_KINDS:
+                raise ValueError(kind)
+            if kind == 'date':
+                used_at = datetime.fromisoformat(used_at)
+        except (ValueError, TypeError, UnicodeError):
+            raise ValueError("Ungültiger Cursor")
+        id_value = ObjectId(usage_id) if ObjectId.is_valid(usage_id) else usage_id
+        
+        if kind == 'null':
+            return {'used_at': None, '_id': {'$lt': id_value}}
+        conditions = [
+            {'used_at': {'$lt': used_at}},
+            {'used_at': used_at, '_id': {'$lt': id_value}}
+        ]
+        # Alle Entnahmen der nachfolgenden Typklassen
+        lower_kinds = LendingService._USAGE_CURSOR_KINDS[LendingService._USAGE_CURSOR_KINDS.index(kind) + 1:]
+        conditions.extend(LendingService._USAGE_KIND_FILTERS[lower] for lower in lower_kinds)
+        return {'$or': conditions}
+    
+    @staticmethod
+    def get_consumable_usage_page(limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Holt eine Seite der Verbrauchsmaterial-Entnahmen (neueste zuerst)
+        
+        Sortierung und Begrenzung laufen über den Index (department, used_at, _id);
+        weitere Seiten werden per Cursor statt per skip geladen, die Kosten pro
+        Seite bleiben damit unabhängig von der Größe des Entnahme-Protokolls.
+        
+        Args:
+            limit: Anzahl Entnahmen pro Seite
+            cursor: next_cursor der vorherigen Seite (None für die erste Seite)
+            
+        Returns:
+            Dict: {'usages': [...], 'next_cursor': str oder None}
+        
+        Raises:
+            ValueError: bei ungültigem Cursor
+        """
+        filter_dict = LendingService._decode_usage_cursor(cursor) if cursor else {}
+        # Ein Eintrag mehr, um festzustellen, ob es eine weitere Seite gibt
+        usages = mongodb.find('consumable_usages', filter_dict,
+                              sort=[('used_at', -1), ('_id', -1)], limit=limit + 1,
+                              projection=['consumable_barcode', 'worker_barcode', 'quantity', 'used_at'])
+        has_more = len(usages) > limit
+        usages = usages[:limit]
+        
+        consumables_by_barcode = mongodb.find_by_keys('consumables', 'barcode',
+                                                      [u.get('consumable_barcode') for u in usages],
+                                                      projection=['name'])
+        workers_by_barcode = mongodb.find_by_keys('workers', 'barcode',
+                                                  [u.get('worker_barcode') for u in usages],
+                                                  projection=['firstname', 'lastname'])
+        
+        # Erweitere mit Consumable- und Worker-Informationen
+        enriched_usages = []
+        for usage in usages:
+            consumable = consumables_by_barcode.get(usage.get('consumable_barcode'))
+            worker = workers_by_barcode.get(usage.get('worker_barcode'))
+            
+            if consumable and worker:
+                enriched_usages.append({
+                    'consumable_name': consumable['name'],
+                    'quantity': usage['quantity'],
+                    'worker_name': f"{worker['firstname']} {worker['lastname']}",
+                    'used_at': usage.get('used_at')
+                })
+        
+        return {
+            'usages': enriched_usages,
+            # Cursor hinter dem letzten geladenen Eintrag (auch wenn dieser nicht angezeigt wird)
+            'next_cursor': LendingService._encode_usage_cursor(usages[-1]) if has_more else None
+        }
+    
+    @staticmethod
+    def canonical_due_at(value: Any) -> Optional[datetime]:
+        """
+        Kanonisches Fälligkeitsdatum (due_at) einer Ausleihe: Tagesbeginn des
+        erwarteten Rückgabetags. expected_return_date liegt je nach Herkunft als
+        datetime oder als String (YYYY-MM-DD, ISO-Zeitstempel, TT.MM.JJJJ) vor.
+        
+        Returns:
+            datetime um 00:00 Uhr oder None, wenn kein gültiges Datum vorliegt
+        """
+        if isinstance(value, datetime):
+            due_date = value.date()
+        elif isinstance(value, date):
+            due_date = value
+        elif isinstance(value, str) and value.strip():
+            text = value.strip()
+            try:
+                due_date = datetime.fromisoformat(text.replace('Z', '+00:00')).date()
+            except ValueError:
+                try:
+                    due_date = datetime.strptime(text, '%d.%m.%Y').date()
+                except ValueError:
+                    return None
+        else:
+            return None
+        return datetime(due_date.year, due_date.month, due_date.day)
+    
+    @staticmethod
+    def backfill_due_at(open_only: bool = True, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Setzt due_at für Ausleihen mit expected_return_date, aber ohne due_at.
+        Läuft beim Start und nach Wiederherstellungen/Importen, damit auch
+        Ausleihen aus Backups (bulk_write, insert_many, mongorestore) in der
+        Überfälligkeitsabfrage erscheinen. Arbeitet direkt auf der Collection:
+        alle Departments, updated_at bleibt unverändert.
+        
+        Args:
+            open_only: Nur offene Ausleihen (Index: returned_at, due_at)
+            dry_run: Nur zählen, nichts ändern
+        
+        Returns:
+            Dict mit 'updated' und 'invalid' (nicht lesbare Rückgabedaten)
+        """
+        stats = {'updated': 0, 'invalid': 0}
+        try:
+            collection = mongodb.get_collection('lendings')
+            query = {'due_at': {'$exists': False}, 'expected_return_date': {'$exists': True, '$nin': [None, '']}}
+            if open_only:
+                query['returned_at'] = None
+            
+            pending = []
+            for lending in collection.find(query, {'expected_return_date': 1}):
+                due_at = LendingService.canonical_due_at(lending.get('expected_return_date'))
+                if due_at is None:
+                    stats['invalid'] += 1
+                    logger.warning(f"Ausleihe {lending['_id']}: Rückgabedatum nicht lesbar "
+                                   f"({lending.get('expected_return_date')!r})")
+                    continue
+                pending.append(UpdateOne({'_id': lending['_id']}, {'$set': {'due_at': due_at}}))
+                if len(pending) >= Config.MONGODB_BULK_BATCH_SIZE:
+                    if not dry_run:
+                        collection.bulk_write(pending, ordered=False)
+                    stats['updated'] += len(pending)
+                    pending = []
+            if pending:
+                if not dry_run:
+                    collection.bulk_write(pending, ordered=False)
+                stats['updated'] += len(pending)
+            
+            if stats['updated']:
+                logger.info(f"due_at für {stats['updated']} Ausleihen nachgetragen")
+        except Exception as e:
+            logger.error(f"Fehler beim Nachtragen von due_at: {str(e)}")
+        return stats
+    
+    @staticmethod
+    def _barcode_lookup(collection_name: str, local_field: str, as_field: str,
+                        fields: List[str], extra_match: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """$lookup über barcode, auf das aktuelle Department beschränkt (wie find_one)"""
+        match = dict(extra_match or {})
+        current_department = MongoDBDatabase._get_current_department()
+        if current_department and collection_name in MongoDBDatabase._SCOPED_COLLECTIONS:
+            match.update(MongoDBDatabase._department_scope_clause(current_department))
+        return {'$lookup': {
+            'from': collection_name,
+            'localField': local_field,
+            'foreignField': 'barcode',
+            'pipeline': [{'$match': match}, {'$project': {field: 1 for field in fields}}, {'$limit': 1}],
+            'as': as_field
+        }}
+    
+    @staticmethod
+    def get_open_lendings_with_details(match: Dict[str, Any], sort: Dict[str, int]) -> List[Dict[str, Any]]:
+        """
+        Offene Ausleihen, die match erfüllen, mit Werkzeug- und Mitarbeiterdaten.
+        Filter und Join laufen in einer Aggregation auf dem Server; die Kosten
+        hängen nur von der Anzahl Treffer ab.
+        
+        Returns:
+            List[Dict]: Ausleihen mit tool_name und worker_name (None, falls nicht gefunden)
+        """
+        pipeline = [
+            {'$match': {'returned_at': None, **match}},
+            {'$sort': sort},
+            LendingService._barcode_lookup('tools', 'tool_barcode', 'tool', ['name']),
+            LendingService._barcode_lookup('workers', 'worker_barcode', 'worker', ['firstname', 'lastname'],
+                                           extra_match={'deleted': {'$ne': True}}),
+        ]
+        lendings = mongodb.aggregate('lendings', pipeline)
+        for lending in lendings:
+            tool = lending.pop('tool', None) or [{}]
+            worker = lending.pop('worker', None) or [{}]
+            lending['tool_name'] = tool[0].get('name')
+            lending['worker_name'] = (f"{worker[0]['firstname']} {worker[0]['lastname']}"
+                                      if worker[0].get('firstname') is not None else None)
+        return lendings
+    
+    @staticmethod
+    def get_overdue_lendings(today: Optional[date] = None) -> List[Dict[str, Any]]:
+        """
+        Überfällige Ausleihen (returned_at: None, due_at vor heute), die am
+        längsten überfälligen zuerst. Gemeinsame Abfrage für Statistik,
+        Dashboard-Warnungen und Benachrichtigungen (Index: returned_at, due_at).
+        
+        Returns:
+            List[Dict]: tool_name, tool_barcode, worker_name, worker_barcode,
+            expected_return_date (= due_at), days_overdue, lent_at
+        """
+        today = today or datetime.now().date()
+        start_of_today = datetime(today.year, today.month, today.day)
+        
+        overdue_loans = []
+        for lending in LendingService.get_open_lendings_with_details(
+                {'due_at': {'$lt': start_of_today}}, {'due_at': 1}):
+            due_at = lending['due_at']
+            overdue_loans.append({
+                'tool_name': lending['tool_name'] or 'Unbekanntes Werkzeug',
+                'tool_barcode': lending.get('tool_barcode'),
+                'worker_name': lending['worker_name'] or 'Unbekannt',
+                'worker_barcode': lending.get('worker_barcode'),
+                'expected_return_date': due_at,
+                'days_overdue': (today - due_at.date()).days,
+                'lent_at': lending.get('lent_at')
+            })
+        return overdue_loans
+    
     @staticmethod
     def get_recent_consumable_usage(limit: int = 10) -> list:
         """Holt die letzten Verbrauchsmaterial-Entnahmen"""
         try:
-            recent_usages = mongodb.find('consumable_usages')
-            # Sortiere und limitiere
-            recent_usages.sort(key=lambda x: x.get('used_at', datetime.min), reverse=True)
-            recent_usages = recent_usages[:limit]
-            
-            # Erweitere mit Consumable- und Worker-Informationen
-            enriched_usages = []
-            for usage in recent_usages:
-                consumable = mongodb.find_one('consumables', {'barcode': usage['consumable_barcode']})
-                worker = mongodb.find_one('workers', {'barcode': usage['worker_barcode']})
-                
-                if consumable and worker:
-                    enriched_usages.append({
-                        'consumable_name': consumable['name'],
-                        'quantity': usage['quantity'],
-                        'worker_name': f"{worker['firstname']} {worker['lastname']}",
-                        'used_at': usage['used_at']
-                    })
-            
-            return enriched_usages
+            return LendingService.get_consumable_usage_page(limit)['usages']
             
         except Exception as e:
             logger.error(f"Fehler beim Laden der Verbrauchsmaterial-Entnahmen: {str(e)}")
@@ -411,10 +657,13 @@ class LendingService:
             # Hole alle Verbrauchsmaterial-Ausgaben des Mitarbeiters
             usages = mongodb.find('consumable_usages', {'worker_barcode': worker_barcode})
             
+            consumables_by_barcode = mongodb.find_by_keys('consumables', 'barcode',
+                                                          [u.get('consumable_barcode') for u in usages])
+            
             # Erweitere mit Consumable-Informationen
             enriched_usages = []
             for usage in usages:
-                consumable = mongodb.find_one('consumables', {'barcode': usage['consumable_barcode']})
+                consumable = consumables_by_barcode.get(usage.get('consumable_barcode'))
                 if consumable:
                     usage['consumable_name'] = consumable.get('name', '')
                     usage['consumable_barcode'] = usage['consumable_barcode']
@@ -459,12 +708,12 @@ class LendingService:
             
             if current_lending:
                 # Worker-Informationen hinzufügen
-                worker = mongodb.find_one('workers', {'barcode': current_lending['worker_barcode']})
+                worker = mongodb.find_one('workers', {'barcode': current_lending['worker_barcode']}, cached=True)
                 if worker:
                     current_lending['worker_name'] = f"{worker['firstname']} {worker['lastname']}"
                 
                 # Tool-Informationen hinzufügen
-                tool = mongodb.find_one('tools', {'barcode': tool_barcode})
+                tool = mongodb.find_one('tools', {'barcode': tool_barcode}, cached=True)
                 if tool:
                     current_lending['tool_name'] = tool['name']
             
@@ -474,6 +723,36 @@ class LendingService:
             logger.error(f"Fehler beim Laden der aktuellen Ausleihe: {str(e)}")
             return None
     
+    @staticmethod
+    def get_current_lendings(tool_barcodes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Holt die aktuellen Ausleihen für mehrere Werkzeuge (Mengen-Variante von
+        get_current_lending): eine $in-Abfrage auf lendings und eine auf workers,
+        unabhängig von der Anzahl Werkzeuge
+        
+        Args:
+            tool_barcodes: Barcodes der Werkzeuge
+            
+        Returns:
+            Dict[str, Dict]: Werkzeug-Barcode -> aktuelle Ausleihe (mit worker_name)
+        """
+        try:
+            lendings_by_tool = mongodb.find_by_keys('lendings', 'tool_barcode', tool_barcodes,
+                                                    filter_dict={'returned_at': None})
+            workers_by_barcode = mongodb.find_by_keys('workers', 'barcode',
+                                                      [l.get('worker_barcode') for l in lendings_by_tool.values()])
+            
+            for lending in lendings_by_tool.values():
+                worker = workers_by_barcode.get(lending.get('worker_barcode'))
+                if worker:
+                    lending['worker_name'] = f"{worker['firstname']} {worker['lastname']}"
+            
+            return lendings_by_tool
+            
+        except Exception as e:
+            logger.error(f"Fehler beim Laden der aktuellen Ausleihen: {str(e)}")
+            return {}
+    
     @staticmethod
     def get_tool_lending_history(tool_barcode: str) -> List[Dict[str, Any]]:
         """
@@ -488,10 +767,13 @@ class LendingService:
         try:
             lendings = mongodb.find('lendings', {'tool_barcode': tool_barcode})
             
+            workers_by_barcode = mongodb.find_by_keys('workers', 'barcode',
+                                                      [l.get('worker_barcode') for l in lendings])
+            
             # Erweitere mit Worker-Informationen
             enriched_lendings = []
             for lending in lendings:
-                worker = mongodb.find_one('workers', {'barcode': lending['worker_barcode']})
+                worker = workers_by_barcode.get(lending.get('worker_barcode'))
                 if worker:
                     lending['worker_name'] = f"{worker['firstname']} {worker['lastname']}"
                 
@@ -528,17 +810,18 @@ class LendingService:
         try:
             issues = []
             
-            # 1. Prüfe Werkzeuge mit falschem Status
-            tools = list(mongodb.find('tools', {'deleted': {'$ne': True}}))
+            # Barcodes aller aktiv ausgeliehenen Werkzeuge (eine Abfrage statt find_one pro Werkzeug)
+            lent_barcodes = set(mongodb.distinct('lendings', 'tool_barcode', {'returned_at': None}))
+            
+            # 1. Prüfe Werkzeuge mit falschem Status (gestreamt, nur benötigte Felder)
+            tools = mongodb.iter_find('tools', {'deleted': {'$ne': True}},
+                                      projection=['barcode', 'name', 'status'])
             for tool in tools:
                 barcode = tool.get('barcode')
                 status = tool.get('status')
                 
                 # Prüfe aktive Ausleihe
-                active_lending = mongodb.find_one('lendings', {
-                    'tool_barcode': barcode,
-                    'returned_at': None
-                })
+                active_lending = barcode in lent_barcodes
                 
                 if active_lending and status != 'ausgeliehen':
                     issues.append({
@@ -564,10 +847,14 @@ class LendingService:
                 'returned_at': None,
                 'tool_barcode': {'$exists': True}
             }))
+            existing_tools = mongodb.find_by_keys('tools', 'barcode',
+                                                  [l.get('tool_barcode') for l in orphaned_lendings],
+                                                  projection=['barcode'],
+                                                  filter_dict={'deleted': {'$ne': True}})
             
             for lending in orphaned_lendings:
                 tool_barcode = lending.get('tool_barcode')
-                tool = mongodb.find_one('tools', {'barcode': tool_barcode, 'deleted': {'$ne': True}})
+                tool = existing_tools.get(tool_barcode)
                 
                 if not tool:
                     issues.append({
@@ -727,7 +1014,7 @@ class LendingService:
                 return False, 'Werkzeug nicht gefunden'
             
             # Worker-Informationen holen
-            worker = mongodb.find_one('workers', {'barcode': lending['worker_barcode'], 'deleted': {'$ne': True}})
+            worker = mongodb.find_one('workers', {'barcode': lending['worker_barcode'], 'deleted': {'$ne': True}}, cached=True)
             worker_name = f"{worker['firstname']} {worker['lastname']}" if worker else "Unbekannt"
             logger.info(f"Worker gefunden: {worker_name}")
             
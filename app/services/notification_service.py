@@ -7,6 +7,7 @@ from datetime import datetime
 from flask import current_app
 from app.models.mongodb_database import mongodb
 from app.services.email_service import EmailService
+from app.services.lending_service import LendingService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -267,21 +268,18 @@ class NotificationService:
             # Werkzeuge die länger als 30 Tage ausgeliehen sind
             overdue_date = datetime.now() - timedelta(days=30)
             
-            overdue_lendings = mongodb.find('lendings', {
-                'returned_at': None,
-                'lent_at': {'$lt': overdue_date}
-            })
+            # Filter und Join (Werkzeug, Mitarbeiter) in einer Abfrage auf dem Server
+            overdue_lendings = LendingService.get_open_lendings_with_details(
+                {'lent_at': {'$lt': overdue_date}}, {'lent_at': 1}
+            )
             
             notification_count = 0
             
             for lending in overdue_lendings:
                 try:
-                    tool = mongodb.find_one('tools', {'barcode': lending['tool_barcode']})
-                    worker = mongodb.find_one('workers', {'barcode': lending['worker_barcode']})
-                    
-                    if tool and worker:
+                    if lending['tool_name'] is not None and lending['worker_name'] is not None:
                         title = "Überfälliges Werkzeug"
-                        message = f"Das Werkzeug '{tool.get('name', '')}' ist seit über 30 Tagen an {worker.get('firstname', '')} {worker.get('lastname', '')} ausgeliehen."
+                        message = f"Das Werkzeug '{lending['tool_name']}' ist seit über 30 Tagen an {lending['worker_name']} ausgeliehen."
                         
                         success, _ = self.create_system_alert(title, message, "warning")
                         if success:
@@ -1,54 +1,212 @@
 """
 Zentraler Statistics Service für Scandy
 Berechnet alle Statistiken an einem Ort und macht sie wiederverwendbar
+
+Die Dashboard-Statistiken werden pro Department als Snapshot in der
+Collection 'statistics_snapshots' abgelegt und beim Seitenaufruf nur gelesen.
+Schreiboperationen auf die zugrunde liegenden Collections markieren den
+Snapshot als veraltet; ein Hintergrund-Thread berechnet veraltete oder zu
+alte (STATISTICS_SNAPSHOT_MAX_AGE) Snapshots neu, wobei jeweils nur ein
+Worker einen Snapshot übernimmt.
 """
-from typing import Dict, Any, List
-from datetime import datetime
-from app.models.mongodb_database import mongodb
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta
+from flask import g, has_app_context
+from app.config.config import Config
+from app.models.mongodb_database import mongodb, MongoDBDatabase
 from app.models.mongodb_models import MongoDBTool
+from app.services.lending_service import LendingService
 import logging
+import os
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+SNAPSHOT_COLLECTION = 'statistics_snapshots'
+# Snapshot-ID für Aufrufe ohne Department
+GLOBAL_SNAPSHOT_ID = '__global__'
+# Collections, deren Änderungen die Statistiken beeinflussen
+SOURCE_COLLECTIONS = ('tools', 'consumables', 'workers', 'lendings', 'consumable_usages', 'tickets')
+# Maximale Dauer einer Neuberechnung, bevor ein anderer Worker übernehmen darf
+REFRESH_LEASE_SECONDS = 120
+
+_MARKED_ATTR = '_statistics_snapshot_marked'
+
 class StatisticsService:
     """Zentraler Service für alle Statistiken"""
     
+    _refresher_thread = None
+    _refresher_pid = None
+    _refresher_app = None
+    
     @staticmethod
     def get_all_statistics() -> Dict[str, Any]:
         """
-        Lädt alle Statistiken auf einmal.
+        Lädt alle Statistiken auf einmal aus dem Snapshot des aktuellen Departments.
         Wiederverwendbar für Dashboard, Admin-Dashboard und Startseite.
+        
+        Returns:
+            Dict mit den Statistiken und 'computed_at' (Zeitpunkt der Berechnung)
         """
         try:
-            # Basis-Statistiken von MongoDBTool
-            base_stats = MongoDBTool.get_statistics()
-            
-            # Ticket-Statistiken
-            ticket_stats = StatisticsService._get_ticket_statistics()
-            
-            # Duplikat-Barcodes
-            duplicate_barcodes = MongoDBTool.get_duplicate_barcodes()
+            StatisticsService._ensure_refresher()
+            department = MongoDBDatabase._get_current_department()
+            snapshot = StatisticsService._snapshots().find_one({'_id': StatisticsService._snapshot_id(department)})
+            if not snapshot or 'stats' not in snapshot:
+                # Erster Aufruf für dieses Department: einmalig synchron berechnen
+                snapshot = StatisticsService.refresh_snapshot(department)
             
-            # Bestandsprognose
-            consumables_forecast = MongoDBTool.get_consumables_forecast()
-            
-            # Überfällige Ausleihen
-            overdue_loans = StatisticsService._get_overdue_loans()
-            
-            return {
-                'tool_stats': base_stats['tool_stats'],
-                'consumable_stats': base_stats['consumable_stats'],
-                'worker_stats': base_stats['worker_stats'],
-                'ticket_stats': ticket_stats,
-                'duplicate_barcodes': duplicate_barcodes,
-                'consumables_forecast': consumables_forecast,
-                'overdue_loans': overdue_loans
-            }
+            stats = dict(snapshot['stats'])
+            stats['computed_at'] = snapshot.get('computed_at')
+            return stats
             
         except Exception as e:
             logger.error(f"Fehler beim Laden der Statistiken: {str(e)}")
             return StatisticsService._get_fallback_statistics()
     
+    @staticmethod
+    def compute_statistics() -> Dict[str, Any]:
+        """
+        Berechnet alle Statistiken direkt aus den Collections (Department-Scoping
+        über g.current_department). Fehler werden an den Aufrufer weitergegeben.
+        """
+        # Basis-Statistiken von MongoDBTool
+        base_stats = MongoDBTool.get_statistics()
+        
+        # Ticket-Statistiken
+        ticket_stats = StatisticsService._get_ticket_statistics()
+        
+        # Duplikat-Barcodes
+        duplicate_barcodes = MongoDBTool.get_duplicate_barcodes()
+        
+        # Bestandsprognose
+        consumables_forecast = MongoDBTool.get_consumables_forecast()
+        
+        # Überfällige Ausleihen
+        overdue_loans = StatisticsService._get_overdue_loans()
+        
+        return {
+            'tool_stats': base_stats['tool_stats'],
+            'consumable_stats': base_stats['consumable_stats'],
+            'worker_stats': base_stats['worker_stats'],
+            'ticket_stats': ticket_stats,
+            'duplicate_barcodes': duplicate_barcodes,
+            'consumables_forecast': consumables_forecast,
+            'overdue_loans': overdue_loans
+        }
+    
+    # ===== SNAPSHOTS =====
+    
+    @staticmethod
+    def _snapshots():
+        """Snapshot-Collection (direkt, ohne Department-Scoping)"""
+        return mongodb.get_collection(SNAPSHOT_COLLECTION)
+    
+    @staticmethod
+    def _snapshot_id(department: Optional[str]) -> str:
+        return department or GLOBAL_SNAPSHOT_ID
+    
+    @staticmethod
+    def refresh_snapshot(department: Optional[str]) -> Dict[str, Any]:
+        """
+        Berechnet den Snapshot eines Departments neu und speichert ihn.
+        Muss im App-Context mit g.current_department == department laufen.
+        """
+        snapshot_id = StatisticsService._snapshot_id(department)
+        # dirty vor der Berechnung zurücksetzen: Änderungen währenddessen markieren erneut
+        StatisticsService._snapshots().update_one(
+            {'_id': snapshot_id}, {'$set': {'dirty': False, 'department': department}}, upsert=True
+        )
+        stats = StatisticsService.compute_statistics()
+        snapshot = {'stats': stats, 'computed_at': datetime.now(), 'department': department}
+        StatisticsService._snapshots().update_one(
+            {'_id': snapshot_id}, {'$set': snapshot, '$unset': {'refreshing_until': ''}}, upsert=True
+        )
+        return snapshot
+    
+    @staticmethod
+    def mark_snapshots_dirty():
+        """
+        Markiert die Snapshots des aktuellen Departments (und den globalen) als
+        veraltet. Wird nach Schreiboperationen auf SOURCE_COLLECTIONS aufgerufen,
+        pro Request höchstens einmal.
+        """
+        if has_app_context():
+            if getattr(g, _MARKED_ATTR, False):
+                return
+            setattr(g, _MARKED_ATTR, True)
+        department = MongoDBDatabase._get_current_department()
+        if department:
+            filter_dict = {'_id': {'$in': [department, GLOBAL_SNAPSHOT_ID]}}
+        else:
+            filter_dict = {}
+        filter_dict['dirty'] = {'$ne': True}
+        StatisticsService._snapshots().update_many(filter_dict, {'$set': {'dirty': True}})
+    
+    @staticmethod
+    def _claim_stale_snapshot() -> Optional[Dict[str, Any]]:
+        """Übernimmt einen veralteten Snapshot zur Neuberechnung (None wenn keiner fällig)"""
+        now = datetime.now()
+        return StatisticsService._snapshots().find_one_and_update(
+            {
+                '$or': [
+                    {'dirty': True},
+                    {'computed_at': {'$lt': now - timedelta(seconds=Config.STATISTICS_SNAPSHOT_MAX_AGE)}}
+                ],
+                'refreshing_until': {'$not': {'$gt': now}}
+            },
+            {'$set': {'refreshing_until': now + timedelta(seconds=REFRESH_LEASE_SECONDS)}}
+        )
+    
+    @staticmethod
+    def refresh_stale_snapshots(app) -> int:
+        """Berechnet alle fälligen Snapshots neu; liefert die Anzahl"""
+        refreshed = 0
+        with app.app_context():
+            while True:
+                snapshot = StatisticsService._claim_stale_snapshot()
+                if not snapshot:
+                    break
+                department = snapshot.get('department')
+                try:
+                    g.current_department = department
+                    StatisticsService.refresh_snapshot(department)
+                    refreshed += 1
+                except Exception as e:
+                    logger.error(f"Fehler beim Aktualisieren des Statistik-Snapshots {snapshot['_id']}: {e}")
+        return refreshed
+    
+    @staticmethod
+    def _refresh_loop(app):
+        """Hauptschleife des Hintergrund-Threads"""
+        while True:
+            try:
+                StatisticsService.refresh_stale_snapshots(app)
+            except Exception as e:
+                logger.error(f"Fehler im Statistik-Snapshot-Thread: {e}")
+            time.sleep(Config.STATISTICS_REFRESH_INTERVAL)
+    
+    @staticmethod
+    def start_refresher(app):
+        """Startet den Hintergrund-Thread für die Snapshots (einmal pro Prozess)"""
+        pid = os.getpid()
+        thread = StatisticsService._refresher_thread
+        if thread and thread.is_alive() and StatisticsService._refresher_pid == pid:
+            return
+        StatisticsService._refresher_app = app
+        StatisticsService._refresher_pid = pid
+        StatisticsService._refresher_thread = threading.Thread(
+            target=StatisticsService._refresh_loop, args=(app,), name='statistics-snapshots', daemon=True
+        )
+        StatisticsService._refresher_thread.start()
+    
+    @staticmethod
+    def _ensure_refresher():
+        """Startet den Thread nach einem fork (gunicorn --preload) im Worker neu"""
+        if StatisticsService._refresher_app is not None and StatisticsService._refresher_pid != os.getpid():
+            StatisticsService.start_refresher(StatisticsService._refresher_app)
+    
     @staticmethod
     def _get_ticket_statistics() -> Dict[str, int]:
         """Berechnet Ticket-Statistiken"""
@@ -78,7 +236,7 @@ class StatisticsService:
                 }
             ]
             
-            ticket_stats_result = list(mongodb.db.tickets.aggregate(ticket_pipeline))
+            ticket_stats_result = mongodb.aggregate('tickets', ticket_pipeline)
             return ticket_stats_result[0] if ticket_stats_result else {
                 'total': 0, 'open': 0, 'in_progress': 0, 'closed': 0
             }
@@ -89,58 +247,9 @@ class StatisticsService:
     
     @staticmethod
     def _get_overdue_loans() -> List[Dict[str, Any]]:
-        """Findet alle überfälligen Ausleihen"""
+        """Findet alle überfälligen Ausleihen (serverseitig über due_at)"""
         try:
-            today = datetime.now().date()
-            
-            # Finde alle aktiven Ausleihen mit Rückgabedatum
-            active_loans = list(mongodb.find('lendings', {
-                'returned_at': None,
-                'expected_return_date': {'$exists': True, '$ne': None}
-            }))
-            
-            overdue_loans = []
-            
-            for loan in active_loans:
-                expected_date = loan.get('expected_return_date')
-                if not expected_date:
-                    continue
-                
-                # Konvertiere String zu datetime falls nötig
-                if isinstance(expected_date, str):
-                    try:
-                        expected_date = datetime.strptime(expected_date, '%Y-%m-%d')
-                    except ValueError:
-                        continue
-                
-                # Prüfe ob überfällig
-                if expected_date.date() < today:
-                    # Hole Tool-Informationen
-                    tool = mongodb.find_one('tools', {'barcode': loan.get('tool_barcode')})
-                    
-                    # Hole Mitarbeiter-Informationen
-                    worker = mongodb.find_one('workers', {
-                        'barcode': loan.get('worker_barcode'),
-                        'deleted': {'$ne': True}
-                    })
-                    
-                    # Berechne Tage überfällig
-                    days_overdue = (today - expected_date.date()).days
-                    
-                    overdue_loans.append({
-                        'tool_name': tool.get('name') if tool else 'Unbekanntes Werkzeug',
-                        'tool_barcode': loan.get('tool_barcode'),
-                        'worker_name': f"{worker['firstname']} {worker['lastname']}" if worker else 'Unbekannt',
-                        'worker_barcode': loan.get('worker_barcode'),
-                        'expected_return_date': expected_date,
-                        'days_overdue': days_overdue,
-                        'lent_at': loan.get('lent_at')
-                    })
-            
-            # Sortiere nach Anzahl der überfälligen Tage (absteigend)
-            overdue_loans.sort(key=lambda x: x['days_overdue'], reverse=True)
-            
-            return overdue_loans
+            return LendingService.get_overdue_lendings()
             
         except Exception as e:
             logger.error(f"Fehler beim Berechnen überfälliger Ausleihen: {str(e)}")
@@ -169,4 +278,8 @@ class StatisticsService:
             return notices
         except Exception as e:
             logger.error(f"Fehler beim Laden der Hinweise: {str(e)}")
-            return [] 
\ No newline at end of file
+            return [] 
+
+# Schreiboperationen auf die Quell-Collections markieren die Snapshots als veraltet
+for _collection_name in SOURCE_COLLECTIONS:
+    MongoDBDatabase.register_write_listener(_collection_name, StatisticsService.mark_snapshots_dirty)
@@ -0,0 +1,125 @@
+"""
+Ticket-Detailansichten in einer Datenbankabfrage laden
+
+Die Detailseiten eines Tickets (Ansicht, Detail, Auftragsdetails als Seite und
+Modal) brauchen neben dem Ticket Notizen, Nachrichten, Auftragsdetails,
+Material, Arbeiten, Zuweisungen und teilweise die aktiven Benutzer. Früher
+waren das bis zu neun nacheinander ausgeführte Abfragen. TicketDetailLoader
+hängt die benötigten Teile per $lookup an das Ticket und lädt alles in einer
+einzigen Aggregation auf 'tickets'.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+
+from app.models.mongodb_database import mongodb, MongoDBDatabase
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Abschnitt -> (Collection, Sortierung, Limit)
+SECTIONS = {
+    'notes': ('ticket_notes', None, None),
+    'messages': ('ticket_messages', {'created_at': 1}, None),
+    'auftrag_details': ('auftrag_details', None, 1),
+    'material_list': ('auftrag_material', None, None),
+    'arbeit_list': ('auftrag_arbeit', None, None),
+    'assignments': ('ticket_assignments', None, None)
+}
+
+# Felder der Benutzer für die Zuweisungsauswahl
+USER_FIELDS = ['username', 'firstname', 'lastname', 'role']
+
+
+class TicketDetailLoader:
+    """Lädt ein Ticket mit den gewünschten Abschnitten in einer Aggregation"""
+
+    @staticmethod
+    def _id_candidates(ticket_id: str) -> List[Any]:
+        """String-ID und, falls gültig, ObjectId (wie find_document_by_id)"""
+        candidates = [ticket_id]
+        if ObjectId.is_valid(ticket_id):
+            candidates.append(ObjectId(ticket_id))
+        return candidates
+
+    @staticmethod
+    def _lookup(collection_name: str, match: Dict[str, Any], as_field: str,
+                sort: Optional[Dict[str, int]] = None, limit: Optional[int] = None,
+                fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Unkorrelierter $lookup, auf das aktuelle Department beschränkt (wie find)"""
+        match = dict(match)
+        current_department = MongoDBDatabase._get_current_department()
+        if current_department and collection_name in MongoDBDatabase._SCOPED_COLLECTIONS:
+            match.update(MongoDBDatabase._department_scope_clause(current_department))
+        pipeline = [{'$match': match}]
+        if sort:
+            pipeline.append({'$sort': sort})
+        if limit:
+            pipeline.append({'$limit': limit})
+        if fields:
+            pipeline.append({'$project': {field: 1 for field in fields}})
+        return {'$lookup': {'from': collection_name, 'pipeline': pipeline, 'as': as_field}}
+
+    @staticmethod
+    def _stringify_ids(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """_id der angehängten Dokumente als String (wie bei mongodb.find)"""
+        for doc in docs:
+            if '_id' in doc:
+                doc['_id'] = str(doc['_id'])
+        return docs
+
+    @staticmethod
+    def load(ticket_id: str, sections: Iterable[str] = tuple(SECTIONS),
+             include_users: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Lädt ein Ticket samt der angegebenen Abschnitte
+
+        Args:
+            ticket_id: Ticket-ID aus der URL (String oder ObjectId-String)
+            sections: Schlüssel aus SECTIONS, die mitgeladen werden
+            include_users: Aktive Benutzer (nur USER_FIELDS) mitladen
+
+        Returns:
+            Dict mit 'ticket' sowie je Abschnitt einer Liste (auftrag_details:
+            Dokument oder None), 'assigned_users' (inkl. Legacy-Zuweisung) und
+            'users'; None, falls das Ticket nicht existiert
+        """
+        if not ticket_id:
+            return None
+
+        sections = [name for name in SECTIONS if name in set(sections)]
+        child_match = {'ticket_id': str(ticket_id)}
+        pipeline = [
+            {'$match': {'_id': {'$in': TicketDetailLoader._id_candidates(str(ticket_id))}}},
+            {'$limit': 1}
+        ]
+        for name in sections:
+            collection_name, sort, limit = SECTIONS[name]
+            pipeline.append(TicketDetailLoader._lookup(collection_name, child_match, f'_{name}',
+                                                       sort=sort, limit=limit))
+        if include_users:
+            pipeline.append(TicketDetailLoader._lookup('users', {'is_active': True}, '_users',
+                                                       fields=USER_FIELDS))
+
+        results = mongodb.aggregate('tickets', pipeline)
+        if not results:
+            return None
+
+        ticket = results[0]
+        details = {'ticket': ticket}
+        for name in sections:
+            details[name] = TicketDetailLoader._stringify_ids(ticket.pop(f'_{name}', []))
+        if 'auftrag_details' in details:
+            details['auftrag_details'] = details['auftrag_details'][0] if details['auftrag_details'] else None
+        if 'assignments' in details:
+            assigned_users = [assignment['assigned_to'] for assignment in details['assignments']
+                              if assignment.get('assigned_to')]
+            # Falls keine Mehrfachzuweisungen vorhanden, verwende die Legacy-Zuweisung
+            if not assigned_users and ticket.get('assigned_to'):
+                assigned_users = [ticket['assigned_to']]
+            details['assigned_users'] = assigned_users
+        if include_users:
+            details['users'] = TicketDetailLoader._stringify_ids(ticket.pop('_users', []))
+
+        logger.debug(f"Ticket {ticket_id} mit {', '.join(sections) or 'keinen Abschnitten'} in einer Abfrage geladen")
+        return details
@@ -16,6 +16,12 @@ logger = logging.getLogger(__name__)
 class ToolService:
     """Zentraler Service für alle Werkzeug-Operationen"""
     
+    # Felder, die die Werkzeug-Übersicht tatsächlich rendert
+    LIST_VIEW_FIELDS = [
+        'name', 'barcode', 'category', 'location', 'status', 'preview_image',
+        'user_groups', 'department', 'deleted', 'created_at', 'modified_at', 'deleted_at'
+    ]
+    
     def __init__(self):
         self.lending_service = None
         self.utility_service = None
@@ -32,10 +38,13 @@ class ToolService:
             self.utility_service = UtilityService()
         return self.utility_service
     
-    def get_all_tools(self) -> List[Dict[str, Any]]:
+    def get_all_tools(self, projection: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         Holt alle aktiven Werkzeuge
         
+        Args:
+            projection: Optional - nur diese Felder laden (z.B. LIST_VIEW_FIELDS)
+        
         Returns:
             List: Liste aller Werkzeuge
         """
@@ -43,7 +52,12 @@ class ToolService:
             query = {'deleted': {'$ne': True}}
             if getattr(g, 'current_department', None):
                 query['department'] = g.current_department
-            tools = list(mongodb.find('tools', query))
+            tools = list(mongodb.find('tools', query, projection=projection))
+            
+            # Aktuelle Ausleihen aller Werkzeuge gesammelt laden (konstante Anzahl Abfragen)
+            current_lendings = self._get_lending_service().get_current_lendings(
+                [tool.get('barcode') for tool in tools]
+            )
             
             # Datetime-Felder konvertieren und zusätzliche Informationen hinzufügen
             processed_tools = []
@@ -53,7 +67,7 @@ class ToolService:
                     tool['id'] = str(tool['_id'])
                     
                     # Aktuelle Ausleihe hinzufügen
-                    current_lending = self._get_lending_service().get_current_lending(tool['barcode'])
+                    current_lending = current_lendings.get(tool['barcode'])
                     if current_lending:
                         tool['is_borrowed'] = True
                         tool['current_borrower'] = current_lending.get('worker_name', 'Unbekannt')
@@ -457,12 +471,13 @@ class ToolService:
             logger.error(f"Fehler bei der Werkzeug-Suche: {str(e)}")
             return []
     
-    def get_tools_by_category(self, category: str) -> List[Dict[str, Any]]:
+    def get_tools_by_category(self, category: str, projection: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         Holt Werkzeuge nach Kategorie
         
         Args:
             category: Kategorie
+            projection: Optional - nur diese Felder laden (z.B. LIST_VIEW_FIELDS)
             
         Returns:
             List: Liste der Werkzeuge in der Kategorie
@@ -471,7 +486,7 @@ class ToolService:
             query = {'category': category, 'deleted': {'$ne': True}}
             if getattr(g, 'current_department', None):
                 query['department'] = g.current_department
-            tools = list(mongodb.find('tools', query))
+            tools = list(mongodb.find('tools', query, projection=projection))
             
             # Datetime-Felder konvertieren
             for tool in tools:
@@ -484,12 +499,13 @@ class ToolService:
             logger.error(f"Fehler beim Laden der Werkzeuge nach Kategorie: {str(e)}")
             return []
     
-    def get_tools_by_location(self, location: str) -> List[Dict[str, Any]]:
+    def get_tools_by_location(self, location: str, projection: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         Holt Werkzeuge nach Standort
         
         Args:
             location: Standort
+            projection: Optional - nur diese Felder laden (z.B. LIST_VIEW_FIELDS)
             
         Returns:
             List: Liste der Werkzeuge am Standort
@@ -498,7 +514,7 @@ class ToolService:
             query = {'location': location, 'deleted': {'$ne': True}}
             if getattr(g, 'current_department', None):
                 query['department'] = g.current_department
-            tools = list(mongodb.find('tools', query))
+            tools = list(mongodb.find('tools', query, projection=projection))
             
             # Datetime-Felder konvertieren
             for tool in tools:
@@ -599,7 +615,18 @@ class ToolService:
             import csv
             from io import StringIO
             
-            tools = self.get_all_tools()
+            # Werkzeuge streamen statt alle angereichert im Speicher zu halten
+            query = {'deleted': {'$ne': True}}
+            if getattr(g, 'current_department', None):
+                query['department'] = g.current_department
+            active_lendings = {}
+            for lending in mongodb.iter_find('lendings', {'returned_at': None},
+                                             projection=['tool_barcode', 'expected_return_date']):
+                active_lendings.setdefault(lending.get('tool_barcode'), lending)
+            tools = mongodb.iter_find('tools', query, projection=[
+                'barcode', 'name', 'description', 'category', 'location',
+                'status', 'created_at', 'modified_at', 'deleted_at'
+            ])
             
             output = StringIO()
             writer = csv.writer(output)
@@ -612,6 +639,20 @@ class ToolService:
             
             # Daten
             for tool in tools:
+                tool = self._convert_datetime_fields(tool)
+                current_lending = active_lendings.get(tool.get('barcode'))
+                tool['is_borrowed'] = current_lending is not None
+                if current_lending:
+                    expected_date = current_lending.get('expected_return_date')
+                    if isinstance(expected_date, str):
+                        try:
+                            expected_date = datetime.strptime(expected_date, '%Y-%m-%d')
+                        except ValueError:
+                            expected_date = None
+                    if expected_date and expected_date.date() < datetime.now().date():
+                        tool['status'] = 'überfällig'
+                    else:
+                        tool['status'] = 'ausgeliehen'
                 writer.writerow([
                     tool.get('barcode', ''),
                     tool.get('name', ''),
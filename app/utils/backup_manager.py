@@ -6,6 +6,57 @@ from pathlib import Path
 from datetime import datetime
 from bson import ObjectId
 from app.models.mongodb_database import mongodb
+from app.services.lending_service import LendingService
+
+def stream_collections_to_json(f, collection_names, metadata_factory, serialize=None, batch_size=None):
+    """
+    Schreibt ein JSON-Backup ({"data": {...}, "metadata": {...}}) dokumentweise in f.
+    Die Collections werden per iter_find gestreamt, sodass nie eine ganze Collection
+    im Speicher liegt. Die Metadaten werden am Ende geschrieben, weil sie die
+    Dokumentanzahlen enthalten können (metadata_factory erhält {collection: anzahl}).
+    Schlägt das Lesen einer Collection fehl, wird der Fehler weitergereicht: f ist
+    dann unvollständig und darf nicht als Backup verwendet werden.
+    
+    Returns:
+        dict: Anzahl gesicherter Dokumente pro Collection
+    """
+    counts = {}
+    f.write('{\n  "data": {')
+    for index, collection_name in enumerate(collection_names):
+        f.write(('' if index == 0 else ',') + '\n    ' + json.dumps(collection_name) + ': [')
+        count = 0
+        try:
+            for doc in mongodb.iter_find(collection_name, {}, batch_size=batch_size, no_cursor_timeout=True):
+                if serialize:
+                    doc = serialize(doc)
+                f.write((',' if count else '') + '\n      ' + json.dumps(doc, ensure_ascii=False, default=str))
+                count += 1
+        except Exception as e:
+            print(f"Fehler beim Sichern von {collection_name} nach {count} Dokumenten: {e}")
+            raise
+        f.write('\n    ]')
+        counts[collection_name] = count
+    metadata = metadata_factory(counts)
+    f.write('\n  },\n  "metadata": ' + json.dumps(metadata, ensure_ascii=False, indent=2, default=str) + '\n}\n')
+    return counts
+
+def invalidate_caches_after_restore():
+    """
+    Verwirft Settings-Cache, Rechte-Matrix, Feature-Snapshots, Principal-Cache und
+    Felddefinitionen in allen Worker-Prozessen. Für
+    Wiederherstellungen, die an MongoDBDatabase vorbei schreiben (insert_many auf
+    der rohen Collection, mongorestore) und damit keine Schreib-Listener auslösen.
+    """
+    from app.models.feature_system import FeatureSystem
+    from app.services.custom_fields_service import CustomFieldsService
+    from app.utils.permissions import invalidate_permission_matrix
+    from app.utils.principal_cache import invalidate_principal_cache
+    from app.utils.settings_cache import invalidate_settings_cache
+    invalidate_settings_cache()
+    invalidate_permission_matrix()
+    FeatureSystem.invalidate_cache()
+    invalidate_principal_cache()
+    CustomFieldsService.invalidate_cache()
 
 class BackupManager:
     """Vollständiger Backup-Manager für MongoDB"""
@@ -317,6 +368,7 @@ class BackupManager:
 
     def create_backup(self):
         """Erstellt ein Backup aller Collections mit Datentyp-Erhaltung"""
+        backup_path = None
         try:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             backup_filename = f"scandy_backup_{timestamp}.json"
@@ -328,33 +380,23 @@ class BackupManager:
                 'settings', 'tickets', 'timesheets', 'users', 'auftrag_details', 
                 'auftrag_material', 'email_config', 'email_settings', 'system_logs', 'jobs'
             ]
-            backup_data = {}
-            
-            for collection in collections_to_backup:
-                try:
-                    documents = list(mongodb.find(collection, {}))
-                    # Serialisiere Dokumente mit Datentyp-Erhaltung
-                    serialized_docs = [self._serialize_for_backup(doc) for doc in documents]
-                    backup_data[collection] = serialized_docs
-                except Exception as e:
-                    print(f"Fehler beim Sichern von {collection}: {e}")
-                    backup_data[collection] = []
-            
-            # Backup-Datei mit Metadaten speichern
-            backup_with_metadata = {
-                'metadata': {
-                    'version': '2.0',
-                    'created_at': datetime.now().isoformat(),
-                    'datatype_preservation': True,
-                    'collections': list(backup_data.keys())
-                },
-                'data': backup_data
-            }
+            created_at = datetime.now().isoformat()
             
+            # Collections dokumentweise streamen (Serialisierung mit Datentyp-Erhaltung)
             with open(backup_path, 'w', encoding='utf-8') as f:
-                json.dump(backup_with_metadata, f, ensure_ascii=False, indent=2, default=str)
-            
-            print(f"Backup erstellt: {backup_filename} mit {sum(len(docs) for docs in backup_data.values())} Dokumenten")
+                counts = stream_collections_to_json(
+                    f,
+                    collections_to_backup,
+                    lambda counts: {
+                        'version': '2.0',
+                        'created_at': created_at,
+                        'datatype_preservation': True,
+                        'collections': list(counts.keys())
+                    },
+                    serialize=self._serialize_for_backup
+                )
+            
+            print(f"Backup erstellt: {backup_filename} mit {sum(counts.values())} Dokumenten")
             print("Datentyp-Erhaltung aktiviert")
             
             # Alte Backups aufräumen
@@ -364,6 +406,9 @@ class BackupManager:
             
         except Exception as e:
             print(f"Fehler beim Erstellen des Backups: {e}")
+            # Unvollständige Backup-Datei nicht liegen lassen
+            if backup_path is not None and backup_path.exists():
+                backup_path.unlink()
             return None
     
     def restore_backup(self, file):
@@ -563,12 +608,14 @@ class BackupManager:
                                 # Versuche das ursprüngliche Dokument zu verwenden
                                 restored_documents.append(doc)
                         
-                        # Dokumente in die Datenbank einfügen
-                        mongodb.db[collection].insert_many(restored_documents)
+                        # Dokumente gebündelt einfügen (ohne Scoping, Timestamps bleiben erhalten)
+                        result = self._bulk_insert_for_restore(collection, restored_documents)
                         restore_stats['successful_collections'] += 1
-                        restore_stats['total_documents'] += len(restored_documents)
+                        restore_stats['total_documents'] += result['inserted']
                         
-                        print(f"✅ Collection {collection}: {len(restored_documents)} Dokumente wiederhergestellt")
+                        print(f"✅ Collection {collection}: {result['inserted']} Dokumente wiederhergestellt")
+                        if result['errors']:
+                            print(f"  - ⚠️  {len(result['errors'])} Dokumente nicht eingefügt: {result['errors'][0]['message']}")
                         print(f"  - Konvertierungen: {conversion_stats['id_converted']} IDs, {conversion_stats['datetime_converted']} Datetimes")
                         print(f"  - Zusätzlich: {conversion_stats['boolean_converted']} Booleans, {conversion_stats['numeric_converted']} Numerische")
                         if conversion_stats['errors'] > 0:
@@ -580,10 +627,10 @@ class BackupManager:
                     
                     # Bei Fehler: Versuche ohne ID-Korrektur (Fallback für sehr alte Backups)
                     try:
-                        mongodb.db[collection].insert_many(documents)
-                        print(f"🔄 Collection {collection}: {len(documents)} Dokumente ohne ID-Korrektur wiederhergestellt (Fallback)")
+                        result = self._bulk_insert_for_restore(collection, documents)
+                        print(f"🔄 Collection {collection}: {result['inserted']} Dokumente ohne ID-Korrektur wiederhergestellt (Fallback)")
                         restore_stats['successful_collections'] += 1
-                        restore_stats['total_documents'] += len(documents)
+                        restore_stats['total_documents'] += result['inserted']
                         restore_stats['format_warnings'].append(f"{collection}: Fallback-Modus verwendet")
                     except Exception as e2:
                         print(f"💥 Kritischer Fehler bei {collection}: {e2}")
@@ -595,6 +642,9 @@ class BackupManager:
             # Verbrauchsgüter-Inkonsistenzen beheben
             self._fix_consumable_inconsistencies()
             
+            # Fälligkeitsdaten (due_at) der wiederhergestellten Ausleihen nachtragen
+            LendingService.backfill_due_at()
+            
             # Automatische Dashboard-Fixes nach Backup-Import
             try:
                 from app.services.admin_debug_service import AdminDebugService
@@ -701,6 +751,16 @@ class BackupManager:
         except Exception as e:
             print(f"Fehler beim Beheben der Kategorien-Inkonsistenz: {e}")
 
+    @staticmethod
+    def _bulk_insert_for_restore(collection, documents):
+        """Fügt Backup-Dokumente per bulk_write ein, unabhängig vom aktuellen Department"""
+        return mongodb.bulk_write(
+            collection,
+            ({'insertOne': {'document': doc}} for doc in documents),
+            timestamps=False,
+            scoped=False,
+        )
+    
     def _fix_consumable_inconsistencies(self):
         """Behebt Inkonsistenzen bei Verbrauchsgütern nach Backup-Import"""
         try:
@@ -709,6 +769,8 @@ class BackupManager:
             # 1. Prüfe und korrigiere negative Bestände
             consumables = list(mongodb.find('consumables', {'deleted': {'$ne': True}}))
             fixed_negative = 0
+            # Korrekturen je Dokument sammeln und gebündelt schreiben
+            consumable_updates = {}
             
             for consumable in consumables:
                 quantity = consumable.get('quantity', 0)
@@ -722,9 +784,7 @@ class BackupManager:
                 
                 # Korrigiere negative Bestände
                 if quantity < 0:
-                    mongodb.update_one('consumables', 
-                                     {'_id': consumable['_id']}, 
-                                     {'$set': {'quantity': 0}})
+                    consumable_updates.setdefault(consumable['_id'], {})['quantity'] = 0
                     print(f"  ✅ {consumable.get('name', 'Unbekannt')}: Negativen Bestand korrigiert ({quantity} → 0)")
                     fixed_negative += 1
             
@@ -732,9 +792,7 @@ class BackupManager:
             fixed_min_quantity = 0
             for consumable in consumables:
                 if 'min_quantity' not in consumable:
-                    mongodb.update_one('consumables', 
-                                     {'_id': consumable['_id']}, 
-                                     {'$set': {'min_quantity': 5}})  # Standard-Wert
+                    consumable_updates.setdefault(consumable['_id'], {})['min_quantity'] = 5  # Standard-Wert
                     print(f"  ✅ {consumable.get('name', 'Unbekannt')}: min_quantity hinzugefügt (5)")
                     fixed_min_quantity += 1
             
@@ -765,14 +823,18 @@ class BackupManager:
                         pass
                 
                 if updated:
-                    mongodb.update_one('consumables', 
-                                     {'_id': consumable['_id']}, 
-                                     {'$set': update_data})
+                    consumable_updates.setdefault(consumable['_id'], {}).update(update_data)
                     fixed_datetime += 1
             
+            mongodb.bulk_write('consumables', (
+                {'updateOne': {'filter': {'_id': consumable_id}, 'update': {'$set': fields}}}
+                for consumable_id, fields in consumable_updates.items()
+            ))
+            
             # 4. Prüfe und korrigiere consumable_usages Inkonsistenzen
             usages = list(mongodb.find('consumable_usages', {}))
             fixed_usages = 0
+            usage_ops = []
             
             for usage in usages:
                 updated = False
@@ -799,11 +861,11 @@ class BackupManager:
                         pass
                 
                 if updated:
-                    mongodb.update_one('consumable_usages', 
-                                     {'_id': usage['_id']}, 
-                                     {'$set': update_data})
+                    usage_ops.append({'updateOne': {'filter': {'_id': usage['_id']}, 'update': {'$set': update_data}}})
                     fixed_usages += 1
             
+            mongodb.bulk_write('consumable_usages', usage_ops)
+            
             print(f"Verbrauchsgüter-Inkonsistenzen behoben:")
             print(f"  - Negative Bestände korrigiert: {fixed_negative}")
             print(f"  - min_quantity Felder hinzugefügt: {fixed_min_quantity}")
@@ -1174,6 +1236,8 @@ class BackupManager:
             
             if result.returncode == 0:
                 print(f"✅ Natives Backup erfolgreich wiederhergestellt")
+                LendingService.backfill_due_at()
+                invalidate_caches_after_restore()
                 return True
             else:
                 print(f"❌ Fehler beim Wiederherstellen des nativen Backups:")
@@ -1243,6 +1307,8 @@ class BackupManager:
                 
                 if result.returncode == 0:
                     print(f"✅ Natives Backup aus Upload erfolgreich wiederhergestellt")
+                    LendingService.backfill_due_at()
+                    invalidate_caches_after_restore()
                     return True
                 else:
                     print(f"❌ Fehler beim Wiederherstellen des nativen Backups aus Upload:")
@@ -0,0 +1,170 @@
+"""
+Prozessübergreifende Cache-Versionen für Scandy
+
+Jeder prozesslokale Cache (Settings, Features, ...) hat einen Namen und eine
+Versionsnummer in der Collection 'cache_versions'. Schreibende Stellen erhöhen
+die Version per bump_version(); alle gunicorn-Worker lesen die Versionen
+höchstens alle CACHE_VERSION_CHECK_INTERVAL Sekunden mit einer einzigen
+Abfrage und verwerfen ihre Einträge, sobald sich die Version ändert.
+
+StaleWhileRevalidateCache liefert abgelaufene Einträge noch eine Zeit lang aus
+und lädt sie währenddessen im Hintergrund neu, sodass kein Request auf das
+Neuladen warten muss.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_COLLECTION = 'cache_versions'
+
+_versions: Dict[str, int] = {}
+_versions_checked_at = 0.0
+_versions_lock = threading.Lock()
+
+
+def _versions_collection():
+    from app.models.mongodb_database import mongodb
+    return mongodb.get_collection(VERSIONS_COLLECTION)
+
+
+def get_version(name: str) -> int:
+    """
+    Aktuelle Version eines Caches. Die Versionen aller Caches werden gemeinsam
+    und höchstens alle CACHE_VERSION_CHECK_INTERVAL Sekunden neu gelesen.
+    """
+    global _versions_checked_at
+    now = time.monotonic()
+    if now - _versions_checked_at >= Config.CACHE_VERSION_CHECK_INTERVAL:
+        try:
+            fresh = {doc['_id']: doc.get('version', 0) for doc in _versions_collection().find({})}
+            with _versions_lock:
+                _versions.clear()
+                _versions.update(fresh)
+                _versions_checked_at = now
+        except Exception as e:
+            logger.warning(f"Cache-Versionen konnten nicht gelesen werden: {e}")
+    return _versions.get(name, 0)
+
+
+def bump_version(name: str):
+    """Erhöht die Version eines Caches für alle Prozesse (lokal sofort wirksam)"""
+    try:
+        doc = _versions_collection().find_one_and_update(
+            {'_id': name}, {'$inc': {'version': 1}}, upsert=True, return_document=True
+        )
+        with _versions_lock:
+            _versions[name] = doc.get('version', 0) if doc else _versions.get(name, 0) + 1
+    except Exception as e:
+        logger.warning(f"Cache-Version für '{name}' konnte nicht erhöht werden: {e}")
+        with _versions_lock:
+            _versions[name] = _versions.get(name, 0) + 1
+
+
+class VersionedCache:
+    """
+    Prozesslokaler Cache, dessen Einträge nach ttl Sekunden oder bei einer
+    neuen Version (bump_version(name)) neu geladen werden.
+    """
+
+    def __init__(self, name: str, loader: Callable[[Hashable], Any], ttl: Optional[float] = None):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self._entries: Dict[Hashable, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable = None) -> Any:
+        """Liefert den (ggf. neu geladenen) Wert für key"""
+        version = get_version(self.name)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, entry_version, loaded_at = entry
+            if entry_version == version and (self.ttl is None or now - loaded_at < self.ttl):
+                return value
+        value = self.loader(key)
+        with self._lock:
+            self._entries[key] = (value, version, now)
+        return value
+
+    def clear(self):
+        """Verwirft alle Einträge dieses Prozesses"""
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self):
+        """Verwirft die Einträge in allen Prozessen"""
+        self.clear()
+        bump_version(self.name)
+
+
+class StaleWhileRevalidateCache:
+    """
+    Prozesslokaler Cache mit stale-while-revalidate: Einträge sind max_age
+    Sekunden frisch und werden danach noch bis zu stale_ttl Sekunden
+    ausgeliefert, während ein Hintergrund-Thread sie neu lädt. Eine neue
+    Version (bump_version(name)) verwirft die Einträge sofort.
+    """
+
+    def __init__(self, name: str, loader: Callable[[Hashable], Any], max_age: float, stale_ttl: float):
+        self.name = name
+        self.loader = loader
+        self.max_age = max_age
+        self.stale_ttl = stale_ttl
+        self._entries: Dict[Hashable, tuple] = {}
+        self._revalidating = set()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable = None) -> Any:
+        """Liefert den Wert für key; veraltete Werte werden im Hintergrund erneuert"""
+        version = get_version(self.name)
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, entry_version, loaded_at = entry
+            age = time.monotonic() - loaded_at
+            if entry_version == version and age < self.max_age + self.stale_ttl:
+                if age >= self.max_age:
+                    self._revalidate(key, version)
+                return value
+        return self._load(key, version)
+
+    def _load(self, key: Hashable, version: int) -> Any:
+        loaded_at = time.monotonic()
+        value = self.loader(key)
+        with self._lock:
+            # Version vom Beginn des Ladens: eine zwischenzeitliche Invalidierung verwirft den Wert
+            self._entries[key] = (value, version, loaded_at)
+        return value
+
+    def _revalidate(self, key: Hashable, version: int):
+        """Startet höchstens ein Neuladen pro key im Hintergrund"""
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def run():
+            try:
+                self._load(key, version)
+            except Exception as e:
+                logger.warning(f"Neuladen von '{self.name}' ({key}) fehlgeschlagen: {e}")
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=run, name=f"{self.name}-revalidate", daemon=True).start()
+
+    def clear(self):
+        """Verwirft alle Einträge dieses Prozesses"""
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self):
+        """Verwirft die Einträge in allen Prozessen"""
+        self.clear()
+        bump_version(self.name)
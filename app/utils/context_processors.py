@@ -4,6 +4,8 @@ from app.config.version import VERSION
 import traceback
 import logging
 from app.models.mongodb_database import mongodb
+from app.utils.settings_cache import get_setting, get_settings_by_prefix
+from app.utils.lazy_template_context import LazyTemplateContext
 from flask_login import current_user
 from flask import g
 try:
@@ -30,15 +32,12 @@ def get_colors():
 def inject_colors():
     """Injiziert die Farbeinstellungen aus MongoDB in alle Templates"""
     try:
-        color_docs = mongodb.find('settings', {'key': {'$regex': '^color_'}})
-        if color_docs:
+        color_settings = get_settings_by_prefix('color_')
+        if color_settings:
             color_dict = {}
-            for doc in color_docs:
-                key = doc['key'].replace('color_', '')
-                # Prüfe ob das value Feld existiert
-                if 'value' in doc:
-                    value = doc['value']
-                    color_dict[key] = value
+            for setting_key, value in color_settings.items():
+                key = setting_key.replace('color_', '')
+                color_dict[key] = value
             return {'colors': color_dict}
     except Exception as e:
         logger.error(f"Fehler beim Laden der Farben: {e}")
@@ -90,7 +89,7 @@ def inject_version():
 def inject_app_labels():
     """Fügt die App-Labels in alle Templates ein"""
     try:
-        label_docs = mongodb.find('settings', {'key': {'$regex': '^label_'}})
+        label_settings = get_settings_by_prefix('label_')
         app_labels = {
             'tools': {'name': 'Werkzeuge', 'icon': 'fas fa-tools'},
             'consumables': {'name': 'Verbrauchsmaterial', 'icon': 'fas fa-box-open'},
@@ -98,12 +97,8 @@ def inject_app_labels():
         }
         
         # Labels aus der Datenbank laden
-        for doc in label_docs:
-            key = doc['key'].replace('label_', '')
-            # Prüfe ob das value Feld existiert
-            if 'value' not in doc:
-                continue
-            value = doc['value']
+        for setting_key, value in label_settings.items():
+            key = setting_key.replace('label_', '')
             
             # Label-Typ und Attribut extrahieren (z.B. tools_name -> tools.name)
             parts = key.split('_')
@@ -236,15 +231,10 @@ def inject_custom_fields():
 
 def register_context_processors(app):
     """Registriert alle Context Processors"""
-    app.context_processor(inject_colors)
     app.context_processor(inject_routes)
-    app.context_processor(inject_version)
-    app.context_processor(inject_app_labels)
-    app.context_processor(inject_unfilled_timesheet_days)
-    app.context_processor(inject_feature_settings)
-    app.context_processor(inject_custom_fields)
-    app.context_processor(inject_departments)
     app.context_processor(inject_csrf_token)
+    # Variablen mit Datenbankzugriff werden erst beim ersten Zugriff im Template berechnet
+    app.context_processor(lazy_context.context_processor)
 
 def inject_csrf_token():
     """Stellt csrf_token() in allen Templates bereit"""
@@ -264,15 +254,16 @@ def inject_departments():
             ctx = {'allowed': [], 'current': None}
             return {'departments': ctx, 'departments_ctx': ctx}
 
-        # Benutzer lesen
-        user = mongodb.find_one('users', {'username': current_user.username})
+        # Benutzer lesen (Principal-Cache des user_loaders)
+        from app.utils.principal_cache import get_user_doc
+        user = get_user_doc(current_user.get_id())
 
         # Globale Departments laden (für Admins nötig)
         all_departments = []
         try:
-            depts_setting = mongodb.find_one('settings', {'key': 'departments'})
-            if depts_setting and isinstance(depts_setting.get('value'), list):
-                all_departments = [d for d in depts_setting['value'] if isinstance(d, str) and d.strip()]
+            departments_value = get_setting('departments')
+            if isinstance(departments_value, list):
+                all_departments = [d for d in departments_value if isinstance(d, str) and d.strip()]
         except Exception:
             all_departments = []
 
@@ -291,4 +282,14 @@ def inject_departments():
         logger = logging.getLogger(__name__)
         logger.warning(f"Departments Context Fehler: {e}")
         ctx = {'allowed': [], 'current': None}
-        return {'departments': ctx, 'departments_ctx': ctx}
\ No newline at end of file
+        return {'departments': ctx, 'departments_ctx': ctx}
+
+# ===== LAZY TEMPLATE-KONTEXT =====
+lazy_context = LazyTemplateContext()
+lazy_context.register(inject_colors, 'colors')
+lazy_context.register(inject_version, 'version', 'version_info')
+lazy_context.register(inject_app_labels, 'app_labels')
+lazy_context.register(inject_unfilled_timesheet_days, 'unfilled_timesheet_days')
+lazy_context.register(inject_feature_settings, 'features_enabled', 'feature_settings')
+lazy_context.register(inject_custom_fields, 'custom_fields_tools', 'custom_fields_consumables')
+lazy_context.register(inject_departments, 'departments', 'departments_ctx')
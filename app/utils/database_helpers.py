@@ -17,6 +17,7 @@ import logging
 from datetime import datetime
 from bson import ObjectId
 from app.models.mongodb_database import mongodb
+from app.utils.settings_cache import get_setting_doc
 
 logger = logging.getLogger(__name__)
 
@@ -61,8 +62,8 @@ def get_setting_value(setting_key, fallback_collection=None, fallback_field='nam
         ['Werkzeuge', 'Elektronik', 'Büro']
     """
     try:
-        # Versuche zuerst die settings Collection
-        settings_doc = mongodb.find_one('settings', {'key': setting_key})
+        # Versuche zuerst die settings Collection (über den Settings-Cache)
+        settings_doc = get_setting_doc(setting_key)
         if settings_doc and 'value' in settings_doc:
             value = settings_doc['value']
             # String (Legacy)
@@ -100,7 +101,7 @@ def get_setting_map(setting_key) -> dict:
     - Sonst ein leeres Mapping
     """
     try:
-        settings_doc = mongodb.find_one('settings', {'key': setting_key})
+        settings_doc = get_setting_doc(setting_key)
         if not settings_doc:
             return {}
         value = settings_doc.get('value', [])
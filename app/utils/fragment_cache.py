@@ -0,0 +1,143 @@
+"""
+Fragment-Cache für Jinja-Templates
+
+Teure Layout-Blöcke (Navigation, Admin-Menü) hängen nur von Rolle, Department,
+Einstellungen, Features und Labels ab, werden aber bei jedem Request neu
+gerendert. Das Tag
+
+    {% cache 'sidebar_nav', current_user.role, request.endpoint %} ... {% endcache %}
+
+rendert den Block einmal pro Schlüssel und liefert ihn danach aus einem
+prozesslokalen LRU-Cache. Zum Schlüssel gehören neben den im Tag angegebenen
+Teilen immer das aktuelle Department und die Versionen der Caches, aus denen
+Navigation und Labels stammen; Änderungen an Einstellungen, Features oder
+Berechtigungen führen damit sofort zu neuen Einträgen. Der Speicher ist über
+die Anzahl Einträge und die Gesamtgröße begrenzt.
+
+Benutzerspezifische Teile (Badges mit Zählern, CSRF-Token, ...) gehören nicht
+in einen gecachten Block.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from app.config.config import Config
+from app.utils.cache_versions import get_version
+
+logger = logging.getLogger(__name__)
+
+# Caches, deren Inhalt in gecachte Fragmente einfließt (Labels, Features, Berechtigungen)
+DEPENDENT_CACHES = ('settings', 'feature_settings', 'role_permissions')
+
+
+class FragmentCache:
+    """LRU-Cache für gerenderte Fragmente, begrenzt nach Einträgen und Bytes"""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Gecachtes Fragment zu key oder None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                html, stored_at = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return html
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, html: str):
+        """Speichert ein Fragment und verdrängt bei Bedarf die ältesten Einträge"""
+        size = len(html)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (html, time.monotonic())
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def _remove(self, key: Hashable):
+        html, _ = self._entries.pop(key)
+        self._size -= len(html)
+
+    def clear(self):
+        """Verwirft alle Fragmente dieses Prozesses"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Kennzahlen für Diagnosezwecke"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+fragment_cache = FragmentCache(
+    max_entries=Config.FRAGMENT_CACHE_MAX_ENTRIES,
+    max_bytes=Config.FRAGMENT_CACHE_MAX_BYTES,
+    ttl=Config.FRAGMENT_CACHE_TTL
+)
+
+
+def _implicit_key_parts() -> tuple:
+    """Department und Cache-Versionen, die jeder Fragment-Schlüssel enthält"""
+    from app.models.mongodb_database import MongoDBDatabase
+    department = MongoDBDatabase._get_current_department()
+    return (department,) + tuple(get_version(name) for name in DEPENDENT_CACHES)
+
+
+class FragmentCacheExtension(Extension):
+    """Jinja-Erweiterung für {% cache name, key1, key2, ... %} ... {% endcache %}"""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_cache_support', args), [], [], body
+        ).set_lineno(lineno)
+
+    def _cache_support(self, name: str, *key_parts: Any, caller) -> Markup:
+        if not Config.FRAGMENT_CACHE_ENABLED:
+            return Markup(caller())
+        try:
+            key = (name,) + _implicit_key_parts() + tuple(str(part) for part in key_parts)
+        except Exception as e:
+            logger.warning(f"Fragment-Schlüssel für '{name}' nicht bestimmbar: {e}")
+            return Markup(caller())
+
+        html = fragment_cache.get(key)
+        if html is None:
+            html = str(caller())
+            fragment_cache.set(key, html)
+        return Markup(html)
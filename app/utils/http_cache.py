@@ -0,0 +1,85 @@
+"""
+Conditional GET (ETag / Last-Modified) für JSON-Endpunkte
+
+Polling-Clients (QuickScan, mobile QuickScan, WordPress-Kantinenplan) senden
+ihr letztes ETag als If-None-Match bzw. den letzten Stand als
+If-Modified-Since zurück. Stimmt der Stand überein, antwortet der Endpunkt mit
+304 ohne Body. Der Stand wird entweder vorab billig ermittelt (Anzahl und
+max(updated_at) über collection_version) oder aus einem Hash des Inhalts.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from flask import Response, jsonify, request
+
+from app.models.mongodb_database import mongodb, MongoDBDatabase
+
+logger = logging.getLogger(__name__)
+
+
+def make_etag(*parts: Any) -> str:
+    """ETag aus beliebigen (JSON-serialisierbaren) Bestandteilen, inkl. aktuellem Department"""
+    department = MongoDBDatabase._get_current_department()
+    raw = json.dumps([department, *parts], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def collection_version(collection_name: str, filter_dict: Optional[Dict[str, Any]] = None) -> Tuple[int, Optional[datetime]]:
+    """
+    Versionsstand einer (gefilterten, Department-gescopten) Collection:
+    Anzahl Dokumente und jüngstes updated_at. Schreibzugriffe über
+    MongoDBDatabase setzen updated_at, Löschungen ändern die Anzahl.
+    """
+    result = mongodb.aggregate(collection_name, [
+        {'$match': filter_dict or {}},
+        {'$group': {'_id': None, 'count': {'$sum': 1}, 'last_modified': {'$max': '$updated_at'}}}
+    ])
+    if not result:
+        return 0, None
+    last_modified = result[0].get('last_modified')
+    return result[0].get('count', 0), last_modified if isinstance(last_modified, datetime) else None
+
+
+def _to_http_date(value: datetime) -> datetime:
+    """updated_at (naive Ortszeit) als sekundengenaue UTC-Zeit für Last-Modified"""
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def is_not_modified(etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Prüft If-None-Match (vorrangig) bzw. If-Modified-Since gegen den aktuellen Stand"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return _to_http_date(last_modified) <= request.if_modified_since
+    return False
+
+
+def with_validators(response: Response, etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """Setzt ETag/Last-Modified; Clients müssen vor jeder Verwendung revalidieren"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _to_http_date(last_modified)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """304-Antwort ohne Body"""
+    return with_validators(Response(status=304), etag, last_modified)
+
+
+def conditional_json(payload: Dict[str, Any], volatile_keys: Iterable[str] = ('generated_at',),
+                     last_modified: Optional[datetime] = None) -> Response:
+    """
+    jsonify mit ETag aus dem Inhalt. Schlüssel in volatile_keys (z.B. ein
+    Erzeugungszeitpunkt) gehen nicht in das ETag ein.
+    """
+    etag = make_etag({key: value for key, value in payload.items() if key not in volatile_keys})
+    if is_not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    return with_validators(jsonify(payload), etag, last_modified)
@@ -0,0 +1,68 @@
+"""
+Lazy Template-Kontext für Scandy
+
+Template-Variablen, deren Berechnung Datenbank- oder Cache-Zugriffe erfordert
+(Farben, Labels, Features, Wochenberichte, benutzerdefinierte Felder, ...),
+werden nicht mehr bei jedem render_template berechnet. Der Context Processor
+liefert stattdessen Proxies; erst beim ersten Zugriff im Template ruft der
+Proxy den zugehörigen Provider auf und merkt sich das Ergebnis für den Rest
+des Requests in g. Partials und Fehlerseiten, die eine Variable nie
+verwenden, zahlen für sie nichts.
+"""
+import logging
+from functools import partial
+from typing import Any, Callable, Dict, List
+
+from flask import g, has_app_context
+from werkzeug.local import LocalProxy
+
+logger = logging.getLogger(__name__)
+
+_MEMO_ATTR = '_lazy_template_context'
+
+
+class LazyTemplateContext:
+    """
+    Sammlung von Template-Variablen, die beim ersten Zugriff berechnet werden.
+
+    Ein Provider ist eine Funktion wie ein Context Processor (liefert ein Dict);
+    liefert er mehrere Variablen, wird er pro Request trotzdem nur einmal aufgerufen.
+    """
+
+    def __init__(self):
+        self._providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._proxies: Dict[str, LocalProxy] = {}
+
+    def register(self, provider: Callable[[], Dict[str, Any]], *names: str):
+        """Registriert provider für die angegebenen Variablennamen"""
+        for name in names:
+            self._providers[name] = provider
+            self._proxies[name] = LocalProxy(partial(self.resolve, name))
+
+    def _memo(self) -> Dict[str, Any]:
+        if not has_app_context():
+            return {}
+        memo = getattr(g, _MEMO_ATTR, None)
+        if memo is None:
+            memo = {}
+            setattr(g, _MEMO_ATTR, memo)
+        return memo
+
+    def resolve(self, name: str) -> Any:
+        """Wert der Variable name (pro Request höchstens einmal berechnet)"""
+        memo = self._memo()
+        if name not in memo:
+            values = self._providers[name]()
+            memo.update(values)
+            if name not in values:
+                logger.warning(f"Template-Provider für '{name}' hat keinen Wert geliefert")
+                memo[name] = None
+        return memo[name]
+
+    def names(self) -> List[str]:
+        """Alle registrierten Variablennamen (in Registrierungsreihenfolge)"""
+        return list(self._providers)
+
+    def context_processor(self) -> Dict[str, LocalProxy]:
+        """Context Processor: liefert nur die (request-unabhängigen) Proxies"""
+        return dict(self._proxies)
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 from functools import wraps
-from typing import Dict, List, Optional
+from typing import Dict, FrozenSet, List, Optional
 
-from flask import abort, g
+from flask import abort, g, has_app_context
 from flask_login import current_user
 
-from app.models.mongodb_database import mongodb
+from app.config.config import Config
+from app.models.mongodb_database import mongodb, MongoDBDatabase
+from app.utils.cache_versions import VersionedCache
+from app.utils.settings_cache import get_setting
 
 
 # Standard-Rechte-Matrix (kann per Admin-UI überschrieben werden)
@@ -70,18 +73,50 @@ DEFAULT_ROLE_PERMISSIONS: Dict[str, Dict[str, List[str]]] = {
 
 
 def get_role_permissions() -> Dict[str, Dict[str, List[str]]]:
-    """Liest die Rollenrechte aus der Settings-Collection. Fallback: Defaults."""
-    setting = mongodb.find_one("settings", {"key": "role_permissions"})
-    if setting and isinstance(setting.get("value"), dict):
-        return setting["value"]
+    """Liest die Rollenrechte aus der Settings-Collection (über den Settings-Cache). Fallback: Defaults."""
+    value = get_setting("role_permissions")
+    if isinstance(value, dict):
+        return value
     return DEFAULT_ROLE_PERMISSIONS
 
 
+def compile_permission_matrix(permissions: Dict[str, Dict[str, List[str]]]) -> Dict[str, Dict[str, FrozenSet[str]]]:
+    """Übersetzt die Rollenrechte in Rolle -> Bereich -> frozenset(Aktionen)."""
+    return {
+        role: {area: frozenset(actions) for area, actions in (areas or {}).items()}
+        for role, areas in permissions.items()
+    }
+
+
+def _load_permission_matrix(department: Optional[str]) -> Dict[str, Dict[str, FrozenSet[str]]]:
+    # Das Department steckt im Scoping von get_role_permissions (g.current_department)
+    return compile_permission_matrix(get_role_permissions())
+
+
+_matrix_cache = VersionedCache("role_permissions", _load_permission_matrix, ttl=Config.SETTINGS_CACHE_TTL)
+
+
+def get_permission_matrix() -> Dict[str, Dict[str, FrozenSet[str]]]:
+    """Kompilierte Rechte-Matrix des aktuellen Departments (prozessweit gecacht, nicht verändern)."""
+    department = getattr(g, "current_department", None) if has_app_context() else None
+    return _matrix_cache.get(department)
+
+
+def invalidate_permission_matrix() -> None:
+    """Verwirft die kompilierte Rechte-Matrix in allen Worker-Prozessen."""
+    _matrix_cache.invalidate()
+
+
+# Rollenrechte liegen in 'settings': jede Schreiboperation dort (Admin-Seite,
+# Settings-Import, Backup-Restore über MongoDBDatabase) verwirft die Matrix
+MongoDBDatabase.register_write_listener("settings", invalidate_permission_matrix)
+
+
 def set_role_permissions(permissions: Dict[str, Dict[str, List[str]]]) -> bool:
     """Schreibt die Rollenrechte in die Settings-Collection (Upsert)."""
     # Nicht erlaubte Kombinationen herausfiltern
     filtered = normalize_permissions(permissions)
-    return bool(
+    success = bool(
         mongodb.update_one(
             "settings",
             {"key": "role_permissions"},
@@ -89,6 +124,8 @@ def set_role_permissions(permissions: Dict[str, Dict[str, List[str]]]) -> bool:
             upsert=True,
         )
     )
+    # Die kompilierte Matrix verwirft der Schreib-Listener auf 'settings'
+    return success
 
 
 def ensure_default_role_permissions() -> None:
@@ -108,9 +145,7 @@ def has_permission(role: str, area: str, action: str, department: Optional[str]
     # Admin darf immer alles (Guardrail)
     if role == "admin":
         return True
-    matrix = get_role_permissions()
-    role_entry = matrix.get(role, {})
-    allowed_actions = role_entry.get(area, [])
+    allowed_actions = get_permission_matrix().get(role, {}).get(area, ())
     return action in allowed_actions
 
 
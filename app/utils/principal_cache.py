@@ -0,0 +1,59 @@
+"""
+Principal-Cache für Scandy
+
+Hält die Benutzer-Dokumente für den Flask-Login user_loader im Speicher,
+damit authentifizierte Requests den Benutzer nicht bei jedem Aufruf aus der
+users-Collection laden. Einträge verfallen nach USER_CACHE_TTL Sekunden;
+jede Schreiboperation auf 'users' über MongoDBDatabase (Bearbeiten,
+Rollenwechsel, Deaktivieren, Löschen, ...) erhöht die Benutzer-Revision,
+sodass alle Worker beim nächsten Versionsabgleich neu laden.
+"""
+import copy
+import logging
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+
+from app.config.config import Config
+from app.models.mongodb_database import MongoDBDatabase
+from app.utils.cache_versions import VersionedCache
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = 'users'
+
+
+def canonical_user_filter(user_id: str) -> Dict[str, Any]:
+    """
+    Filter für genau eine _id-Abfrage: Benutzer haben ObjectIds, importierte
+    Altdaten teilweise String-IDs. Beide Varianten in einem $in über den _id-Index.
+    """
+    if ObjectId.is_valid(user_id):
+        return {'_id': {'$in': [ObjectId(user_id), user_id]}}
+    return {'_id': user_id}
+
+
+def _load_user(user_id: str) -> Optional[Dict[str, Any]]:
+    """Lädt ein Benutzer-Dokument mit einer einzigen indizierten Abfrage"""
+    from app.models.mongodb_database import mongodb
+    return mongodb.find_one('users', canonical_user_filter(user_id))
+
+
+_cache = VersionedCache(CACHE_NAME, _load_user, ttl=Config.USER_CACHE_TTL)
+
+
+def get_user_doc(user_id: str) -> Optional[Dict[str, Any]]:
+    """Benutzer-Dokument zu user_id (Kopie) oder None"""
+    if not user_id:
+        return None
+    doc = _cache.get(str(user_id))
+    return copy.deepcopy(doc) if doc is not None else None
+
+
+def invalidate_principal_cache():
+    """Verwirft den Principal-Cache in allen Worker-Prozessen"""
+    _cache.invalidate()
+
+
+# Jede Schreiboperation auf 'users' über MongoDBDatabase invalidiert den Cache
+MongoDBDatabase.register_write_listener('users', invalidate_principal_cache)
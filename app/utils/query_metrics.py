@@ -0,0 +1,197 @@
+"""
+Datenbank-Instrumentierung für Scandy
+
+Sammelt pro Request alle MongoDB-Operationen (Collection, Operation, Filter-Form,
+Dauer, Anzahl Dokumente), stellt die Summen als Server-Timing-Header bereit und
+schreibt langsame Abfragen als strukturierte Logzeile (optional mit explain()).
+"""
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import g, has_app_context, has_request_context, request
+
+from app.config.config import Config
+from app.utils.logger import loggers
+
+logger = logging.getLogger(__name__)
+
+_STATS_ATTR = '_db_query_stats'
+
+# Prozessweite Sammlung langsamer Abfrage-Formen (für den Index-Report)
+_MAX_SLOW_SHAPES = 500
+_slow_shapes: Dict[tuple, Dict[str, Any]] = {}
+_slow_shapes_lock = threading.Lock()
+
+
+def filter_shape(value: Any) -> Any:
+    """
+    Reduziert einen Filter (oder eine Pipeline) auf seine Form: Feldnamen und
+    Operatoren bleiben erhalten, Werte werden durch '?' ersetzt. Gleiche Formen
+    mit unterschiedlichen Werten (typisch für N+1-Schleifen) fallen so zusammen.
+    """
+    if isinstance(value, dict):
+        return {key: filter_shape(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple)):
+        if any(isinstance(item, (dict, list, tuple)) for item in value):
+            return [filter_shape(item) for item in value]
+        return ['?']
+    return '?'
+
+
+def _shape_key(shape: Any) -> str:
+    return json.dumps(shape, sort_keys=True, default=str)
+
+
+def _get_stats() -> Optional[Dict[str, Any]]:
+    """Gibt den Akkumulator des aktuellen Requests zurück (None ohne App-Context)"""
+    if not has_app_context():
+        return None
+    stats = getattr(g, _STATS_ATTR, None)
+    if stats is None:
+        stats = {'count': 0, 'duration': 0.0, 'documents': 0, 'cache_hits': 0, 'operations': {}}
+        setattr(g, _STATS_ATTR, stats)
+    return stats
+
+
+def record_query(collection: str, operation: str, filter_dict: Any, duration: float,
+                 documents: int = 0, explain: Optional[Callable[[], Any]] = None,
+                 success: bool = True):
+    """
+    Erfasst eine Datenbankoperation im Request-Akkumulator und loggt sie,
+    falls sie die Schwelle MONGODB_SLOW_QUERY_MS überschreitet.
+
+    Args:
+        explain: Optionaler Callback, der den Query-Plan liefert; wird nur bei
+            langsamen Abfragen und aktivem MONGODB_SLOW_QUERY_EXPLAIN aufgerufen.
+    """
+    shape = filter_shape(filter_dict) if filter_dict is not None else None
+
+    stats = _get_stats()
+    if stats is not None:
+        stats['count'] += 1
+        stats['duration'] += duration
+        stats['documents'] += documents
+        key = (collection, operation, _shape_key(shape))
+        entry = stats['operations'].setdefault(key, {'count': 0, 'duration': 0.0, 'documents': 0})
+        entry['count'] += 1
+        entry['duration'] += duration
+        entry['documents'] += documents
+
+    duration_ms = duration * 1000
+    if duration_ms < Config.MONGODB_SLOW_QUERY_MS:
+        return
+    _remember_slow_shape(collection, operation, shape, duration_ms)
+
+    record = {
+        'collection': collection,
+        'operation': operation,
+        'filter_shape': shape,
+        'duration_ms': round(duration_ms, 2),
+        'documents': documents,
+        'success': success,
+    }
+    if has_request_context():
+        record['endpoint'] = request.endpoint
+    if explain is not None and Config.MONGODB_SLOW_QUERY_EXPLAIN:
+        try:
+            record['explain'] = explain()
+        except Exception as e:
+            record['explain_error'] = str(e)
+    loggers['database'].warning(f"SLOW_QUERY: {json.dumps(record, default=str, ensure_ascii=False)}")
+
+
+def _remember_slow_shape(collection: str, operation: str, shape: Any, duration_ms: float):
+    key = (collection, operation, _shape_key(shape))
+    with _slow_shapes_lock:
+        entry = _slow_shapes.get(key)
+        if entry is None:
+            if len(_slow_shapes) >= _MAX_SLOW_SHAPES:
+                return
+            entry = _slow_shapes[key] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+        entry['count'] += 1
+        entry['total_ms'] += duration_ms
+        entry['max_ms'] = max(entry['max_ms'], duration_ms)
+
+
+def get_slow_query_shapes() -> List[Dict[str, Any]]:
+    """
+    Liefert die seit Prozessstart beobachteten langsamen Abfrage-Formen,
+    absteigend nach Gesamtdauer (nur dieser Worker-Prozess).
+    """
+    with _slow_shapes_lock:
+        items = list(_slow_shapes.items())
+    shapes = [
+        {
+            'collection': collection,
+            'operation': operation,
+            'filter_shape': json.loads(shape),
+            'count': entry['count'],
+            'total_ms': round(entry['total_ms'], 2),
+            'max_ms': round(entry['max_ms'], 2),
+        }
+        for (collection, operation, shape), entry in items
+    ]
+    shapes.sort(key=lambda item: item['total_ms'], reverse=True)
+    return shapes
+
+
+def record_cache_hit():
+    """Zählt einen Treffer der Identity-Map (keine Datenbank-Abfrage)"""
+    stats = _get_stats()
+    if stats is not None:
+        stats['cache_hits'] += 1
+
+
+def get_request_query_stats() -> Dict[str, Any]:
+    """
+    Liefert die Abfrage-Statistik des aktuellen Requests, Operationen
+    absteigend nach Anzahl sortiert.
+    """
+    stats = _get_stats() or {'count': 0, 'duration': 0.0, 'documents': 0, 'cache_hits': 0, 'operations': {}}
+    operations = [
+        {
+            'collection': collection,
+            'operation': operation,
+            'filter_shape': json.loads(shape),
+            'count': entry['count'],
+            'duration_ms': round(entry['duration'] * 1000, 2),
+            'documents': entry['documents'],
+        }
+        for (collection, operation, shape), entry in stats['operations'].items()
+    ]
+    operations.sort(key=lambda op: (op['count'], op['duration_ms']), reverse=True)
+    return {
+        'count': stats['count'],
+        'duration_ms': round(stats['duration'] * 1000, 2),
+        'documents': stats['documents'],
+        'cache_hits': stats['cache_hits'],
+        'operations': operations,
+    }
+
+
+def init_query_metrics(app):
+    """Registriert Server-Timing-Header und Zusammenfassung zu vielen Abfragen"""
+
+    @app.after_request
+    def add_db_server_timing(response):
+        try:
+            stats = getattr(g, _STATS_ATTR, None)
+            if not stats:
+                return response
+            if Config.DB_SERVER_TIMING:
+                response.headers.add(
+                    'Server-Timing',
+                    f'db;dur={stats["duration"] * 1000:.1f};desc="{stats["count"]} queries"'
+                )
+            if stats['count'] >= Config.DB_QUERY_WARN_COUNT:
+                summary = get_request_query_stats()
+                loggers['performance'].warning(
+                    f"DB_QUERIES: {request.method} {request.path} - "
+                    f"{summary['count']} Abfragen in {summary['duration_ms']}ms - "
+                    f"Häufigste: {json.dumps(summary['operations'][:5], default=str, ensure_ascii=False)}"
+                )
+        except Exception as e:
+            logger.debug(f"Fehler bei DB-Instrumentierung: {e}")
+        return response
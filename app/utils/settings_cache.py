@@ -0,0 +1,87 @@
+"""
+Settings-Cache für Scandy
+
+Hält die settings-Collection pro Department im Speicher, damit Seitenaufrufe
+(Farben, Labels, Departments, Kategorien, ...) ohne settings-Abfragen
+auskommen. Einträge verfallen nach SETTINGS_CACHE_TTL Sekunden; jede
+Schreiboperation auf 'settings' über MongoDBDatabase erhöht die Cache-Version,
+sodass alle Worker beim nächsten Versionsabgleich neu laden.
+"""
+import copy
+import logging
+from typing import Any, Dict, Optional
+
+from flask import g, has_app_context
+
+from app.config.config import Config
+from app.models.mongodb_database import MongoDBDatabase
+from app.utils.cache_versions import VersionedCache
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = 'settings'
+
+# Schlüssel, die unabhängig vom Department global gespeichert sind
+GLOBAL_KEYS = ('departments',)
+
+
+def _load_settings(department: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    """Lädt alle für das Department sichtbaren Settings als {key: doc}"""
+    from app.models.mongodb_database import mongodb
+
+    settings = {}
+    # Scoping über g.current_department (department entspricht dem Cache-Schlüssel)
+    for doc in mongodb.find('settings', {}):
+        key = doc.get('key')
+        if not key:
+            continue
+        # Department-spezifische Einträge haben Vorrang vor Altdaten ohne Department
+        if key in settings and settings[key].get('department') == department:
+            continue
+        settings[key] = doc
+    for key in GLOBAL_KEYS:
+        settings.pop(key, None)
+        doc = mongodb.find_one('settings', {'key': key})
+        if doc:
+            settings[key] = doc
+    return settings
+
+
+_cache = VersionedCache(CACHE_NAME, _load_settings, ttl=Config.SETTINGS_CACHE_TTL)
+
+
+def _current_settings() -> Dict[str, Dict[str, Any]]:
+    department = getattr(g, 'current_department', None) if has_app_context() else None
+    return _cache.get(department)
+
+
+def get_setting_doc(key: str) -> Optional[Dict[str, Any]]:
+    """Settings-Dokument zu key (Kopie) oder None"""
+    doc = _current_settings().get(key)
+    return copy.deepcopy(doc) if doc is not None else None
+
+
+def get_setting(key: str, default: Any = None) -> Any:
+    """Wert (Feld 'value') eines Settings oder default"""
+    doc = _current_settings().get(key)
+    if doc is None or 'value' not in doc:
+        return default
+    return copy.deepcopy(doc['value'])
+
+
+def get_settings_by_prefix(prefix: str) -> Dict[str, Any]:
+    """Alle Settings, deren Schlüssel mit prefix beginnt, als {key: value}"""
+    return {
+        key: copy.deepcopy(doc['value'])
+        for key, doc in _current_settings().items()
+        if key.startswith(prefix) and 'value' in doc
+    }
+
+
+def invalidate_settings_cache():
+    """Verwirft den Settings-Cache in allen Worker-Prozessen"""
+    _cache.invalidate()
+
+
+# Jede Schreiboperation auf 'settings' über MongoDBDatabase invalidiert den Cache
+MongoDBDatabase.register_write_listener('settings', invalidate_settings_cache)
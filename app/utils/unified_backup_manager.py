@@ -152,7 +152,7 @@ class UnifiedBackupManager:
                 # Fallback: Python-basiertes Backup
                 print(f"  🔄 Verwende Python-basiertes MongoDB-Backup...")
                 
-                from app.models.mongodb_database import mongodb
+                from app.utils.backup_manager import stream_collections_to_json
                 from datetime import datetime
                 
                 # Collections die gesichert werden sollen
@@ -164,46 +164,27 @@ class UnifiedBackupManager:
                     'email_settings', 'system_logs'
                 ]
                 
-                backup_data = {
-                    'metadata': {
-                        'created_at': datetime.now().isoformat(),
+                created_at = datetime.now().isoformat()
+                
+                def build_metadata(counts):
+                    return {
+                        'created_at': created_at,
                         'version': '2.0',
                         'datatype_preservation': True,
-                        'collections': []
-                    },
-                    'data': {}
-                }
+                        'collections': [
+                            {'name': name, 'count': count}
+                            for name, count in counts.items() if count
+                        ]
+                    }
                 
-                for collection_name in collections:
-                    try:
-                        # Alle Dokumente aus der Collection laden
-                        documents = list(mongodb.find(collection_name, {}))
-                        
-                        if documents:
-                            # Dokumente für Backup vorbereiten
-                            backup_documents = []
-                            for doc in documents:
-                                # ObjectId zu String konvertieren
-                                if '_id' in doc:
-                                    doc['_id'] = str(doc['_id'])
-                                backup_documents.append(doc)
-                            
-                            backup_data['data'][collection_name] = backup_documents
-                            backup_data['metadata']['collections'].append({
-                                'name': collection_name,
-                                'count': len(backup_documents)
-                            })
-                            
-                            print(f"    ✅ Collection {collection_name}: {len(backup_documents)} Dokumente")
-                            
-                    except Exception as e:
-                        print(f"    ⚠️  Fehler bei Collection {collection_name}: {e}")
-                        continue
-                
-                # Backup-Datei speichern
+                # Backup-Datei dokumentweise schreiben (Collections werden gestreamt)
                 backup_file = backup_path / f"{backup_name}.json"
                 with open(backup_file, 'w', encoding='utf-8') as f:
-                    json.dump(backup_data, f, ensure_ascii=False, indent=2, default=str)
+                    counts = stream_collections_to_json(f, collections, build_metadata)
+                
+                for collection_name, count in counts.items():
+                    if count:
+                        print(f"    ✅ Collection {collection_name}: {count} Dokumente")
                 
                 print(f"  ✅ Python-basiertes MongoDB-Backup erstellt")
                 return backup_path
@@ -395,6 +376,12 @@ class UnifiedBackupManager:
                     success = self._restore_mongodb(mongodb_path)
                     if not success:
                         return False
+                    # Fälligkeitsdaten (due_at) der wiederhergestellten Ausleihen nachtragen
+                    from app.services.lending_service import LendingService
+                    LendingService.backfill_due_at()
+                    # mongorestore löst keine Schreib-Listener aus
+                    from app.utils.backup_manager import invalidate_caches_after_restore
+                    invalidate_caches_after_restore()
                 
                 # 2. Medien wiederherstellen (optional)
                 if include_media:
@@ -577,6 +564,13 @@ class UnifiedBackupManager:
             except Exception as e:
                 print(f"⚠️  Konnte Orphan-Namen nicht anonymisieren: {e}")
             
+            # Fälligkeitsdaten (due_at) der importierten Ausleihen nachtragen
+            from app.services.lending_service import LendingService
+            LendingService.backfill_due_at()
+            # insert_many auf der rohen Collection löst keine Schreib-Listener aus
+            from app.utils.backup_manager import invalidate_caches_after_restore
+            invalidate_caches_after_restore()
+            
             print(f"✅ JSON-Backup erfolgreich importiert")
             return True
             
@@ -881,6 +875,10 @@ class UnifiedBackupManager:
             except Exception as e:
                 print(f"⚠️  Orphan-Anonymisierung (scoped) fehlgeschlagen: {e}")
 
+            # Fälligkeitsdaten (due_at) der importierten Ausleihen nachtragen
+            from app.services.lending_service import LendingService
+            LendingService.backfill_due_at()
+
             # Erfolg, wenn mindestens ein Dokument eingefügt wurde
             return total_inserted > 0
         except Exception as e:
@@ -1055,6 +1053,9 @@ class UnifiedBackupManager:
                             report['users_matched'] = getattr(res, 'matched_count', 0)
                         except Exception as be:
                             report['errors'].append(f"users.bulk: {be}")
+                        # bulk_write auf der rohen Collection löst den 'users'-Listener nicht aus
+                        from app.utils.principal_cache import invalidate_principal_cache
+                        invalidate_principal_cache()
                     report['users_imported'] = True
             except Exception as ue:
                 report['errors'].append(f"users: {ue}")
@@ -1065,6 +1066,10 @@ class UnifiedBackupManager:
             except Exception as ae:
                 report['errors'].append(f"anonymize: {ae}")
 
+            # Fälligkeitsdaten (due_at) der importierten Ausleihen nachtragen
+            from app.services.lending_service import LendingService
+            LendingService.backfill_due_at()
+
             # Erfolg, wenn Insert stattfand oder nur Duplikate vorlagen
             report['ok'] = (report['total_inserted'] > 0 and len(report['errors']) == 0) or (
                 report['total_inserted'] == 0 and report['total_failed'] == 0 and report['total_duplicates'] > 0
@@ -1,16 +1,31 @@
 """
 Versionschecker für Scandy
 Prüft ob die lokale Installation mit der aktuellen GitHub-Version übereinstimmt
+
+Die GitHub-Version wird nicht beim Rendern abgefragt: ein Hintergrund-Thread
+pro Prozess liest den gespeicherten Stand aus der Collection 'system_status'.
+Nur der Worker, der den fälligen Abruf per Lock übernimmt, fragt GitHub ab
+(höchstens alle VERSION_CHECK_INTERVAL Sekunden) und speichert das Ergebnis
+für alle anderen. Templates lesen ausschließlich den Stand im Speicher.
 """
 
+import os
 import requests
 import re
 import logging
+import socket
+import threading
+from datetime import datetime, timedelta
 from pathlib import Path
+from pymongo.errors import DuplicateKeyError
+from app.config.config import Config
 from app.config.version import VERSION
 
 logger = logging.getLogger(__name__)
 
+STATUS_COLLECTION = 'system_status'
+STATUS_ID = 'version_info'
+
 class VersionChecker:
     """Versionschecker für Scandy"""
     
@@ -18,12 +33,21 @@ class VersionChecker:
         self.github_api_url = "https://api.github.com/repos/woschj/Scandy2/releases/latest"
         self.github_raw_url = "https://raw.githubusercontent.com/woschj/Scandy2/main/app/config/version.py"
         self.local_version = VERSION
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
         
+        # Zuletzt bekannter Stand (github_version, checked_at, error)
+        self._state = {'github_version': None, 'checked_at': None, 'error': None}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.thread = None
+        self._thread_pid = None
+    
     def get_github_version(self):
         """Holt die neueste Version von GitHub"""
+        timeout = Config.VERSION_CHECK_TIMEOUT
         try:
             # Versuche zuerst die GitHub API (für Release-Tags)
-            response = requests.get(self.github_api_url, timeout=10)
+            response = requests.get(self.github_api_url, timeout=timeout)
             if response.status_code == 200:
                 data = response.json()
                 tag_name = data.get('tag_name', '')
@@ -32,40 +56,151 @@ class VersionChecker:
                     return tag_name.lstrip('v')
             
             # Fallback: Direkt aus der version.py Datei lesen
-            response = requests.get(self.github_raw_url, timeout=10)
+            response = requests.get(self.github_raw_url, timeout=timeout)
             if response.status_code == 200:
                 content = response.text
                 # Suche nach VERSION = "..." Pattern
                 match = re.search(r'VERSION\s*=\s*["\']([^"\']+)["\']', content)
                 if match:
                     return match.group(1)
-                    
+        
+        except requests.RequestException as e:
+            # Offline-Installationen: nur als Warnung, der nächste Versuch folgt im nächsten Intervall
+            logger.warning(f"GitHub-Version nicht erreichbar: {e}")
         except Exception as e:
             logger.error(f"Fehler beim Abrufen der GitHub-Version: {e}")
-            
+        
         return None
     
     def get_local_version(self):
         """Gibt die lokale Version zurück"""
         return self.local_version
     
+    # ===== HINTERGRUND-AKTUALISIERUNG =====
+    
+    def _status_collection(self):
+        from app.models.mongodb_database import mongodb
+        return mongodb.get_collection(STATUS_COLLECTION)
+    
+    def _claim_refresh(self, now):
+        """
+        Übernimmt den fälligen GitHub-Abruf für diesen Worker.
+        
+        Der Filter trifft nur, wenn next_check_at erreicht ist; andernfalls
+        scheitert das Upsert am bereits vorhandenen _id und ein anderer
+        Worker ist zuständig.
+        """
+        try:
+            self._status_collection().update_one(
+                {'_id': STATUS_ID, '$or': [
+                    {'next_check_at': {'$lte': now}},
+                    {'next_check_at': {'$exists': False}}
+                ]},
+                {'$set': {
+                    'next_check_at': now + timedelta(seconds=Config.VERSION_CHECK_INTERVAL),
+                    'claimed_by': self.worker_id
+                }},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+    
+    def _store_result(self, github_version, now):
+        """Speichert das Ergebnis eines GitHub-Abrufs für alle Worker"""
+        update = {'checked_at': now}
+        if github_version:
+            update['github_version'] = github_version
+            update['error'] = None
+        else:
+            # Letzte bekannte GitHub-Version bleibt erhalten
+            update['error'] = "GitHub-Version konnte nicht abgerufen werden"
+        self._status_collection().update_one({'_id': STATUS_ID}, {'$set': update}, upsert=True)
+    
+    def _load_state(self):
+        """Übernimmt den gespeicherten Stand in den Speicher"""
+        doc = self._status_collection().find_one({'_id': STATUS_ID})
+        if doc:
+            with self._lock:
+                self._state = {
+                    'github_version': doc.get('github_version'),
+                    'checked_at': doc.get('checked_at'),
+                    'error': doc.get('error')
+                }
+    
+    def refresh(self, force=False):
+        """
+        Ein Aktualisierungsschritt: ruft GitHub ab, falls fällig und dieser
+        Worker den Abruf übernimmt (oder force), und lädt danach den
+        gespeicherten Stand.
+        """
+        if not Config.VERSION_CHECK_ENABLED:
+            with self._lock:
+                self._state = {'github_version': None, 'checked_at': None,
+                               'error': "Versionsprüfung deaktiviert"}
+            return
+        
+        now = datetime.now()
+        try:
+            if force or self._claim_refresh(now):
+                self._store_result(self.get_github_version(), now)
+            self._load_state()
+        except Exception as e:
+            logger.error(f"Fehler beim Aktualisieren der Versionsinformationen: {e}")
+            if force:
+                # Ohne Datenbank zumindest diesen Prozess aktualisieren
+                github_version = self.get_github_version()
+                with self._lock:
+                    self._state = {
+                        'github_version': github_version or self._state.get('github_version'),
+                        'checked_at': now,
+                        'error': None if github_version else "GitHub-Version konnte nicht abgerufen werden"
+                    }
+    
+    def _refresh_loop(self):
+        """Hauptschleife des Hintergrund-Threads"""
+        while not self._stop_event.is_set():
+            self.refresh()
+            self._stop_event.wait(Config.VERSION_CHECK_POLL_INTERVAL)
+    
+    def start(self):
+        """Startet den Hintergrund-Thread (einmal pro Prozess, auch nach fork)"""
+        pid = os.getpid()
+        if self.thread and self.thread.is_alive() and self._thread_pid == pid:
+            return
+        self._stop_event.clear()
+        self._thread_pid = pid
+        self.worker_id = f"{socket.gethostname()}-{pid}"
+        self.thread = threading.Thread(target=self._refresh_loop, name='version-checker', daemon=True)
+        self.thread.start()
+        logger.info("Versionsprüfung im Hintergrund gestartet")
+    
+    # ===== ABFRAGEN (ohne Netzwerkzugriff) =====
+    
     def is_up_to_date(self):
         """Prüft ob die lokale Version aktuell ist"""
-        github_version = self.get_github_version()
+        github_version = self.get_version_info()['github_version']
         if not github_version:
             return None  # Unbekannt
         
         return self.local_version == github_version
     
     def get_version_info(self):
-        """Gibt detaillierte Versionsinformationen zurück"""
-        github_version = self.get_github_version()
+        """Gibt detaillierte Versionsinformationen zurück (aus dem Speicher)"""
+        # Nach einem fork (gunicorn --preload) läuft der Thread im Worker nicht mehr
+        if self._thread_pid != os.getpid() and Config.VERSION_CHECK_ENABLED:
+            self.start()
+        
+        with self._lock:
+            state = dict(self._state)
+        github_version = state['github_version']
         
         info = {
             'local_version': self.local_version,
             'github_version': github_version,
             'is_up_to_date': None,
             'update_available': False,
+            'checked_at': state['checked_at'],
             'error': None
         }
         
@@ -73,17 +208,22 @@ class VersionChecker:
             info['is_up_to_date'] = self.local_version == github_version
             info['update_available'] = self.local_version != github_version
         else:
-            info['error'] = "GitHub-Version konnte nicht abgerufen werden"
-            
+            if not Config.VERSION_CHECK_ENABLED:
+                info['error'] = "Versionsprüfung deaktiviert"
+            else:
+                info['error'] = state['error'] or "GitHub-Version noch nicht abgerufen"
+        
         return info
     
     def get_update_url(self):
         """Gibt die URL für das Update zurück"""
         return "https://github.com/woschj/Scandy2/releases/latest"
     
-    def check_for_updates(self):
-        """Prüft auf Updates und gibt Status zurück"""
+    def check_for_updates(self, force=False):
+        """Prüft auf Updates und gibt Status zurück (force: GitHub sofort abfragen)"""
         try:
+            if force:
+                self.refresh(force=True)
             info = self.get_version_info()
             
             if info['error']:
@@ -108,22 +248,27 @@ class VersionChecker:
                     'github_version': info['github_version'],
                     'update_url': self.get_update_url()
                 }
-                
+        
         except Exception as e:
             logger.error(f"Fehler beim Versionscheck: {e}")
             return {
                 'status': 'error',
                 'message': f'Fehler beim Versionscheck: {str(e)}',
-                'local_version': info['local_version']
+                'local_version': self.local_version
             }
 
 # Globale Instanz
 version_checker = VersionChecker()
 
-def check_version():
+def start_version_checker():
+    """Startet die Versionsprüfung im Hintergrund"""
+    if Config.VERSION_CHECK_ENABLED:
+        version_checker.start()
+
+def check_version(force=False):
     """Einfache Funktion für Versionscheck"""
-    return version_checker.check_for_updates()
+    return version_checker.check_for_updates(force=force)
 
 def get_version_info():
     """Gibt Versionsinformationen zurück"""
-    return version_checker.get_version_info() 
\ No newline at end of file
+    return version_checker.get_version_info()
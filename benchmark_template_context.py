@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Kosten pro render_template mit eagerem und lazy Template-Kontext
+
+"Vorher" ruft alle Template-Provider (Farben, Labels, Version, Wochenberichte,
+Features, benutzerdefinierte Felder, Departments) bei jedem Rendern auf, wie es
+die früheren Context Processors getan haben. "Nachher" rendert mit dem lazy
+Kontext, der nur die tatsächlich verwendeten Variablen berechnet.
+
+Gemessen werden ein kleines Partial (verwendet keine Kontext-Variable) und eine
+Seite, die alle Variablen verwendet. Pro Rendern wird ein eigener Request-Context
+erzeugt, damit weder Identity-Map noch Request-Memo mehrere Durchläufe verfälschen.
+
+Aufruf:
+    python benchmark_template_context.py [--renders 200] [--user USERNAME]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Füge den Projektpfad hinzu
+project_home = str(Path(__file__).parent)
+if project_home not in sys.path:
+    sys.path.insert(0, project_home)
+
+from flask import render_template_string
+from flask_login import login_user
+
+from app import create_app
+from app.utils.context_processors import lazy_context
+from app.utils.query_metrics import get_request_query_stats
+
+PARTIAL_TEMPLATE = '<tr><td>{{ item.name }}</td><td>{{ item.status }}</td></tr>'
+
+FULL_TEMPLATE = (
+    '{{ colors.primary }} {{ version }} {{ version_info.local_version }} '
+    '{{ app_labels.tools.name }} {{ unfilled_timesheet_days }} '
+    '{{ features_enabled.tools }} {{ custom_fields_tools|length }} '
+    '{{ custom_fields_consumables|length }} {{ departments_ctx.current }}'
+)
+
+def _render_once(app, template, eager, user):
+    """Rendert template in einem frischen Request-Context; liefert (ms, DB-Abfragen)"""
+    with app.test_request_context('/'):
+        if user is not None:
+            login_user(user)
+        start = time.perf_counter()
+        if eager:
+            # Verhalten der früheren Context Processors: alles bei jedem Rendern.
+            # Über resolve, damit das Rendern die Werte aus dem Request-Memo nimmt
+            for name in lazy_context.names():
+                lazy_context.resolve(name)
+        render_template_string(template, item={'name': 'Bohrmaschine', 'status': 'verfügbar'})
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return elapsed_ms, get_request_query_stats()['count']
+
+def _measure(app, template, eager, user, renders):
+    # Aufwärmen (Template-Kompilierung, prozesslokale Caches)
+    for _ in range(5):
+        _render_once(app, template, eager, user)
+    timings, queries = [], []
+    for _ in range(renders):
+        elapsed_ms, query_count = _render_once(app, template, eager, user)
+        timings.append(elapsed_ms)
+        queries.append(query_count)
+    return statistics.median(timings), statistics.mean(timings), statistics.mean(queries)
+
+def run_benchmark(renders, username=None):
+    """Misst die Kosten pro Rendern vorher/nachher"""
+
+    print(f"🔄 Starte Template-Kontext-Benchmark ({renders} Renderings pro Fall)...")
+
+    try:
+        app = create_app()
+
+        user = None
+        if username:
+            with app.app_context():
+                from app.models.mongodb_models import MongoDBUser
+                from app.models.user import User
+                user_data = MongoDBUser.get_by_username(username)
+                if not user_data:
+                    print(f"❌ Benutzer '{username}' nicht gefunden")
+                    return False
+                user = User(user_data)
+            print(f"  👤 Angemeldet als: {user.username}")
+
+        print(f"\n{'Fall':<28} {'Median ms':>10} {'Mittel ms':>10} {'DB-Abfr.':>9}")
+        for label, template in (('Partial', PARTIAL_TEMPLATE), ('Seite (alle Variablen)', FULL_TEMPLATE)):
+            for eager in (True, False):
+                median_ms, mean_ms, mean_queries = _measure(app, template, eager, user, renders)
+                case = f"{label} – {'vorher' if eager else 'nachher'}"
+                print(f"{case:<28} {median_ms:>10.3f} {mean_ms:>10.3f} {mean_queries:>9.1f}")
+
+        print("\n🎉 Benchmark abgeschlossen")
+
+    except Exception as e:
+        print(f"❌ Fehler beim Benchmark: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Misst die Kosten des Template-Kontexts pro Rendern')
+    parser.add_argument('--renders', type=int, default=200, help='Renderings pro Fall (Standard: 200)')
+    parser.add_argument('--user', help='Benutzername für angemeldete Renderings (optional)')
+    args = parser.parse_args()
+
+    success = run_benchmark(args.renders, args.user)
+    sys.exit(0 if success else 1)
@@ -69,6 +69,47 @@ def migrate_all_to_departments():
     
     return True
 
+def upsert_names_per_department(collection_name, names, departments):
+    """
+    Legt für jedes Department alle Namen in collection_name an, sofern noch
+    nicht vorhanden. Alle Upserts laufen gebündelt über mongodb.bulk_write.
+    
+    Returns:
+        Anzahl neu angelegter Einträge
+    """
+    from datetime import datetime
+    now = datetime.now()
+    # Doppelte Namen entfernen, sonst würden parallele Upserts Duplikate anlegen
+    pairs = list(dict.fromkeys(
+        (department, name.strip())
+        for department in departments if isinstance(department, str) and department.strip()
+        for name in names if isinstance(name, str) and name.strip()
+    ))
+    
+    result = mongodb.bulk_write(collection_name, (
+        {'updateOne': {
+            'filter': {'name': name, 'department': department, 'deleted': {'$ne': True}},
+            'update': {'$setOnInsert': {'created_at': now, 'updated_at': now, 'deleted': False}},
+            'upsert': True
+        }}
+        for department, name in pairs
+    ), timestamps=False, scoped=False)
+    
+    errors = {error['index']: error['message'] for error in result['errors']}
+    current_department = None
+    for index, (department, name) in enumerate(pairs):
+        if department != current_department:
+            current_department = department
+            print(f"    📍 Department: {department}")
+        if index in errors:
+            print(f"      ❌ {name}: {errors[index]}")
+        elif index in result['upserted_ids']:
+            print(f"      ✅ {name}: erstellt")
+        else:
+            print(f"      ⚠️  {name}: bereits vorhanden")
+    
+    return result['upserted']
+
 def migrate_categories(departments):
     """Migriert Kategorien zu Departments"""
     try:
@@ -91,45 +132,7 @@ def migrate_categories(departments):
         print(f"  Gefundene Kategorien: {', '.join(existing_categories)}")
         
         # Migriere zu jedem Department
-        migrated_count = 0
-        for department in departments:
-            if not isinstance(department, str) or not department.strip():
-                continue
-                
-            print(f"    📍 Department: {department}")
-            
-            for category in existing_categories:
-                if not isinstance(category, str) or not category.strip():
-                    continue
-                    
-                try:
-                    # Prüfe ob bereits existiert
-                    existing = mongodb.find_one('categories', {
-                        'name': category.strip(),
-                        'department': department,
-                        'deleted': {'$ne': True}
-                    })
-                    
-                    if not existing:
-                        # Erstelle neue Kategorie
-                        from datetime import datetime
-                        category_data = {
-                            'name': category.strip(),
-                            'department': department,
-                            'created_at': datetime.now(),
-                            'updated_at': datetime.now(),
-                            'deleted': False
-                        }
-                        
-                        from datetime import datetime
-                        mongodb.insert_one('categories', category_data)
-                        print(f"      ✅ {category}: erstellt")
-                        migrated_count += 1
-                    else:
-                        print(f"      ⚠️  {category}: bereits vorhanden")
-                        
-                except Exception as e:
-                    print(f"      ❌ {category}: {e}")
+        migrated_count = upsert_names_per_department('categories', existing_categories, departments)
         
         print(f"  {migrated_count} Kategorien migriert")
         
@@ -158,44 +161,7 @@ def migrate_locations(departments):
         print(f"  Gefundene Standorte: {', '.join(existing_locations)}")
         
         # Migriere zu jedem Department
-        migrated_count = 0
-        for department in departments:
-            if not isinstance(department, str) or not department.strip():
-                continue
-                
-            print(f"    📍 Department: {department}")
-            
-            for location in existing_locations:
-                if not isinstance(location, str) or not location.strip():
-                    continue
-                    
-                try:
-                    # Prüfe ob bereits existiert
-                    existing = mongodb.find_one('locations', {
-                        'name': location.strip(),
-                        'department': department,
-                        'deleted': {'$ne': True}
-                    })
-                    
-                    if not existing:
-                        # Erstelle neuen Standort
-                        from datetime import datetime
-                        location_data = {
-                            'name': location.strip(),
-                            'department': department,
-                            'created_at': datetime.now(),
-                            'updated_at': datetime.now(),
-                            'deleted': False
-                        }
-                        
-                        mongodb.insert_one('locations', location_data)
-                        print(f"      ✅ {location}: erstellt")
-                        migrated_count += 1
-                    else:
-                        print(f"      ⚠️  {location}: bereits vorhanden")
-                        
-                except Exception as e:
-                    print(f"      ❌ {location}: {e}")
+        migrated_count = upsert_names_per_department('locations', existing_locations, departments)
         
         print(f"  {migrated_count} Standorte migriert")
         
@@ -224,44 +190,7 @@ def migrate_ticket_categories(departments):
         print(f"  Gefundene Ticket-Kategorien: {', '.join(existing_categories)}")
         
         # Migriere zu jedem Department
-        migrated_count = 0
-        for department in departments:
-            if not isinstance(department, str) or not department.strip():
-                continue
-                
-            print(f"    📍 Department: {department}")
-            
-            for category in existing_categories:
-                if not isinstance(category, str) or not category.strip():
-                    continue
-                    
-                try:
-                    # Prüfe ob bereits existiert
-                    existing = mongodb.find_one('ticket_categories', {
-                        'name': category.strip(),
-                        'department': department,
-                        'deleted': {'$ne': True}
-                    })
-                    
-                    if not existing:
-                        # Erstelle neue Ticket-Kategorie
-                        from datetime import datetime
-                        category_data = {
-                            'name': category.strip(),
-                            'department': department,
-                            'created_at': datetime.now(),
-                            'updated_at': datetime.now(),
-                            'deleted': False
-                        }
-                        
-                        mongodb.insert_one('ticket_categories', category_data)
-                        print(f"      ✅ {category}: erstellt")
-                        migrated_count += 1
-                    else:
-                        print(f"      ⚠️  {category}: bereits vorhanden")
-                        
-                except Exception as e:
-                    print(f"      ❌ {category}: {e}")
+        migrated_count = upsert_names_per_department('ticket_categories', existing_categories, departments)
         
         print(f"  {migrated_count} Ticket-Kategorien migriert")
         
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Einmalige Migration: department-Feld für alle gescopten Collections
+
+Setzt bei allen Dokumenten der Department-gescopten Collections ohne
+department-Feld (oder mit leerem Wert) ein explizites Department. Ohne
+Angabe wird der Legacy-Platzhalter (LEGACY_DEPARTMENT) verwendet.
+
+Danach kann DEPARTMENT_SCOPING_MODE=strict gesetzt werden: das Scoping
+filtert dann per Gleichheit auf department statt über $or/$exists.
+
+Aufruf:
+    python migrate_department_backfill.py [--department NAME] [--dry-run]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Füge den Projektpfad hinzu
+project_home = str(Path(__file__).parent)
+if project_home not in sys.path:
+    sys.path.insert(0, project_home)
+
+from app import create_app
+from app.config.config import Config
+from app.models.mongodb_database import mongodb, MongoDBDatabase
+
+# Dokumente ohne department (fehlend, None oder leer)
+MISSING_DEPARTMENT = {'department': {'$in': [None, '']}}
+
+def backfill_departments(target_department, dry_run=False):
+    """Setzt target_department bei allen gescopten Dokumenten ohne Department"""
+
+    print(f"🔄 Starte Department-Backfill (Ziel: {target_department}{', Probelauf' if dry_run else ''})...")
+
+    try:
+        app = create_app()
+
+        with app.app_context():
+            total = 0
+            for collection_name in sorted(MongoDBDatabase._SCOPED_COLLECTIONS):
+                filter_dict = dict(MISSING_DEPARTMENT)
+                if collection_name == 'settings':
+                    # Die Department-Liste selbst bleibt global
+                    filter_dict['key'] = {'$ne': 'departments'}
+
+                # Direkt auf der Collection: kein Scoping, updated_at bleibt unverändert
+                collection = mongodb.get_collection(collection_name)
+                missing = collection.count_documents(filter_dict)
+                if not missing:
+                    print(f"  ✅ {collection_name}: vollständig")
+                    continue
+
+                if dry_run:
+                    print(f"  ℹ️  {collection_name}: {missing} Dokumente ohne Department")
+                    total += missing
+                    continue
+
+                try:
+                    result = collection.update_many(filter_dict, {'$set': {'department': target_department}})
+                    print(f"  ✅ {collection_name}: {result.modified_count} Dokumente aktualisiert")
+                    total += result.modified_count
+                except Exception as e:
+                    print(f"  ❌ {collection_name}: {e}")
+
+            print(f"\n🎉 Backfill abgeschlossen: {total} Dokumente {'betroffen' if dry_run else 'aktualisiert'}")
+            if not dry_run:
+                print("  Jetzt kann DEPARTMENT_SCOPING_MODE=strict gesetzt werden.")
+
+    except Exception as e:
+        print(f"❌ Fehler beim Backfill: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Setzt ein explizites Department für Altdaten')
+    parser.add_argument('--department', default=Config.LEGACY_DEPARTMENT,
+                        help=f'Ziel-Department (Standard: {Config.LEGACY_DEPARTMENT})')
+    parser.add_argument('--dry-run', action='store_true', help='Nur zählen, nichts ändern')
+    args = parser.parse_args()
+
+    success = backfill_departments(args.department, args.dry_run)
+    sys.exit(0 if success else 1)
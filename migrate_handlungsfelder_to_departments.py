@@ -18,6 +18,7 @@ if project_home not in sys.path:
 from app import create_app
 from app.models.mongodb_database import mongodb
 from app.services.handlungsfeld_service import handlungsfeld_service
+from migrate_all_to_departments import upsert_names_per_department
 
 def migrate_handlungsfelder_to_departments():
     """Migriert bestehende Handlungsfelder zu Departments"""
@@ -66,27 +67,7 @@ def migrate_handlungsfelder_to_departments():
             
             # 3. Migriere Handlungsfelder zu jedem Department
             print("\n🚀 Migriere Handlungsfelder zu Departments...")
-            migrated_count = 0
-            
-            for department in departments:
-                if not isinstance(department, str) or not department.strip():
-                    continue
-                    
-                print(f"\n  📍 Department: {department}")
-                
-                for category in existing_categories:
-                    if not isinstance(category, str) or not category.strip():
-                        continue
-                        
-                    try:
-                        # Handlungsfeld für Department erstellen
-                        if handlungsfeld_service.create_handlungsfeld(category.strip(), department):
-                            print(f"    ✅ {category}: erstellt")
-                            migrated_count += 1
-                        else:
-                            print(f"    ⚠️  {category}: bereits vorhanden")
-                    except Exception as e:
-                        print(f"    ❌ {category}: {e}")
+            migrated_count = upsert_names_per_department('ticket_categories', existing_categories, departments)
             
             # 4. Erstelle ticket_categories Collection-Index
             print("\n📊 Erstelle Collection-Index...")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Einmalige Migration: kanonisches Fälligkeitsdatum (due_at) für Ausleihen
+
+expected_return_date liegt je nach Herkunft (QuickScan, Import, Backup-Restore)
+als datetime oder als String vor. Die Überfälligkeitsabfrage filtert auf dem
+Server über das indizierte Feld due_at (Tagesbeginn des Rückgabetags). Offene
+Ausleihen werden beim Start und nach jeder Wiederherstellung automatisch
+nachgetragen; diese Migration setzt due_at zusätzlich für alle bereits
+zurückgegebenen Ausleihen. Nicht lesbare Werte werden gemeldet und übersprungen.
+
+Aufruf:
+    python migrate_lending_due_dates.py [--dry-run]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Füge den Projektpfad hinzu
+project_home = str(Path(__file__).parent)
+if project_home not in sys.path:
+    sys.path.insert(0, project_home)
+
+from app import create_app
+from app.services.lending_service import LendingService
+
+def migrate_due_dates(dry_run=False):
+    """Setzt due_at aus expected_return_date"""
+
+    print(f"🔄 Starte Migration der Fälligkeitsdaten{' (Probelauf)' if dry_run else ''}...")
+
+    try:
+        app = create_app()
+
+        with app.app_context():
+            stats = LendingService.backfill_due_at(open_only=False, dry_run=dry_run)
+
+            print(f"\n🎉 Migration abgeschlossen: {stats['updated']} Ausleihen "
+                  f"{'betroffen' if dry_run else 'aktualisiert'}, {stats['invalid']} nicht lesbar")
+
+    except Exception as e:
+        print(f"❌ Fehler bei der Migration: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    return True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Setzt due_at für Ausleihen aus expected_return_date')
+    parser.add_argument('--dry-run', action='store_true', help='Nur zählen, nichts ändern')
+    args = parser.parse_args()
+
+    success = migrate_due_dates(args.dry_run)
+    sys.exit(0 if success else 1)